@@ -12,5 +12,13 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# Bajo ASGI cada petición usa su propia conexión (thread-sensitive): las
+# persistentes no se reutilizan y quedarían abiertas sin uso
+os.environ.setdefault('DJANGO_DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
+
+# Carga la lista de contraseñas comunes antes de la primera petición de registro
+from productos.forms import precargar_validadores_contrasena  # noqa: E402
+
+precargar_validadores_contrasena()
@@ -31,6 +31,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Los estáticos se responden antes de todo lo demás (productos/estaticos.py);
+    # sin collectstatic se desactiva solo
+    'productos.estaticos.EstaticosMiddleware',
+    # Primero de lo que llega a las vistas, para medir también al resto de middlewares
+    'productos.perfilado.PerfiladoMiddleware',
+    'productos.enrutador.LecturaPrimariaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -44,7 +50,8 @@ ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates que además mide el tiempo de render para el perfilado
+        'BACKEND': 'productos.perfilado.PlantillasPerfiladas',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -63,13 +70,103 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
+# SQLite por defecto. Para PostgreSQL (psycopg 3):
+#   DJANGO_DB_ENGINE=postgresql DJANGO_DB_NAME=portafolio DJANGO_DB_USER=... DJANGO_DB_PASSWORD=...
+#   DJANGO_DB_HOST=127.0.0.1 DJANGO_DB_PORT=5432
+# y, para reutilizar conexiones, una de estas dos opciones:
+#   DJANGO_DB_POOL=1 (pool nativo de Django 5.1+, tamaño con DJANGO_DB_POOL_MIN/MAX)
+#   DJANGO_DB_CONN_MAX_AGE=60 (conexión persistente por hilo, con health check)
+# El valor por defecto de 60 s es para WSGI: config/asgi.py lo lleva a 0 (bajo
+# ASGI las conexiones persistentes no se reutilizan); con ASGI usar el pool.
+
+DB_MOTOR = os.environ.get('DJANGO_DB_ENGINE', 'sqlite3')
+
+if DB_MOTOR == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DJANGO_DB_NAME', 'portafolio'),
+            'USER': os.environ.get('DJANGO_DB_USER', ''),
+            'PASSWORD': os.environ.get('DJANGO_DB_PASSWORD', ''),
+            'HOST': os.environ.get('DJANGO_DB_HOST', ''),
+            'PORT': os.environ.get('DJANGO_DB_PORT', ''),
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+    if os.environ.get('DJANGO_DB_POOL', '') == '1':
+        # El pool exige CONN_MAX_AGE = 0: cada petición devuelve su conexión al pool
+        DATABASES['default']['OPTIONS'] = {
+            'pool': {
+                'min_size': int(os.environ.get('DJANGO_DB_POOL_MIN', '2')),
+                'max_size': int(os.environ.get('DJANGO_DB_POOL_MAX', '10')),
+                'timeout': 10,
+            },
+        }
+    else:
+        DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DJANGO_DB_CONN_MAX_AGE', '60'))
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DJANGO_DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': int(os.environ.get('DJANGO_DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # Segundos que espera un escritor por el bloqueo antes de fallar
+                # (sqlite3 lo aplica como busy_timeout; no se repite en SQLITE_PRAGMAS)
+                'timeout': 20,
+                # Toma el bloqueo de escritura al abrir la transacción (evita
+                # errores "database is locked" al pasar de lectura a escritura)
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
+    }
+
+# Réplicas de solo lectura para el catálogo (productos/enrutador.py):
+#   DJANGO_DB_REPLICAS=host1,host2 (PostgreSQL) o archivo1.sqlite3,archivo2.sqlite3 (SQLite)
+# Cada una hereda la configuración de 'default'; en los tests son espejos de 'default'.
+CATALOGO_REPLICAS = []
+for numero, destino in enumerate(filter(None, os.environ.get('DJANGO_DB_REPLICAS', '').split(',')), start=1):
+    alias = f'replica{numero}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST' if DB_MOTOR == 'postgresql' else 'NAME': destino.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    CATALOGO_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['productos.enrutador.EnrutadorReplicas']
+
+# Segundos que un cliente lee de la base principal después de escribir
+VENTANA_LECTURA_PRIMARIA = 10
+
+# PRAGMAs aplicados a cada conexión SQLite nueva (productos/conexiones.py).
+# journal_mode=WAL queda grabado en el archivo: db.sqlite3 y sus -wal/-shm no
+# se versionan; la base de desarrollo se crea con `manage.py migrate`.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',  # lectores y un escritor en paralelo
+    'synchronous': 'NORMAL',  # seguro con WAL; fsync solo en checkpoints
+    'cache_size': -20000,  # 20 MB
+    'temp_store': 'MEMORY',
+    'mmap_size': 268435456,
+}
+
+
+# Cache
+# Memoria local por defecto; en producción, por ejemplo:
+#   DJANGO_CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+#   DJANGO_CACHE_LOCATION=redis://127.0.0.1:6379/1
+# o django.core.cache.backends.filebased.FileBasedCache con una ruta
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': os.environ.get('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', 'portafolio'),
     }
 }
 
+CATALOGO_CACHE_TIMEOUT = 300
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -108,9 +205,30 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# collectstatic agrega un hash a los nombres y escribe variantes .gz/.br
+# (productos/estaticos.py); Bootstrap se vendoriza con `manage.py vendorizar_estaticos`
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'productos.estaticos.AlmacenEstaticos'},
+}
+# Bootstrap desde la CDN mientras no esté vendorizado; en producción solo archivos
+# locales (`manage.py check` falla si falta alguno y el respaldo está apagado)
+ESTATICOS_RESPALDO_CDN = DEBUG
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Miniaturas locales de imagen_url (productos/imagenes.py)
+IMAGENES_FORMATO = 'WEBP'
+IMAGENES_TIMEOUT = 5
+IMAGENES_MAX_BYTES = 5 * 1024 * 1024
+IMAGENES_WORKERS = 4
+IMAGENES_EN_SEGUNDO_PLANO = True
+# Solo para desarrollo: permite descargar desde loopback y redes privadas
+IMAGENES_PERMITIR_RED_PRIVADA = False
+# URL a mostrar cuando un producto no tiene imagen (None usa el recuadro 📦)
+PRODUCTO_IMAGEN_PLACEHOLDER = None
+
 LOGIN_REDIRECT_URL = 'lista_productos'
 LOGIN_URL = 'login'
 LOGOUT_REDIRECT_URL = 'login'
@@ -120,6 +238,47 @@ MESSAGE_TAGS = {
 messages.ERROR: 'danger',
 }
 
+# Paginación por cursor del catálogo público
+CATALOGO_PAGINA_TAMANO = 12
+CATALOGO_PAGINA_MAXIMO = 60
+
+# Búsqueda de texto completo: None elige FTS5 (SQLite) o tsvector (Postgres)
+# según el motor; también acepta una ruta como 'productos.busqueda.BusquedaIcontains'
+CATALOGO_BUSQUEDA_BACKEND = None
+
+# API JSON (productos/api.py): filas por POST /api/productos/lote/
+API_LOTE_MAXIMO = 1000
+
+# Registro de cambios de productos (productos/cambios.py): feed JSON y SSE.
+# Cada conexión SSE se cierra a los CAMBIOS_SSE_SEGUNDOS y el cliente se
+# reconecta con Last-Event-ID; `manage.py compactar_cambios` aplica los límites.
+CAMBIOS_PAGINA = 500
+CAMBIOS_SONDEO_SEGUNDOS = 1.0
+CAMBIOS_LATIDO_SEGUNDOS = 15
+CAMBIOS_SSE_SEGUNDOS = 300
+CAMBIOS_DIFUSOR_BUFER = 5000
+CAMBIOS_RETENCION_DIAS = 7
+CAMBIOS_MAXIMO = 100000
+# Subir en PostgreSQL por encima de la transacción más larga (ver productos/cambios.py)
+CAMBIOS_MARGEN_SEGUNDOS = 0
+
+# Purga de productos dados de baja (productos/eliminacion.py, `manage.py purgar_productos`):
+# filas por transacción y pausa entre lotes para no acaparar el bloqueo de escritura
+PURGA_LOTE = 500
+PURGA_PAUSA_SEGUNDOS = 0.2
+
+# Historial de precio y stock (productos/historial.py): filas por INSERT y
+# días de tendencia que grafica el dashboard (desde los acumulados diarios)
+HISTORIAL_LOTE = 1000
+HISTORIAL_DIAS_DASHBOARD = 90
+
+# Perfilado por petición (productos/perfilado.py, `manage.py perf_report`).
+# El muestreo (0 a 1) mantiene el costo bajo para dejarlo activo en producción.
+PERFILADO_ACTIVO = os.environ.get('DJANGO_PERFILADO', '') == '1'
+PERFILADO_MUESTREO = float(os.environ.get('DJANGO_PERFILADO_MUESTREO', '0.1'))
+PERFILADO_SERVER_TIMING = True
+PERFILADO_VOLCADO_SEGUNDOS = 30
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
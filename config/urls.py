@@ -3,7 +3,7 @@ from django.urls import path
 from django.contrib.auth import views as auth_views
 from django.conf import settings
 from django.conf.urls.static import static
-from productos import views
+from productos import api, views
 
 urlpatterns = [
     # Admin
@@ -12,10 +12,19 @@ urlpatterns = [
     # Productos
     path('', views.lista_productos, name='lista_productos'),
     path('productos/<int:pk>/', views.detalle_producto, name='detalle_producto'),
+    path('productos/exportar/', views.exportar_catalogo, name='exportar_catalogo'),
     path('productos/agregar/', views.agregar_producto, name='agregar_producto'),
     path('productos/<int:pk>/editar/', views.editar_producto, name='editar_producto'),
     path('productos/<int:pk>/eliminar/', views.eliminar_producto, name='eliminar_producto'),
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('media/derivados/<path:ruta>', views.imagen_derivada, name='imagen_derivada'),
+
+    # API JSON
+    path('api/productos/', api.productos_api, name='api_productos'),
+    path('api/productos/lote/', api.productos_api_lote, name='api_productos_lote'),
+    path('api/productos/cambios/', api.cambios_api, name='api_cambios'),
+    path('api/productos/cambios/stream/', api.cambios_stream, name='api_cambios_stream'),
+    path('api/productos/<int:pk>/', api.producto_api, name='api_producto'),
 
     # Autenticación
     path('accounts/login/', auth_views.LoginView.as_view(), name='login'),
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# Carga la lista de contraseñas comunes antes de la primera petición de registro
+from productos.forms import precargar_validadores_contrasena  # noqa: E402
+
+precargar_validadores_contrasena()
@@ -1,30 +1,41 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin.utils import model_ngettext
 from django.contrib.auth.models import User
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import Producto
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.db.models import Count, Q
+from django.http import Http404, HttpResponseRedirect
+from django.urls import path
+from django.utils.translation import ngettext
+from .forms import FormularioConVersion
+from .models import ConflictoVersion, Producto
+from . import concurrencia, eliminacion, imagenes, importacion
 
 @admin.register(Producto)
 class ProductoAdmin(admin.ModelAdmin):
     list_display = ['nombre', 'precio', 'stock', 'activo', 'tiene_imagen', 'usuario_creador', 'fecha_creacion']
     list_filter = ['activo', 'fecha_creacion']
-    search_fields = ['nombre', 'descripcion']
+    search_fields = ['codigo', 'nombre', 'descripcion']
     list_editable = ['precio', 'stock', 'activo']
     readonly_fields = ['fecha_creacion', 'usuario_creador', 'vista_previa_imagen']
     date_hierarchy = 'fecha_creacion'
+    actions = ['exportar_csv', 'exportar_ndjson']
+    form = FormularioConVersion
 
     fieldsets = (
         ('Información Básica', {
-            'fields': ('nombre', 'descripcion')
+            'fields': ('codigo', 'nombre', 'descripcion')
         }),
         ('Precios e Inventario', {
             'fields': ('precio', 'stock')
         }),
         ('Estado', {
-            'fields': ('activo',)
+            'fields': ('activo', 'version')
         }),
         ('Imagen', {
-            'fields': ('imagen_url', 'vista_previa_imagen'),
-            'description': 'Proporciona la URL de una imagen externa.'
+            'fields': ('imagen_url', 'imagen', 'vista_previa_imagen'),
+            'description': 'Proporciona la URL de una imagen externa o sube un archivo.'
         }),
         ('Metadatos', {
             'fields': ('fecha_creacion', 'usuario_creador'),
@@ -39,9 +50,10 @@ class ProductoAdmin(admin.ModelAdmin):
     def vista_previa_imagen(self, obj):
         if obj.get_imagen():
             from django.utils.html import format_html
+            imagenes.adjuntar_miniaturas([obj], 'admin')
             return format_html(
                 '<img src="{}" style="max-height: 200px; max-width: 300px; object-fit: contain;" />',
-                obj.get_imagen()
+                obj.miniatura
             )
         return "Sin imagen"
     vista_previa_imagen.short_description = 'Vista Previa'
@@ -49,14 +61,136 @@ class ProductoAdmin(admin.ModelAdmin):
     def save_model(self, request, obj, form, change):
         if not change:
             obj.usuario_creador = request.user
-        super().save_model(request, obj, form, change)
+            super().save_model(request, obj, form, change)
+        elif getattr(request, '_cambios_lote', None) is not None:
+            # Edición desde el listado: se junta y se guarda en un solo UPDATE
+            request._cambios_lote.append((obj, form.campos_modificados()))
+        else:
+            obj.save(update_fields=form.campos_modificados())
+
+    def delete_model(self, request, obj):
+        eliminacion.dar_de_baja(Producto.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        # Acción "eliminar seleccionados": un UPDATE; purgar_productos borra las filas después
+        eliminacion.dar_de_baja(queryset)
+
+    def get_changelist_form(self, request, **kwargs):
+        kwargs.setdefault('form', FormularioConVersion)
+        return super().get_changelist_form(request, **kwargs)
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method != 'POST' or '_save' not in request.POST:
+            return super().changelist_view(request, extra_context)
+        # Guardado de list_editable: el registro y el aviso de éxito esperan a saber qué filas se guardaron
+        request._cambios_lote, request._registros_lote = [], []
+        with transaction.atomic():
+            respuesta = super().changelist_view(request, extra_context)
+            conflictos = concurrencia.guardar_lote(request._cambios_lote)
+            omitidos = {producto.pk for producto in conflictos}
+            guardados = [(obj, mensaje) for obj, mensaje in request._registros_lote if obj.pk not in omitidos]
+            for obj, mensaje in guardados:
+                super().log_change(request, obj, mensaje)
+        request._cambios_lote = None
+        if guardados:
+            cantidad = len(guardados)
+            self.message_user(request, ngettext(
+                '%(count)s %(name)s was changed successfully.',
+                '%(count)s %(name)s were changed successfully.',
+                cantidad,
+            ) % {'count': cantidad, 'name': model_ngettext(self.opts, cantidad)}, messages.SUCCESS)
+        for producto in conflictos:
+            self.message_user(
+                request,
+                f'"{producto}" no se guardó: otro usuario lo modificó al mismo tiempo. Revisa el valor actual.',
+                messages.ERROR,
+            )
+        return respuesta
+
+    def log_change(self, request, obj, message):
+        if getattr(request, '_cambios_lote', None) is not None:
+            request._registros_lote.append((obj, message))
+            return None
+        return super().log_change(request, obj, message)
+
+    def message_user(self, request, message, level=messages.INFO, *args, **kwargs):
+        if getattr(request, '_cambios_lote', None) is not None and level == messages.SUCCESS:
+            # El aviso de Django contaría también las filas en conflicto
+            return
+        super().message_user(request, message, level, *args, **kwargs)
+
+    def changeform_view(self, request, object_id=None, form_url='', extra_context=None):
+        try:
+            return super().changeform_view(request, object_id, form_url, extra_context)
+        except ConflictoVersion:
+            self.message_user(
+                request, 'Otro usuario guardó este producto hace un instante; revisa sus cambios.', messages.ERROR
+            )
+            return HttpResponseRedirect(request.get_full_path())
+
+    def exportar_csv(self, request, queryset):
+        return importacion.respuesta_exportacion(queryset, 'csv')
+    exportar_csv.short_description = 'Exportar seleccionados a CSV'
+
+    def exportar_ndjson(self, request, queryset):
+        return importacion.respuesta_exportacion(queryset, 'json')
+    exportar_ndjson.short_description = 'Exportar seleccionados a NDJSON'
+
+    def get_urls(self):
+        return [
+            path('exportar/<str:formato>/', self.admin_site.admin_view(self.exportar_vista),
+                 name='productos_producto_exportar'),
+        ] + super().get_urls()
+
+    def exportar_vista(self, request, formato):
+        """Exporta todo el listado con los filtros y la búsqueda actuales (?q=, list_filter, fechas)"""
+        if formato not in importacion.TIPOS_EXPORTACION:
+            raise Http404
+        if not self.has_view_or_change_permission(request):
+            raise PermissionDenied
+        queryset = self.get_changelist_instance(request).get_queryset(request)
+        return importacion.respuesta_exportacion(queryset, formato)
+
+class ProductosCreadosFilter(admin.SimpleListFilter):
+    title = 'productos creados'
+    parameter_name = 'productos'
+
+    # (valor, etiqueta, mínimo, máximo) sobre la anotación num_productos
+    RANGOS = (
+        ('0', 'Ninguno', 0, 0),
+        ('1-10', 'De 1 a 10', 1, 10),
+        ('11-100', 'De 11 a 100', 11, 100),
+        ('100+', 'Más de 100', 101, None),
+    )
+
+    def lookups(self, request, model_admin):
+        return [(valor, etiqueta) for valor, etiqueta, _, _ in self.RANGOS]
+
+    def queryset(self, request, queryset):
+        for valor, _, minimo, maximo in self.RANGOS:
+            if self.value() == valor:
+                queryset = queryset.filter(num_productos__gte=minimo)
+                if maximo is not None:
+                    queryset = queryset.filter(num_productos__lte=maximo)
+                return queryset
+        return queryset
+
 
 class UserAdminCustom(BaseUserAdmin):
     list_display = ['username', 'email', 'first_name', 'last_name', 'is_staff', 'productos_creados']
+    list_filter = BaseUserAdmin.list_filter + (ProductosCreadosFilter,)
+
+    def get_queryset(self, request):
+        # Un solo COUNT agrupado para toda la página en vez de uno por fila
+        # La relación inversa no pasa por Producto.objects: las bajas lógicas se excluyen aquí
+        return super().get_queryset(request).annotate(
+            num_productos=Count('producto', filter=Q(producto__fecha_eliminacion__isnull=True))
+        )
 
     def productos_creados(self, obj):
-        return Producto.objects.filter(usuario_creador=obj).count()
+        return obj.num_productos
     productos_creados.short_description = 'Productos'
+    productos_creados.admin_order_field = 'num_productos'
 
 admin.site.unregister(User)
 admin.site.register(User, UserAdminCustom)
@@ -0,0 +1,331 @@
+"""
+API JSON de productos.
+
+    GET    /api/productos/          catálogo paginado por cursor (?cursor=, ?por_pagina=)
+    POST   /api/productos/          crea un producto
+    GET    /api/productos/<id>/     un producto
+    PATCH  /api/productos/<id>/     edita los campos enviados
+    DELETE /api/productos/<id>/     baja lógica (productos/eliminacion.py)
+    POST   /api/productos/lote/     upsert masivo por `codigo` (lista de objetos)
+    GET    /api/productos/cambios/  registro de cambios (?since=<seq>), y en
+           /api/productos/cambios/stream/ como Server-Sent Events (productos/cambios.py)
+
+`?fields=nombre,precio` limita los campos de la respuesta y las columnas de
+la consulta (.only()). Las lecturas envían un ETag fuerte (y Last-Modified
+en el detalle) calculado con una consulta mínima, así que un sondeo sin
+cambios responde 304 sin cargar los productos ni serializarlos. En PATCH y
+DELETE, If-Match con el ETag leído evita pisar cambios ajenos (412).
+
+Los anónimos y usuarios ven los productos activos; el staff ve todos. Las
+escrituras usan la sesión de Django (con CSRF) y los mismos permisos y
+validaciones que las vistas HTML y la importación masiva.
+"""
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+from django.forms.models import model_to_dict
+from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.http import condition, require_GET, require_POST
+
+from . import cambios, eliminacion, importacion
+from .enrutador import lectura_en_replica
+from .forms import ProductoForm
+from .models import ConflictoVersion, Producto
+from .paginacion import CursorInvalido, ORDEN_CATALOGO, paginar_por_cursor
+from .serializacion import CAMPOS_API, columnas, serializar
+
+# Lo que PATCH completa con los valores actuales antes de validar con ProductoForm
+CAMPOS_EDITABLES = [campo for campo in ProductoForm._meta.fields if campo != 'imagen']
+
+
+class SolicitudInvalida(ValueError):
+    """Error del cliente: se responde 400 con el mensaje"""
+
+
+def _error(mensaje, estado, **extra):
+    return JsonResponse({'error': mensaje, **extra}, status=estado)
+
+
+def _api(vista):
+    """Traduce SolicitudInvalida a una respuesta 400 en JSON"""
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        try:
+            return vista(request, *args, **kwargs)
+        except SolicitudInvalida as error:
+            return _error(str(error), 400)
+    return envoltura
+
+
+def _leer_json(request):
+    try:
+        return json.loads(request.body)
+    except (ValueError, UnicodeDecodeError) as error:
+        raise SolicitudInvalida('El cuerpo no es JSON válido') from error
+
+
+def campos_pedidos(request):
+    """Campos de ?fields= (todos si no viene), en el orden de CAMPOS_API"""
+    valor = request.GET.get('fields')
+    if not valor:
+        return list(CAMPOS_API)
+    pedidos = {campo.strip() for campo in valor.split(',') if campo.strip()}
+    desconocidos = pedidos - CAMPOS_API.keys()
+    if desconocidos:
+        raise SolicitudInvalida(f'Campos desconocidos: {", ".join(sorted(desconocidos))}')
+    return [campo for campo in CAMPOS_API if campo in pedidos]
+
+
+def _visibles(request):
+    productos = Producto.objects.all()
+    if not request.user.is_staff:
+        productos = productos.filter(activo=True)
+    return productos
+
+
+def _puede_editar(usuario, producto):
+    return usuario.is_superuser or producto.usuario_creador_id == usuario.pk
+
+
+def _huella(*partes):
+    return hashlib.sha1(repr(partes).encode()).hexdigest()[:16]
+
+
+def _etag(pk, version, campos=None):
+    # Legible (id y versión) y distinto por cada representación de ?fields=
+    etag = f'{pk}-{version}'
+    return f'{etag}-{_huella(campos)}' if campos else etag
+
+
+# Validadores para @condition: una consulta mínima, reutilizada entre ETag y Last-Modified
+
+def _estado_producto(request, pk):
+    if not hasattr(request, '_estado_producto'):
+        request._estado_producto = _visibles(request).filter(pk=pk).values_list(
+            'version', 'fecha_modificacion'
+        ).first()
+    return request._estado_producto
+
+
+def etag_producto(request, pk):
+    estado = _estado_producto(request, pk)
+    return _etag(pk, estado[0], request.GET.get('fields')) if estado else None
+
+
+def modificacion_producto(request, pk):
+    estado = _estado_producto(request, pk)
+    return estado[1] if estado else None
+
+
+def etag_catalogo(request):
+    # Cantidad y última modificación cambian con cualquier alta, edición o
+    # baja. Sin Last-Modified: una baja no mueve la fecha y un
+    # If-Modified-Since solo daría un 304 falso.
+    estado = _visibles(request).aggregate(total=Count('pk'), ultima=Max('fecha_modificacion'))
+    parametros = [request.GET.get(nombre, '') for nombre in ('cursor', 'por_pagina', 'fields')]
+    return _huella(estado['total'], estado['ultima'], request.user.is_staff, *parametros)
+
+
+def _respuesta_producto(producto, estado=200):
+    respuesta = JsonResponse(serializar(producto, CAMPOS_API), status=estado)
+    respuesta['ETag'] = f'"{_etag(producto.pk, producto.version)}"'
+    return respuesta
+
+
+def _requiere_sesion(vista):
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return _error('Autenticación requerida', 401)
+        return vista(request, *args, **kwargs)
+    return envoltura
+
+
+@lectura_en_replica
+@condition(etag_func=etag_catalogo)
+def _listar(request):
+    campos = campos_pedidos(request)
+    productos = _visibles(request).only(*columnas(campos, ORDEN_CATALOGO))
+    try:
+        pagina = paginar_por_cursor(productos, request.GET.get('cursor'), request.GET.get('por_pagina'))
+    except CursorInvalido:
+        raise SolicitudInvalida('Cursor inválido') from None
+    return JsonResponse({
+        'resultados': [serializar(producto, campos) for producto in pagina],
+        'siguiente': pagina.siguiente,
+        'anterior': pagina.anterior,
+    })
+
+
+@_requiere_sesion
+def _crear(request):
+    datos = _leer_json(request)
+    if not isinstance(datos, dict):
+        raise SolicitudInvalida('Se esperaba un objeto JSON')
+    datos.setdefault('activo', True)
+    form = ProductoForm(datos)
+    if not form.is_valid():
+        return _error('Datos inválidos', 400, errores=form.errors.get_json_data())
+    producto = form.save(commit=False)
+    producto.usuario_creador = request.user
+    producto.save()
+    respuesta = _respuesta_producto(producto, 201)
+    respuesta['Location'] = reverse('api_producto', args=[producto.pk])
+    return respuesta
+
+
+@_api
+def productos_api(request):
+    """Colección de productos: GET lista, POST crea"""
+    if request.method in ('GET', 'HEAD'):
+        return _listar(request)
+    if request.method == 'POST':
+        return _crear(request)
+    return HttpResponseNotAllowed(['GET', 'HEAD', 'POST'])
+
+
+@lectura_en_replica
+@condition(etag_func=etag_producto, last_modified_func=modificacion_producto)
+def _leer(request, pk):
+    campos = campos_pedidos(request)
+    producto = get_object_or_404(_visibles(request).only(*columnas(campos)), pk=pk)
+    return JsonResponse(serializar(producto, campos))
+
+
+@_requiere_sesion
+@condition(etag_func=etag_producto)
+def _escribir(request, pk):
+    producto = get_object_or_404(_visibles(request), pk=pk)
+    if not _puede_editar(request.user, producto):
+        return _error('No tienes permiso para modificar este producto', 403)
+
+    if request.method == 'DELETE':
+        eliminacion.dar_de_baja(Producto.objects.filter(pk=producto.pk))
+        return HttpResponse(status=204)
+
+    datos = _leer_json(request)
+    if not isinstance(datos, dict):
+        raise SolicitudInvalida('Se esperaba un objeto JSON')
+    # Sin `version` en el cuerpo se toma la leída ahora (If-Match ya la comprobó)
+    datos = {**model_to_dict(producto, fields=CAMPOS_EDITABLES), 'version': producto.version, **datos}
+    form = ProductoForm(datos, instance=producto)
+    if not form.is_valid():
+        estado = 409 if form.conflicto else 400
+        return _error('Datos inválidos', estado, errores=form.errors.get_json_data())
+    try:
+        with transaction.atomic():
+            form.save()
+    except ConflictoVersion:
+        return _error('Otro usuario modificó el producto al mismo tiempo', 409)
+    return _respuesta_producto(producto)
+
+
+@_api
+def producto_api(request, pk):
+    """Un producto: GET, PATCH o DELETE"""
+    if request.method in ('GET', 'HEAD'):
+        return _leer(request, pk)
+    if request.method in ('PATCH', 'DELETE'):
+        return _escribir(request, pk)
+    return HttpResponseNotAllowed(['GET', 'HEAD', 'PATCH', 'DELETE'])
+
+
+@_api
+@require_POST
+@_requiere_sesion
+def productos_api_lote(request):
+    """
+    Upsert de una lista de productos: los que traen `codigo` se crean o
+    actualizan por ese campo, el resto se crea. Cada fila se valida con las
+    reglas de ProductoForm (las de la importación masiva); las inválidas se
+    informan y no detienen al resto. Las estadísticas se ajustan por deltas,
+    así que el costo depende del tamaño del lote y no del de la tabla.
+    """
+    if not request.user.has_perms(['productos.add_producto', 'productos.change_producto']):
+        return _error('No tienes permiso para importar productos', 403)
+    filas = _leer_json(request)
+    if not isinstance(filas, list) or not all(isinstance(fila, dict) for fila in filas):
+        raise SolicitudInvalida('Se esperaba una lista de objetos JSON')
+    maximo = getattr(settings, 'API_LOTE_MAXIMO', 1000)
+    if len(filas) > maximo:
+        raise SolicitudInvalida(f'Como máximo {maximo} productos por lote')
+
+    errores = []
+    resultado = importacion.importar(
+        filas, request.user, lote=maximo, al_fallar=lambda fila, mensaje: errores.append(
+            {'fila': fila, 'error': mensaje}
+        ),
+    )
+    return JsonResponse({
+        'procesadas': resultado['procesadas'],
+        'guardadas': resultado['guardadas'],
+        'errores': errores,
+    })
+
+
+def _posicion(valor):
+    try:
+        posicion = int(valor)
+    except (TypeError, ValueError):
+        raise SolicitudInvalida('La posición debe ser un número entero') from None
+    if posicion < 0:
+        raise SolicitudInvalida('La posición no puede ser negativa')
+    return posicion
+
+
+@_api
+@require_GET
+def cambios_api(request):
+    """
+    Entradas del registro posteriores a ?since=<seq>, de a CAMBIOS_PAGINA
+    (`mas` indica que hay que volver a pedir desde `ultimo`). Sin since
+    responde solo la posición actual: desde ahí se sigue el registro después
+    de una sincronización completa con /api/productos/.
+    """
+    if 'since' not in request.GET:
+        return JsonResponse({'cambios': [], 'ultimo': cambios.ultima_posicion(), 'mas': False})
+    desde = _posicion(request.GET['since'])
+    try:
+        lote = cambios.leer(desde)
+    except cambios.RegistroCompactado as error:
+        return _error(str(error), 410, horizonte=error.horizonte)
+    staff = request.user.is_staff
+    return JsonResponse({
+        'cambios': [cambios.visible(entrada, staff) for entrada in lote],
+        'ultimo': lote[-1]['seq'] if lote else desde,
+        'mas': len(lote) == cambios.tamano_pagina(),
+    })
+
+
+@require_GET
+async def cambios_stream(request):
+    """
+    Server-Sent Events con las entradas del registro desde Last-Event-ID,
+    ?since= o, si no vienen, desde ahora. La conexión se cierra cada
+    CAMBIOS_SSE_SEGUNDOS y el navegador se reconecta donde quedó;
+    ?seguir=0 envía lo pendiente y cierra.
+    """
+    valor = request.headers.get('Last-Event-ID') or request.GET.get('since')
+    try:
+        desde = _posicion(valor) if valor is not None else await cambios.aultima_posicion()
+    except SolicitudInvalida as error:
+        return _error(str(error), 400)
+    horizonte = await cambios.ahorizonte()
+    if desde < horizonte:
+        return _error(str(cambios.RegistroCompactado(horizonte)), 410, horizonte=horizonte)
+
+    usuario = await request.auser()
+    flujo = cambios.flujo_sse(
+        desde, getattr(settings, 'CAMBIOS_SSE_SEGUNDOS', 300), usuario.is_staff, request.GET.get('seguir') != '0'
+    )
+    respuesta = StreamingHttpResponse(flujo, content_type='text/event-stream')
+    respuesta['Cache-Control'] = 'no-cache'
+    # Sin búfer en nginx: cada evento sale apenas se genera
+    respuesta['X-Accel-Buffering'] = 'no'
+    return respuesta
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class ProductosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'productos'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import conexiones, estaticos, perfilado, signals  # noqa: F401
+        connection_created.connect(conexiones.configurar_sqlite, dispatch_uid='configurar_sqlite')
+        connection_created.connect(perfilado.instalar, dispatch_uid='perfilado_consultas')
@@ -0,0 +1,416 @@
+import io
+import json
+import resource
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from asgiref.sync import async_to_sync
+
+from django.contrib.auth.models import Permission, User
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+from django.urls import URLPattern, get_resolver, reverse
+
+from .models import Producto
+
+_entorno_listo = False
+
+
+def cliente_de_prueba():
+    """Cliente de pruebas utilizable fuera del test runner (habilita 'testserver')"""
+    global _entorno_listo
+    if not _entorno_listo:
+        try:
+            setup_test_environment()
+        except RuntimeError:
+            # Ya lo preparó el test runner
+            pass
+        _entorno_listo = True
+    return Client()
+
+
+def sembrar_productos(cantidad, usuario=None, lote=1000):
+    """Crea `cantidad` productos de prueba en lotes con bulk_create"""
+    creados = 0
+    while creados < cantidad:
+        n = min(lote, cantidad - creados)
+        Producto.objects.bulk_create([
+            Producto(
+                nombre=f'Producto {creados + i}',
+                descripcion=f'Descripción del producto de prueba número {creados + i}',
+                precio=(creados + i) % 1000 + 1,
+                stock=(creados + i) % 50,
+                imagen_url=f'https://picsum.photos/seed/{creados + i}/400/300',
+                usuario_creador=usuario,
+            )
+            for i in range(n)
+        ])
+        creados += n
+    return creados
+
+
+def percentiles(tiempos):
+    """p50, p95, p99 y máximo de una lista de latencias en ms"""
+    tiempos = sorted(tiempos)
+
+    def percentil(p):
+        return tiempos[min(len(tiempos) - 1, int(len(tiempos) * p))]
+
+    return {
+        'p50': statistics.median(tiempos),
+        'p95': percentil(0.95),
+        'p99': percentil(0.99),
+        'max': tiempos[-1],
+    }
+
+
+def medir(funcion, repeticiones=20):
+    """Ejecuta `funcion` varias veces y retorna percentiles de latencia en ms"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return percentiles(tiempos)
+
+
+def rss_maximo_mb():
+    """Memoria residente máxima del proceso hasta ahora (ru_maxrss está en KB en Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# Benchmark de rutas -----------------------------------------------------------
+
+CLAVE_BENCHMARK = 'clave-benchmark-123'
+# Token CSRF fijo para los POST contra el servidor WSGI (cookie + cabecera)
+TOKEN_CSRF = 'b' * 32
+
+
+class Escenario:
+    """Usuarios y productos sembrados que necesitan los casos del benchmark de rutas"""
+
+    def __init__(self, usuarios=10):
+        from . import imagenes
+
+        self.usuario = User.objects.create_user('benchmark', password=CLAVE_BENCHMARK, first_name='Bench')
+        self.usuario.user_permissions.add(Permission.objects.get(codename='puede_ver_estadisticas'))
+        self.admin = User.objects.create_superuser('benchmark-admin', password=CLAVE_BENCHMARK)
+        self.vendedores = [self.usuario] + User.objects.bulk_create(
+            [User(username=f'vendedor{i}') for i in range(max(usuarios - 1, 0))]
+        )
+        self.producto = Producto.objects.create(
+            nombre='Producto de referencia', descripcion='Detalle y edición', precio=100,
+            stock=10, usuario_creador=self.usuario,
+        )
+        self.total = 1
+        self.contador = 0
+
+        from PIL import Image
+
+        png = io.BytesIO()
+        Image.new('RGB', (800, 600), 'teal').save(png, 'PNG')
+        contenido = imagenes.generar_derivados(png.getvalue())
+        self.derivado = imagenes.ruta_relativa(contenido, 'tarjeta', imagenes._formato()).split('/', 1)[1]
+
+    def ampliar(self, productos):
+        """Completa hasta `productos` repartidos entre los vendedores"""
+        from . import estadisticas
+        from .busqueda import obtener_backend
+
+        faltan = productos - self.total
+        for i, vendedor in enumerate(self.vendedores):
+            cantidad = faltan // len(self.vendedores) + (1 if i < faltan % len(self.vendedores) else 0)
+            if cantidad > 0:
+                sembrar_productos(cantidad, usuario=vendedor)
+        self.total = max(self.total, productos)
+        # bulk_create no dispara señales
+        obtener_backend().reconstruir()
+        estadisticas.reconstruir()
+
+    def siguiente(self):
+        self.contador += 1
+        return self.contador
+
+    def producto_desechable(self):
+        return Producto.objects.create(
+            nombre='Desechable', descripcion='Se elimina en el caso', precio=1, usuario_creador=self.usuario
+        ).pk
+
+
+def _datos_producto(escenario):
+    return {'nombre': f'Nuevo {escenario.siguiente()}', 'descripcion': 'Creado por el benchmark',
+            'precio': '1990', 'stock': '5', 'activo': 'on'}
+
+
+def _datos_registro(escenario):
+    n = escenario.siguiente()
+    return {'username': f'registro{n}', 'email': f'registro{n}@ejemplo.cl', 'first_name': 'Ana',
+            'last_name': 'Pérez', 'password1': 'Clave-Segura-2024', 'password2': 'Clave-Segura-2024'}
+
+
+def _datos_lote(escenario):
+    n = escenario.siguiente()
+    return [{'codigo': f'BENCH-{n}-{i}', 'nombre': f'Lote {n}', 'descripcion': 'Upsert del benchmark',
+             'precio': '990', 'stock': '3'} for i in range(10)]
+
+
+# (caso, nombre de la ruta, método, sesión, argumentos(escenario), datos(escenario), estado esperado)
+# sesión: None (anónima), 'usuario', 'admin' o 'nueva' (un login fresco por repetición)
+# Los datos en una lista se envían como cuerpo JSON
+CASOS_RUTAS = [
+    ('catalogo', 'lista_productos', 'GET', None, None, None, 200),
+    ('catalogo_busqueda', 'lista_productos', 'GET', None, None, lambda e: {'q': 'producto 42'}, 200),
+    ('catalogo_autenticado', 'lista_productos', 'GET', 'usuario', None, None, 200),
+    ('detalle', 'detalle_producto', 'GET', 'usuario', lambda e: [e.producto.pk], None, 200),
+    ('agregar_form', 'agregar_producto', 'GET', 'usuario', None, None, 200),
+    ('agregar', 'agregar_producto', 'POST', 'usuario', None, _datos_producto, 302),
+    ('editar_form', 'editar_producto', 'GET', 'usuario', lambda e: [e.producto.pk], None, 200),
+    ('editar', 'editar_producto', 'POST', 'usuario', lambda e: [e.producto.pk], _datos_producto, 302),
+    ('eliminar_form', 'eliminar_producto', 'GET', 'usuario', lambda e: [e.producto.pk], None, 200),
+    ('eliminar', 'eliminar_producto', 'POST', 'usuario', lambda e: [e.producto_desechable()], None, 302),
+    ('exportar', 'exportar_catalogo', 'GET', 'usuario', None, lambda e: {'q': 'producto 42'}, 200),
+    ('dashboard', 'dashboard', 'GET', 'usuario', None, None, 200),
+    ('imagen_derivada', 'imagen_derivada', 'GET', None, lambda e: [e.derivado], None, 200),
+    ('login_form', 'login', 'GET', None, None, None, 200),
+    ('login', 'login', 'POST', None, None,
+     lambda e: {'username': 'benchmark', 'password': CLAVE_BENCHMARK}, 302),
+    ('logout', 'logout', 'GET', 'nueva', None, None, 302),
+    ('registro_form', 'registro', 'GET', None, None, None, 200),
+    ('registro', 'registro', 'POST', None, None, _datos_registro, 302),
+    ('admin_indice', 'admin:index', 'GET', 'admin', None, None, 200),
+    ('admin_productos', 'admin:productos_producto_changelist', 'GET', 'admin', None, None, 200),
+    ('admin_usuarios', 'admin:auth_user_changelist', 'GET', 'admin', None, None, 200),
+    ('api_catalogo', 'api_productos', 'GET', None, None, lambda e: {'fields': 'id,nombre,precio'}, 200),
+    ('api_detalle', 'api_producto', 'GET', None, lambda e: [e.producto.pk], None, 200),
+    ('api_lote', 'api_productos_lote', 'POST', 'admin', None, _datos_lote, 200),
+    ('api_cambios', 'api_cambios', 'GET', None, None, lambda e: {'since': 0}, 200),
+    ('api_cambios_stream', 'api_cambios_stream', 'GET', None, None, lambda e: {'since': 0, 'seguir': 0}, 200),
+]
+
+
+def rutas_sin_caso():
+    """Nombres de rutas de config/urls.py (sin el admin) que ningún caso cubre"""
+    nombres = {patron.name for patron in get_resolver().url_patterns
+               if isinstance(patron, URLPattern) and patron.name}
+    return nombres - {caso[1] for caso in CASOS_RUTAS}
+
+
+class _ClientePruebas:
+    """Ejecuta los casos con el cliente de pruebas de Django, contando consultas"""
+    modo = 'cliente'
+
+    def __init__(self, escenario):
+        self.escenario = escenario
+        self.clientes = {None: cliente_de_prueba(), 'usuario': Client(), 'admin': Client()}
+        self.clientes['usuario'].force_login(escenario.usuario)
+        self.clientes['admin'].force_login(escenario.admin)
+
+    def preparar(self, sesion):
+        if sesion == 'nueva':
+            cliente = Client()
+            cliente.force_login(self.escenario.usuario)
+            return cliente
+        return self.clientes[sesion]
+
+    def pedir(self, cliente, metodo, url, datos):
+        with CaptureQueriesContext(connection) as consultas:
+            if metodo == 'POST' and isinstance(datos, list):
+                respuesta = cliente.post(url, json.dumps(datos), content_type='application/json')
+            elif metodo == 'POST':
+                respuesta = cliente.post(url, datos or {})
+            else:
+                respuesta = cliente.get(url, datos or {})
+            if getattr(respuesta, 'is_async', False):
+                # Vistas asíncronas en streaming (SSE): el contenido es un iterador asíncrono
+                async_to_sync(_consumir)(respuesta.streaming_content)
+            elif respuesta.streaming:
+                b''.join(respuesta.streaming_content)
+        return respuesta.status_code, len(consultas)
+
+
+async def _consumir(contenido):
+    return b''.join([parte async for parte in contenido])
+
+
+class _SinRedirecciones(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+_abridor = urllib.request.build_opener(_SinRedirecciones)
+
+
+class _Silencioso(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class _ServidorConHilos(WSGIServer):
+    """WSGIServer que atiende con un pool fijo de hilos; cada hilo conserva su conexión a la BD"""
+    hilos = 1
+
+    def server_activate(self):
+        super().server_activate()
+        self.pool = ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix='wsgi')
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._atender, request, client_address)
+
+    def _atender(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def cerrar(self):
+        self.shutdown()
+        # Una tarea por hilo (la barrera lo garantiza) para cerrar sus conexiones
+        barrera = threading.Barrier(self.hilos)
+
+        def cerrar_conexiones():
+            connections.close_all()
+            barrera.wait(timeout=10)
+
+        for _ in range(self.hilos):
+            self.pool.submit(cerrar_conexiones)
+        self.pool.shutdown(wait=True)
+        self.server_close()
+
+
+def iniciar_servidor_wsgi(hilos=1):
+    """Levanta la aplicación en un puerto libre de 127.0.0.1; detener con servidor.cerrar()"""
+    clase = type('ServidorWSGI', (_ServidorConHilos,), {'hilos': hilos})
+    servidor = make_server('127.0.0.1', 0, WSGIHandler(), server_class=clase, handler_class=_Silencioso)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    servidor.base = f'http://127.0.0.1:{servidor.server_port}'
+    return servidor
+
+
+def sesion_de(usuario):
+    """Valor de la cookie sessionid de una sesión iniciada para `usuario`"""
+    cliente = Client()
+    cliente.force_login(usuario)
+    return cliente.cookies['sessionid'].value
+
+
+def peticion_http(base, metodo, url, datos=None, sesion=None, timeout=60):
+    """Petición HTTP real sin seguir redirecciones; retorna el código de estado"""
+    cookies = f'csrftoken={TOKEN_CSRF}'
+    if sesion:
+        cookies += f'; sessionid={sesion}'
+    cabeceras = {'Cookie': cookies, 'X-CSRFToken': TOKEN_CSRF}
+    if isinstance(datos, list):
+        cabeceras['Content-Type'] = 'application/json'
+        cuerpo = json.dumps(datos).encode()
+    else:
+        cuerpo = urllib.parse.urlencode(datos or {}).encode()
+    if metodo == 'GET' and datos:
+        url = f'{url}?{cuerpo.decode()}'
+    peticion = urllib.request.Request(
+        base + url, data=cuerpo if metodo == 'POST' else None, headers=cabeceras, method=metodo
+    )
+    try:
+        with _abridor.open(peticion, timeout=timeout) as respuesta:
+            respuesta.read()
+            return respuesta.status
+    except urllib.error.HTTPError as error:
+        return error.code
+    except OSError:
+        return None
+
+
+class _ClienteWSGI:
+    """Ejecuta los casos por HTTP contra un servidor WSGI real en un hilo"""
+    modo = 'wsgi'
+
+    def __init__(self, escenario):
+        self.escenario = escenario
+        self.servidor = iniciar_servidor_wsgi()
+        self.sesiones = {None: None, 'usuario': sesion_de(escenario.usuario), 'admin': sesion_de(escenario.admin)}
+
+    def cerrar(self):
+        self.servidor.cerrar()
+
+    def preparar(self, sesion):
+        if sesion == 'nueva':
+            return sesion_de(self.escenario.usuario)
+        return self.sesiones[sesion]
+
+    def pedir(self, sesion, metodo, url, datos):
+        return peticion_http(self.servidor.base, metodo, url, datos, sesion), None
+
+
+def ejecutar_casos(escenario, repeticiones=20, modos=('cliente', 'wsgi'), casos=None):
+    """Ejecuta cada caso `repeticiones` veces en cada modo; retorna una fila por caso y modo"""
+    impulsores = {'cliente': _ClientePruebas, 'wsgi': _ClienteWSGI}
+    resultados = []
+    for modo in modos:
+        impulsor = impulsores[modo](escenario)
+        try:
+            for caso, ruta, metodo, sesion, argumentos, datos, esperado in CASOS_RUTAS:
+                if casos and caso not in casos:
+                    continue
+                tiempos, consultas, errores = [], [], 0
+                # Una repetición extra de calentamiento que no se mide
+                for repeticion in range(repeticiones + 1):
+                    url = reverse(ruta, args=argumentos(escenario) if argumentos else None)
+                    cuerpo = datos(escenario) if datos else None
+                    cliente = impulsor.preparar(sesion)
+                    inicio = time.perf_counter()
+                    estado, cantidad = impulsor.pedir(cliente, metodo, url, cuerpo)
+                    transcurrido = (time.perf_counter() - inicio) * 1000
+                    if repeticion == 0:
+                        continue
+                    tiempos.append(transcurrido)
+                    errores += estado != esperado
+                    if cantidad is not None:
+                        consultas.append(cantidad)
+                resultados.append({
+                    'modo': impulsor.modo,
+                    'caso': caso,
+                    'ruta': ruta,
+                    **percentiles(tiempos),
+                    'consultas': max(consultas) if consultas else None,
+                    'errores': errores,
+                    'rss_mb': rss_maximo_mb(),
+                })
+        finally:
+            if hasattr(impulsor, 'cerrar'):
+                impulsor.cerrar()
+    return resultados
+
+
+def comparar_resultados(base, nuevo, tolerancia=0.2, minimo_ms=1.0):
+    """
+    Compara dos ejecuciones de benchmark_rutas. Retorna una lista de
+    (clave, métrica, antes, después) con las regresiones: p50/p95 más de
+    `tolerancia` por encima (ignorando diferencias bajo `minimo_ms`), más
+    consultas SQL o errores nuevos.
+    """
+    def indexar(datos):
+        return {(fila['escala'], fila['modo'], fila['caso']): fila for fila in datos['resultados']}
+
+    anteriores = indexar(base)
+    regresiones = []
+    for clave, fila in sorted(indexar(nuevo).items(), key=lambda item: str(item[0])):
+        previa = anteriores.get(clave)
+        if previa is None:
+            continue
+        for metrica in ('p50', 'p95'):
+            if fila[metrica] > previa[metrica] * (1 + tolerancia) and fila[metrica] - previa[metrica] >= minimo_ms:
+                regresiones.append((clave, metrica, previa[metrica], fila[metrica]))
+        for metrica in ('consultas', 'errores'):
+            if previa.get(metrica) is not None and fila.get(metrica) is not None \
+                    and fila[metrica] > previa[metrica]:
+                regresiones.append((clave, metrica, previa[metrica], fila[metrica]))
+    return regresiones
@@ -0,0 +1,199 @@
+"""
+Índice de búsqueda de texto completo para el catálogo.
+
+Cada backend mantiene una tabla auxiliar indexada por id de producto y
+expone la misma interfaz: `buscar()` filtra un queryset y lo anota con
+`relevancia` (mayor es mejor), y `actualizar()`/`eliminar()` mantienen el
+índice al día desde las señales de Producto.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q, FloatField, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Producto
+
+# Orden de los resultados de búsqueda para la paginación por cursor
+ORDEN_RELEVANCIA = ('-relevancia', '-pk')
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenizar(texto):
+    return _TOKEN.findall(texto or '')
+
+
+class BusquedaIcontains:
+    """Búsqueda con LIKE '%...%' (sin índice), usada en motores sin soporte"""
+
+    def buscar(self, queryset, texto):
+        queryset = queryset.filter(Q(nombre__icontains=texto) | Q(descripcion__icontains=texto))
+        return queryset.annotate(relevancia=Value(0.0, output_field=FloatField()))
+
+    def actualizar(self, producto):
+        pass
+
+    def actualizar_ids(self, pks):
+        pass
+
+    def eliminar(self, pk):
+        pass
+
+    def eliminar_ids(self, pks):
+        pass
+
+    def reconstruir(self):
+        pass
+
+
+class BusquedaSQLite(BusquedaIcontains):
+    """Tabla virtual FTS5 con tokenizador que ignora tildes y ranking bm25"""
+
+    tabla = 'productos_producto_fts'
+    # Peso de nombre y descripcion en bm25()
+    pesos = (10.0, 1.0)
+
+    def _consulta(self, texto):
+        # Cada término se cita (evita inyectar sintaxis FTS) y se busca por prefijo
+        return ' '.join(f'"{token}"*' for token in tokenizar(texto))
+
+    def buscar(self, queryset, texto):
+        consulta = self._consulta(texto)
+        if not consulta:
+            return super().buscar(queryset, texto)
+        tabla_producto = Producto._meta.db_table
+        # JOIN con la tabla FTS: bm25() se evalúa una sola vez por coincidencia
+        queryset = queryset.extra(
+            tables=[self.tabla],
+            where=[f'{self.tabla}.rowid = {tabla_producto}.id', f'{self.tabla} MATCH %s'],
+            params=[consulta],
+        )
+        relevancia = RawSQL(f'-bm25({self.tabla}, %s, %s)', self.pesos, output_field=FloatField())
+        return queryset.annotate(relevancia=relevancia)
+
+    def actualizar(self, producto):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.tabla} WHERE rowid = %s', [producto.pk])
+            cursor.execute(
+                f'INSERT INTO {self.tabla} (rowid, nombre, descripcion) VALUES (%s, %s, %s)',
+                [producto.pk, producto.nombre, producto.descripcion],
+            )
+
+    def actualizar_ids(self, pks):
+        """Reindexa un lote de productos (p. ej. tras bulk_create) con dos sentencias"""
+        if not pks:
+            return
+        marcadores = ', '.join(['%s'] * len(pks))
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.tabla} WHERE rowid IN ({marcadores})', list(pks))
+            cursor.execute(
+                f'INSERT INTO {self.tabla} (rowid, nombre, descripcion) '
+                f'SELECT id, nombre, descripcion FROM {Producto._meta.db_table} WHERE id IN ({marcadores})',
+                list(pks),
+            )
+
+    def eliminar(self, pk):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.tabla} WHERE rowid = %s', [pk])
+
+    def eliminar_ids(self, pks):
+        if not pks:
+            return
+        marcadores = ', '.join(['%s'] * len(pks))
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.tabla} WHERE rowid IN ({marcadores})', list(pks))
+
+    def reconstruir(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.tabla}')
+            cursor.execute(
+                f'INSERT INTO {self.tabla} (rowid, nombre, descripcion) '
+                f'SELECT id, nombre, descripcion FROM {Producto._meta.db_table}'
+            )
+
+
+class BusquedaPostgres(BusquedaIcontains):
+    """Columna tsvector (configuración 'spanish' + unaccent) con índice GIN"""
+
+    tabla = 'productos_producto_busqueda'
+    documento = (
+        "setweight(to_tsvector('spanish', unaccent(%s)), 'A') || "
+        "setweight(to_tsvector('spanish', unaccent(%s)), 'B')"
+    )
+
+    def _consulta(self, texto):
+        return ' & '.join(f'{token}:*' for token in tokenizar(texto))
+
+    def buscar(self, queryset, texto):
+        consulta = self._consulta(texto)
+        if not consulta:
+            return super().buscar(queryset, texto)
+        tsquery = "to_tsquery('spanish', unaccent(%s))"
+        tabla_producto = Producto._meta.db_table
+        queryset = queryset.extra(
+            tables=[self.tabla],
+            where=[f'{self.tabla}.producto_id = {tabla_producto}.id', f'{self.tabla}.documento @@ {tsquery}'],
+            params=[consulta],
+        )
+        relevancia = RawSQL(
+            f'ts_rank({self.tabla}.documento, {tsquery})::float8', (consulta,), output_field=FloatField()
+        )
+        return queryset.annotate(relevancia=relevancia)
+
+    def actualizar(self, producto):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {self.tabla} (producto_id, documento) VALUES (%s, {self.documento}) '
+                f'ON CONFLICT (producto_id) DO UPDATE SET documento = EXCLUDED.documento',
+                [producto.pk, producto.nombre, producto.descripcion],
+            )
+
+    def _documento_columnas(self):
+        return self.documento.replace('%s', 'nombre', 1).replace('%s', 'descripcion', 1)
+
+    def actualizar_ids(self, pks):
+        if not pks:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {self.tabla} (producto_id, documento) '
+                f'SELECT id, {self._documento_columnas()} FROM {Producto._meta.db_table} WHERE id = ANY(%s) '
+                f'ON CONFLICT (producto_id) DO UPDATE SET documento = EXCLUDED.documento',
+                [list(pks)],
+            )
+
+    def eliminar(self, pk):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.tabla} WHERE producto_id = %s', [pk])
+
+    def eliminar_ids(self, pks):
+        if not pks:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.tabla} WHERE producto_id = ANY(%s)', [list(pks)])
+
+    def reconstruir(self):
+        documento = self._documento_columnas()
+        with connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE {self.tabla}')
+            cursor.execute(
+                f'INSERT INTO {self.tabla} (producto_id, documento) '
+                f'SELECT id, {documento} FROM {Producto._meta.db_table}'
+            )
+
+
+BACKENDS_POR_MOTOR = {
+    'sqlite': BusquedaSQLite,
+    'postgresql': BusquedaPostgres,
+}
+
+
+def obtener_backend():
+    """Backend configurado en CATALOGO_BUSQUEDA_BACKEND o, si no hay, el del motor actual"""
+    ruta = getattr(settings, 'CATALOGO_BUSQUEDA_BACKEND', None)
+    if ruta:
+        return import_string(ruta)()
+    return BACKENDS_POR_MOTOR.get(connection.vendor, BusquedaIcontains)()
@@ -0,0 +1,145 @@
+"""
+Caché del catálogo público y de los fragmentos por producto.
+
+- Páginas completas del catálogo para visitantes anónimos, con clave según
+  la búsqueda, el cursor, el tamaño de página y la versión del catálogo.
+- Fragmentos de tarjeta y de detalle por producto ({% cache %} en las
+  plantillas), que se eliminan solo para el producto modificado.
+
+Cualquier cambio en un Producto incrementa la versión del catálogo, lo que
+deja obsoletas todas las páginas cacheadas sin tener que enumerarlas.
+"""
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.http import HttpResponse
+
+CLAVE_VERSION = 'catalogo:version'
+CLAVE_ACIERTOS = 'catalogo:aciertos'
+CLAVE_FALLOS = 'catalogo:fallos'
+
+# Nombres usados en los {% cache %} de las plantillas
+FRAGMENTOS_PRODUCTO = ('tarjeta_producto', 'detalle_producto')
+
+
+def timeout():
+    return getattr(settings, 'CATALOGO_CACHE_TIMEOUT', 300)
+
+
+def _incrementar(clave):
+    try:
+        return cache.incr(clave)
+    except ValueError:
+        # La clave no existía (o expiró): add() evita pisar un incr concurrente
+        if cache.add(clave, 1, timeout=None):
+            return 1
+        return cache.incr(clave)
+
+
+async def _aincrementar(clave):
+    try:
+        return await cache.aincr(clave)
+    except ValueError:
+        if await cache.aadd(clave, 1, timeout=None):
+            return 1
+        return await cache.aincr(clave)
+
+
+def version_catalogo():
+    return cache.get_or_set(CLAVE_VERSION, 1, timeout=None)
+
+
+async def aversion_catalogo():
+    return await cache.aget_or_set(CLAVE_VERSION, 1, timeout=None)
+
+
+def invalidar_producto(pk):
+    """Elimina los fragmentos del producto y deja obsoletas las páginas del catálogo"""
+    invalidar_productos([pk])
+
+
+def invalidar_productos(pks):
+    """Como invalidar_producto, para un lote (una sola escritura de versión)"""
+    cache.delete_many([
+        make_template_fragment_key(nombre, [pk]) for pk in pks for nombre in FRAGMENTOS_PRODUCTO
+    ])
+    _incrementar(CLAVE_VERSION)
+
+
+def estadisticas():
+    """Contadores de aciertos y fallos de la caché de páginas"""
+    valores = cache.get_many([CLAVE_ACIERTOS, CLAVE_FALLOS])
+    aciertos = valores.get(CLAVE_ACIERTOS, 0)
+    fallos = valores.get(CLAVE_FALLOS, 0)
+    total = aciertos + fallos
+    return {
+        'aciertos': aciertos,
+        'fallos': fallos,
+        'tasa_aciertos': aciertos / total if total else 0.0,
+    }
+
+
+def _clave_pagina(request, version):
+    parametros = '&'.join(
+        f'{nombre}={request.GET.get(nombre, "")}' for nombre in ('q', 'cursor', 'por_pagina')
+    )
+    resumen = hashlib.sha1(parametros.encode()).hexdigest()
+    return f'catalogo:pagina:{version}:{resumen}'
+
+
+def _cacheable(request, usuario):
+    if request.method != 'GET' or usuario.is_authenticated:
+        return False
+    # Los mensajes pendientes (flash) se muestran una sola vez
+    mensajes = getattr(request, '_messages', None)
+    return not mensajes or not len(mensajes)
+
+
+def _guardable(respuesta):
+    return respuesta.status_code == 200 and not respuesta.streaming
+
+
+def cache_pagina_anonima(vista):
+    """Sirve desde la caché las páginas del catálogo pedidas por visitantes anónimos"""
+    if iscoroutinefunction(vista):
+        @wraps(vista)
+        async def envoltura_async(request, *args, **kwargs):
+            if not _cacheable(request, await request.auser()):
+                return await vista(request, *args, **kwargs)
+
+            clave = _clave_pagina(request, await aversion_catalogo())
+            guardada = await cache.aget(clave)
+            if guardada is not None:
+                await _aincrementar(CLAVE_ACIERTOS)
+                contenido, tipo = guardada
+                return HttpResponse(contenido, content_type=tipo)
+
+            await _aincrementar(CLAVE_FALLOS)
+            respuesta = await vista(request, *args, **kwargs)
+            if _guardable(respuesta):
+                await cache.aset(clave, (respuesta.content, respuesta['Content-Type']), timeout())
+            return respuesta
+        return envoltura_async
+
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        if not _cacheable(request, request.user):
+            return vista(request, *args, **kwargs)
+
+        clave = _clave_pagina(request, version_catalogo())
+        guardada = cache.get(clave)
+        if guardada is not None:
+            _incrementar(CLAVE_ACIERTOS)
+            contenido, tipo = guardada
+            return HttpResponse(contenido, content_type=tipo)
+
+        _incrementar(CLAVE_FALLOS)
+        respuesta = vista(request, *args, **kwargs)
+        if _guardable(respuesta):
+            cache.set(clave, (respuesta.content, respuesta['Content-Type']), timeout())
+        return respuesta
+    return envoltura
@@ -0,0 +1,317 @@
+"""
+Registro de cambios de productos (feed) para clientes que necesitan precios
+y stock al día sin volver a pedir el catálogo completo.
+
+Cada alta, edición o baja de un Producto agrega un CambioProducto con la
+representación de la API (productos/serializacion.py); el id de la entrada
+es su posición (seq). Los consumidores piden lo posterior a la última
+posición que vieron:
+
+- GET /api/productos/cambios/?since=<seq>   JSON, por páginas
+- GET /api/productos/cambios/stream/        Server-Sent Events; se reanuda con
+  Last-Event-ID o ?since=. Servir con ASGI: cada conexión es una corrutina.
+
+Las señales de Producto registran save() y delete(); los caminos que no las
+disparan (importación, reservas de stock, edición en lote del admin, bajas
+lógicas) llaman a registrar() o registrar_bajas(). La entrada se escribe en la misma transacción que el cambio.
+
+En cada proceso un único Difusor lee el registro cada
+CAMBIOS_SONDEO_SEGUNDOS y reparte lo nuevo a todas las conexiones SSE: mil
+suscriptores cuestan una consulta por intervalo, no mil.
+
+compactar() (`manage.py compactar_cambios`) acota el tamaño: de lo anterior
+a CAMBIOS_RETENCION_DIAS conserva solo la última entrada de cada producto
+(quien lee desde ahí llega al mismo estado final) y elimina las bajas; si
+aún sobran más de CAMBIOS_MAXIMO, las más antiguas. Cuando se elimina algo
+que un consumidor podría no haber visto se anota una marca de compactación
+y quien pide desde antes recibe RegistroCompactado (410): debe
+resincronizar con /api/productos/.
+
+En SQLite las escrituras están serializadas y las posiciones se hacen
+visibles en orden. Con transacciones concurrentes (PostgreSQL) una posición
+menor puede confirmarse después que una mayor; CAMBIOS_MARGEN_SEGUNDOS
+retiene las entradas más recientes (más que la transacción más larga) para
+que nadie las salte.
+"""
+import asyncio
+import json
+import weakref
+from bisect import bisect_right
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Max, OuterRef, Subquery
+from django.utils import timezone
+
+from .models import CambioProducto, Producto
+from .serializacion import CAMPOS_API, columnas, serializar
+
+# Columnas que registrar() necesita cargadas en cada producto
+COLUMNAS = columnas(CAMPOS_API)
+
+
+class RegistroCompactado(Exception):
+    """Se pidió una posición anterior a la última compactación"""
+
+    def __init__(self, horizonte):
+        self.horizonte = horizonte
+        super().__init__(f'El registro de cambios solo está completo desde la posición {horizonte}')
+
+
+def _ajuste(nombre, por_defecto):
+    return getattr(settings, nombre, por_defecto)
+
+
+def tamano_pagina():
+    return _ajuste('CAMBIOS_PAGINA', 500)
+
+
+# Escritura
+
+def registrar(productos, operacion=CambioProducto.CAMBIO):
+    """Agrega una entrada por producto con su estado actual (en un solo INSERT)"""
+    CambioProducto.objects.bulk_create([
+        CambioProducto(producto_id=producto.pk, operacion=operacion, datos=serializar(producto, CAMPOS_API))
+        for producto in productos
+    ])
+
+
+def registrar_ids(pks, operacion=CambioProducto.CAMBIO):
+    """Como registrar(), leyendo los productos de la base (tras un .update() o un upsert)"""
+    if pks:
+        registrar(Producto.objects.filter(pk__in=list(pks)).only(*COLUMNAS), operacion)
+
+
+def registrar_baja(pk):
+    registrar_bajas([pk])
+
+
+def registrar_bajas(pks):
+    CambioProducto.objects.bulk_create([
+        CambioProducto(producto_id=pk, operacion=CambioProducto.BAJA) for pk in pks
+    ])
+
+
+# Lectura
+
+def _entrada(cambio):
+    return {
+        'seq': cambio.pk,
+        'producto': cambio.producto_id,
+        'operacion': cambio.operacion,
+        'datos': cambio.datos,
+        'fecha': cambio.fecha,
+    }
+
+
+def _posteriores(desde, limite):
+    consulta = CambioProducto.objects.filter(pk__gt=desde).exclude(operacion=CambioProducto.COMPACTACION)
+    margen = _ajuste('CAMBIOS_MARGEN_SEGUNDOS', 0)
+    if margen:
+        consulta = consulta.filter(fecha__lte=timezone.now() - timedelta(seconds=margen))
+    return [_entrada(cambio) for cambio in consulta.order_by('pk')[:limite]]
+
+
+def horizonte():
+    """Posición desde la que el registro está completo (0 si nunca se perdió nada)"""
+    marca = CambioProducto.objects.filter(operacion=CambioProducto.COMPACTACION).order_by('-pk').first()
+    return marca.datos['hasta'] if marca else 0
+
+
+def ultima_posicion():
+    return CambioProducto.objects.aggregate(ultima=Max('pk'))['ultima'] or 0
+
+
+def leer(desde, limite=None):
+    """Hasta `limite` entradas posteriores a `desde`; RegistroCompactado si ya no están todas"""
+    limite_horizonte = horizonte()
+    if desde < limite_horizonte:
+        raise RegistroCompactado(limite_horizonte)
+    return _posteriores(desde, limite or tamano_pagina())
+
+
+aleer = sync_to_async(leer)
+aultima_posicion = sync_to_async(ultima_posicion)
+ahorizonte = sync_to_async(horizonte)
+
+
+def visible(entrada, staff=False):
+    """La entrada como la ve un cliente: sin staff, desactivar un producto es darlo de baja"""
+    if staff or entrada['operacion'] == CambioProducto.BAJA or entrada['datos'].get('activo', True):
+        return entrada
+    return {**entrada, 'operacion': CambioProducto.BAJA, 'datos': None}
+
+
+# Compactación
+
+def compactar(ahora=None):
+    """Acota el tamaño del registro; retorna la cantidad de entradas eliminadas"""
+    ahora = ahora or timezone.now()
+    limite = ahora - timedelta(days=_ajuste('CAMBIOS_RETENCION_DIAS', 7))
+    maximo = _ajuste('CAMBIOS_MAXIMO', 100000)
+    entradas = CambioProducto.objects.exclude(operacion=CambioProducto.COMPACTACION)
+    ultima_del_producto = CambioProducto.objects.filter(
+        producto_id=OuterRef('producto_id')
+    ).order_by('-pk').values('pk')[:1]
+
+    with transaction.atomic():
+        # Reemplazadas por una entrada posterior del mismo producto: nadie pierde información
+        eliminadas = entradas.filter(fecha__lt=limite).exclude(pk=Subquery(ultima_del_producto)).delete()[0]
+
+        # Bajas viejas y lo que exceda el máximo: quien no las vio debe resincronizar
+        bajas = entradas.filter(fecha__lt=limite, operacion=CambioProducto.BAJA)
+        hasta = bajas.aggregate(ultima=Max('pk'))['ultima'] or 0
+        eliminadas += bajas.delete()[0]
+        sobrantes = entradas.count() - maximo
+        if sobrantes > 0:
+            corte = entradas.order_by('pk').values_list('pk', flat=True)[sobrantes - 1]
+            eliminadas += entradas.filter(pk__lte=corte).delete()[0]
+            hasta = max(hasta, corte)
+
+        if hasta > horizonte():
+            CambioProducto.objects.filter(operacion=CambioProducto.COMPACTACION).delete()
+            CambioProducto.objects.create(operacion=CambioProducto.COMPACTACION, datos={'hasta': hasta})
+    return eliminadas
+
+
+# Difusión a las conexiones SSE
+
+class Difusor:
+    """
+    Lee el registro una vez por intervalo y guarda lo reciente en memoria
+    para todos los suscriptores del proceso. `inicio` es la posición desde
+    la que el búfer está completo; quien va más atrás lee de la base.
+    """
+
+    def __init__(self):
+        self.suscriptores = 0
+        self.inicio = None
+        self.ultimo = None
+        self.recientes = []
+        self.posiciones = []
+        self.nuevos = asyncio.Event()
+        self.listo = asyncio.Event()
+        self.tarea = None
+        self.lecturas = 0
+
+    def entrar(self):
+        self.suscriptores += 1
+        if self.tarea is None:
+            self.tarea = asyncio.create_task(self._sondear())
+
+    def salir(self):
+        self.suscriptores -= 1
+        if not self.suscriptores and self.tarea is not None:
+            self.tarea.cancel()
+            self.tarea = None
+
+    async def _sondear(self):
+        try:
+            if self.ultimo is None:
+                self.inicio = self.ultimo = await aultima_posicion()
+                self.listo.set()
+            while True:
+                pagina = tamano_pagina()
+                lote = await sync_to_async(_posteriores)(self.ultimo, pagina)
+                self.lecturas += 1
+                if lote:
+                    self._guardar(lote)
+                if len(lote) < pagina:
+                    await asyncio.sleep(_ajuste('CAMBIOS_SONDEO_SEGUNDOS', 1.0))
+        finally:
+            if self.tarea is asyncio.current_task():
+                self.tarea = None
+
+    def _guardar(self, lote):
+        self.recientes.extend(lote)
+        self.posiciones.extend(entrada['seq'] for entrada in lote)
+        self.ultimo = lote[-1]['seq']
+        maximo = _ajuste('CAMBIOS_DIFUSOR_BUFER', 5000)
+        if len(self.recientes) > maximo:
+            sobran = len(self.recientes) - maximo // 2
+            self.inicio = self.posiciones[sobran - 1]
+            del self.recientes[:sobran], self.posiciones[:sobran]
+        evento, self.nuevos = self.nuevos, asyncio.Event()
+        evento.set()
+
+    def disponibles(self, desde):
+        """Entradas posteriores a `desde` en el búfer, o None si `desde` quedó fuera de él"""
+        if self.inicio is None or desde < self.inicio:
+            return None
+        return self.recientes[bisect_right(self.posiciones, desde):]
+
+    async def esperar(self, segundos):
+        """Espera a la próxima lectura con novedades; False si pasó el tiempo"""
+        try:
+            await asyncio.wait_for(self.nuevos.wait(), segundos)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+_difusores = weakref.WeakKeyDictionary()
+
+
+def difusor():
+    """El Difusor del event loop actual (uno por proceso en un servidor ASGI)"""
+    loop = asyncio.get_running_loop()
+    if loop not in _difusores:
+        _difusores[loop] = Difusor()
+    return _difusores[loop]
+
+
+async def eventos(desde, segundos, seguir=True):
+    """
+    Entradas posteriores a `desde` a medida que aparecen, durante `segundos`;
+    None cada CAMBIOS_LATIDO_SEGUNDOS sin novedades. Con seguir=False termina
+    al ponerse al día. Lanza RegistroCompactado si `desde` ya no está completo.
+    """
+    actual = difusor()
+    actual.entrar()
+    loop = asyncio.get_running_loop()
+    fin = loop.time() + segundos
+    latido = _ajuste('CAMBIOS_LATIDO_SEGUNDOS', 15)
+    try:
+        # Una ráfaga de conexiones nuevas espera la primera lectura compartida en vez de ir a la base
+        await actual.listo.wait()
+        while loop.time() < fin:
+            lote = actual.disponibles(desde)
+            if lote is None:
+                # Atrasado respecto del búfer: se pone al día con la base
+                tope = actual.ultimo
+                lote = await aleer(desde)
+                if len(lote) < tamano_pagina():
+                    # Lo que el búfer tenía hasta `tope` ya estaba en la base y vino en este lote
+                    for entrada in lote:
+                        yield entrada
+                    desde = max(lote[-1]['seq'] if lote else desde, tope)
+                    continue
+            if lote:
+                for entrada in lote:
+                    yield entrada
+                desde = lote[-1]['seq']
+                continue
+            if not seguir:
+                return
+            if not await actual.esperar(min(latido, max(fin - loop.time(), 0))):
+                yield None
+    finally:
+        actual.salir()
+
+
+def _sse(entrada):
+    datos = json.dumps(entrada, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return f'id: {entrada["seq"]}\nevent: producto\ndata: {datos}\n\n'
+
+
+async def flujo_sse(desde, segundos, staff=False, seguir=True):
+    """Cuerpo text/event-stream de eventos(): un evento `producto` por entrada"""
+    yield f'retry: {_ajuste("CAMBIOS_SSE_REINTENTO_MS", 3000)}\n\n'
+    try:
+        async for entrada in eventos(desde, segundos, seguir):
+            yield ': latido\n\n' if entrada is None else _sse(visible(entrada, staff))
+    except RegistroCompactado as error:
+        yield f'event: resincronizar\ndata: {json.dumps({"horizonte": error.horizonte})}\n\n'
@@ -0,0 +1,74 @@
+"""
+Guardado en lote con control de concurrencia optimista.
+
+Producto.save() ya hace compare-and-swap sobre `version` fila a fila. Para
+las ediciones masivas (list_editable del admin) guardar_lote bloquea las
+filas, descarta las que cambiaron de versión desde que se leyeron y escribe
+el resto con un solo bulk_update (un UPDATE ... CASE WHEN por lote) que
+también incrementa la versión.
+
+bulk_update no dispara las señales de Producto: el índice de búsqueda, las
+estadísticas, el registro de cambios, el historial de precio y stock y la
+caché del catálogo se actualizan aquí.
+"""
+from django.db import transaction
+
+from . import cache_catalogo, cambios, estadisticas, historial
+from .busqueda import obtener_backend
+from .models import Producto
+from .signals import CAMPOS_BUSQUEDA
+
+# Lo que hace falta de la fila actual para comparar versiones y calcular el delta de estadísticas
+CAMPOS_ACTUALES = ('version', 'precio', 'stock', 'activo', 'usuario_creador_id', 'fecha_creacion')
+
+
+def guardar_lote(ediciones):
+    """
+    Guarda pares (producto, campos modificados) con un solo UPDATE.
+
+    Cada producto debe traer la versión con la que se leyó. Retorna los que
+    otro usuario modificó mientras tanto, que quedan sin guardar.
+    """
+    por_pk = {producto.pk: (producto, set(campos)) for producto, campos in ediciones if campos}
+    if not por_pk:
+        return []
+
+    with transaction.atomic():
+        actuales = Producto.objects.select_for_update().only(*CAMPOS_ACTUALES).in_bulk(list(por_pk))
+        guardar, conflictos, deltas = [], [], []
+        campos = set()
+        for pk, (producto, modificados) in por_pk.items():
+            actual = actuales.get(pk)
+            if actual is None or actual.version != producto.version:
+                conflictos.append(producto)
+                continue
+            guardar.append(producto)
+            campos |= modificados
+            deltas.append((estadisticas.estado(actual), estadisticas.estado(producto)))
+
+        if guardar:
+            # Las filas están bloqueadas y en la versión leída: los campos no
+            # modificados de cada producto coinciden con lo que hay en la base
+            marcas = Producto.marcar_modificacion()
+            derivados = Producto.campos_derivados(campos)
+            campos.update(derivados)
+            for producto in guardar:
+                for campo, valor in marcas.items():
+                    setattr(producto, campo, valor)
+                for campo in derivados:
+                    Producto._meta.get_field(campo).pre_save(producto, False)
+            Producto.objects.bulk_update(guardar, sorted(campos | set(marcas)))
+            for producto in guardar:
+                producto.version = actuales[producto.pk].version + 1
+
+            pks = [producto.pk for producto in guardar]
+            estadisticas.aplicar_deltas(deltas)
+            cambios.registrar(guardar)
+            historial.registrar([
+                (producto.pk, historial.estado(actuales[producto.pk]), historial.estado(producto))
+                for producto in guardar
+            ])
+            if not CAMPOS_BUSQUEDA.isdisjoint(campos):
+                obtener_backend().actualizar_ids(pks)
+            transaction.on_commit(lambda: cache_catalogo.invalidar_productos(pks))
+    return conflictos
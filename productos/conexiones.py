@@ -0,0 +1,11 @@
+"""Ajustes aplicados a cada conexión nueva a la base de datos (connection_created)"""
+from django.conf import settings
+
+
+def configurar_sqlite(sender, connection, **kwargs):
+    """Aplica SQLITE_PRAGMAS; journal_mode=WAL queda grabado en el archivo, el resto es por conexión"""
+    if connection.vendor != 'sqlite':
+        return
+    for nombre, valor in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+        # Directo sobre sqlite3: sin pasar por los execute_wrappers del perfilado
+        connection.connection.execute(f'PRAGMA {nombre} = {valor}')
@@ -0,0 +1,70 @@
+"""
+Bajas lógicas de productos y purga en segundo plano.
+
+Eliminar un producto (vista, admin, API) es un único UPDATE que marca
+fecha_eliminacion: sin el recolector de cascadas de delete() ni un DELETE
+largo dentro de la petición. Producto.objects ya no los devuelve, así que
+desaparecen del catálogo, del admin y de la API; Producto.todos los incluye.
+La baja también libera el código (SKU) para que pueda volver a usarse.
+
+Como con cualquier .update(), el índice de búsqueda, las estadísticas, el
+registro de cambios, el historial de stock y la caché se actualizan aquí.
+
+`manage.py purgar_productos` borra después las filas marcadas de a
+PURGA_LOTE por transacción, con una pausa entre lotes: los bloqueos de
+escritura duran lo que un lote y no lo que una eliminación masiva.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import cache_catalogo, cambios, estadisticas, historial
+from .busqueda import obtener_backend
+from .models import Producto
+
+
+def dar_de_baja(productos):
+    """Baja lógica de los productos del queryset en un solo UPDATE; retorna cuántos"""
+    with transaction.atomic():
+        bajas = list(
+            productos.select_for_update().only('precio', 'stock', 'activo', 'usuario_creador_id', 'fecha_creacion')
+        )
+        if not bajas:
+            return 0
+        pks = [producto.pk for producto in bajas]
+        Producto.objects.filter(pk__in=pks).update(
+            fecha_eliminacion=timezone.now(), codigo=None, **Producto.marcar_modificacion()
+        )
+        estadisticas.aplicar_deltas([(estadisticas.estado(producto), None) for producto in bajas])
+        obtener_backend().eliminar_ids(pks)
+        cambios.registrar_bajas(pks)
+        historial.registrar([(producto.pk, historial.estado(producto), None) for producto in bajas])
+        transaction.on_commit(lambda: cache_catalogo.invalidar_productos(pks))
+    return len(pks)
+
+
+def purgar(lote=None, pausa=None, antiguedad=timedelta(0), al_avanzar=None):
+    """
+    Borra los productos dados de baja hace más de `antiguedad`, de a `lote`
+    filas por transacción y durmiendo `pausa` segundos entre lotes. Retorna
+    la cantidad borrada.
+    """
+    lote = lote or getattr(settings, 'PURGA_LOTE', 500)
+    pausa = getattr(settings, 'PURGA_PAUSA_SEGUNDOS', 0.2) if pausa is None else pausa
+    limite = timezone.now() - antiguedad
+    pendientes = Producto.todos.filter(fecha_eliminacion__lte=limite).order_by('fecha_eliminacion', 'pk')
+    borrados = 0
+    while True:
+        with transaction.atomic():
+            pks = list(pendientes.values_list('pk', flat=True)[:lote])
+            if pks:
+                # Las señales de post_delete ignoran las filas ya dadas de baja
+                borrados += Producto.todos.filter(pk__in=pks).only('pk', 'fecha_eliminacion').delete()[0]
+        if al_avanzar:
+            al_avanzar(borrados)
+        if len(pks) < lote:
+            return borrados
+        time.sleep(pausa)
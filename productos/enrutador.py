@@ -0,0 +1,117 @@
+"""
+Lecturas del catálogo en réplicas de solo lectura.
+
+Las vistas decoradas con @lectura_en_replica leen los modelos de productos
+desde una réplica de CATALOGO_REPLICAS (elegida una vez por petición). Todo
+lo demás -escrituras, sesiones, usuarios y el resto de las vistas- usa la
+base de datos principal.
+
+Tras una escritura (POST, PUT, PATCH o DELETE correcta) el middleware
+LecturaPrimariaMiddleware deja una cookie que fija al cliente a la principal
+durante VENTANA_LECTURA_PRIMARIA segundos, para que vea sus propios cambios
+aunque la réplica vaya atrasada.
+"""
+import random
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+COOKIE_PRIMARIA = 'leer_primaria'
+
+_replica = ContextVar('replica_de_lectura', default=None)
+_primaria = ContextVar('lectura_primaria_fijada', default=False)
+
+
+def replicas():
+    return getattr(settings, 'CATALOGO_REPLICAS', [])
+
+
+def _elegir():
+    disponibles = replicas()
+    if _primaria.get() or not disponibles:
+        return None
+    return random.choice(disponibles)
+
+
+def lectura_en_replica(vista):
+    """Las consultas de productos de la vista se leen desde una réplica"""
+    if iscoroutinefunction(vista):
+        @wraps(vista)
+        async def envoltura_async(request, *args, **kwargs):
+            token = _replica.set(_elegir())
+            try:
+                return await vista(request, *args, **kwargs)
+            finally:
+                _replica.reset(token)
+        return envoltura_async
+
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        token = _replica.set(_elegir())
+        try:
+            return vista(request, *args, **kwargs)
+        finally:
+            _replica.reset(token)
+    return envoltura
+
+
+class EnrutadorReplicas:
+    """Router de DATABASE_ROUTERS: réplica solo para lecturas de productos en vistas decoradas"""
+
+    def db_for_read(self, model, **hints):
+        alias = _replica.get()
+        if alias and model._meta.app_label == 'productos':
+            return alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Todas las bases contienen los mismos datos
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Las réplicas reciben el esquema por replicación
+        return db not in replicas()
+
+
+class LecturaPrimariaMiddleware:
+    """Read-your-writes: tras una escritura el cliente lee de la principal por un tiempo"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.asincrono = iscoroutinefunction(get_response)
+        if self.asincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.asincrono:
+            return self.__acall__(request)
+        token = _primaria.set(COOKIE_PRIMARIA in request.COOKIES)
+        try:
+            respuesta = self.get_response(request)
+        finally:
+            _primaria.reset(token)
+        return self._marcar(request, respuesta)
+
+    async def __acall__(self, request):
+        token = _primaria.set(COOKIE_PRIMARIA in request.COOKIES)
+        try:
+            respuesta = await self.get_response(request)
+        finally:
+            _primaria.reset(token)
+        return self._marcar(request, respuesta)
+
+    def _marcar(self, request, respuesta):
+        if request.method in ('POST', 'PUT', 'PATCH', 'DELETE') and respuesta.status_code < 400 and replicas():
+            respuesta.set_cookie(
+                COOKIE_PRIMARIA, '1', max_age=getattr(settings, 'VENTANA_LECTURA_PRIMARIA', 10),
+                httponly=True, samesite='Lax',
+            )
+        return respuesta
@@ -0,0 +1,113 @@
+"""
+Estadísticas del inventario mantenidas de forma incremental.
+
+Cada guardado o eliminación de un Producto aplica un delta (conteo, activos y
+precio * stock) sobre las filas de ResumenInventario de su ámbito: la global,
+la del usuario creador y la del día de creación. El dashboard solo lee filas.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Producto, ResumenInventario
+
+GLOBAL = 'global'
+
+
+def ambito_usuario(usuario_id):
+    return f'usuario:{usuario_id}'
+
+
+def ambito_dia(fecha):
+    return f'dia:{fecha.isoformat()}'
+
+
+def estado(producto):
+    """Lo que aporta un producto a las estadísticas: (ámbitos, total, activos, valor)"""
+    ambitos = [GLOBAL]
+    if producto.usuario_creador_id:
+        ambitos.append(ambito_usuario(producto.usuario_creador_id))
+    if producto.fecha_creacion:
+        ambitos.append(ambito_dia(timezone.localdate(producto.fecha_creacion)))
+    valor = Decimal(producto.precio or 0) * (producto.stock or 0)
+    return tuple(ambitos), 1, int(bool(producto.activo)), valor
+
+
+def _sumar(ambito, total, activos, valor):
+    if not (total or activos or valor):
+        return
+    cambios = {
+        'total_productos': F('total_productos') + total,
+        'productos_activos': F('productos_activos') + activos,
+        'valor_inventario': F('valor_inventario') + valor,
+    }
+    if ResumenInventario.objects.filter(ambito=ambito).update(**cambios):
+        return
+    try:
+        with transaction.atomic():
+            ResumenInventario.objects.create(
+                ambito=ambito, total_productos=total, productos_activos=activos, valor_inventario=valor
+            )
+    except IntegrityError:
+        # Otra petición creó la fila entre el UPDATE y el INSERT
+        ResumenInventario.objects.filter(ambito=ambito).update(**cambios)
+
+
+def aplicar_delta(anterior, nuevo):
+    """Resta el estado `anterior` y suma el `nuevo` (cualquiera puede ser None)"""
+    aplicar_deltas([(anterior, nuevo)])
+
+
+def aplicar_deltas(cambios):
+    """Como aplicar_delta para varios pares (anterior, nuevo): un UPDATE por ámbito"""
+    deltas = defaultdict(lambda: [0, 0, Decimal(0)])
+    for anterior, nuevo in cambios:
+        for signo, datos in ((-1, anterior), (1, nuevo)):
+            if datos is None:
+                continue
+            ambitos, total, activos, valor = datos
+            for ambito in ambitos:
+                delta = deltas[ambito]
+                delta[0] += signo * total
+                delta[1] += signo * activos
+                delta[2] += signo * valor
+    for ambito, (total, activos, valor) in deltas.items():
+        _sumar(ambito, total, activos, valor)
+
+
+def leer(*ambitos):
+    """Retorna {ambito: ResumenInventario} para los ámbitos pedidos (una sola consulta)"""
+    resumenes = ResumenInventario.objects.in_bulk(ambitos, field_name='ambito')
+    return {ambito: resumenes.get(ambito) or ResumenInventario(ambito=ambito) for ambito in ambitos}
+
+
+async def aleer(*ambitos):
+    """Versión asíncrona de leer"""
+    resumenes = await ResumenInventario.objects.ain_bulk(ambitos, field_name='ambito')
+    return {ambito: resumenes.get(ambito) or ResumenInventario(ambito=ambito) for ambito in ambitos}
+
+
+@transaction.atomic
+def reconstruir():
+    """Recalcula todos los resúmenes desde la tabla de productos"""
+    ResumenInventario.objects.all().delete()
+    acumulado = defaultdict(lambda: [0, 0, Decimal(0)])
+    campos = ('precio', 'stock', 'activo', 'usuario_creador_id', 'fecha_creacion')
+    for producto in Producto.objects.only(*campos).iterator(chunk_size=2000):
+        ambitos, total, activos, valor = estado(producto)
+        for ambito in ambitos:
+            fila = acumulado[ambito]
+            fila[0] += total
+            fila[1] += activos
+            fila[2] += valor
+    ResumenInventario.objects.bulk_create(
+        [
+            ResumenInventario(ambito=ambito, total_productos=t, productos_activos=a, valor_inventario=v)
+            for ambito, (t, a, v) in acumulado.items()
+        ],
+        batch_size=1000,
+    )
+    return len(acumulado)
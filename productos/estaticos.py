@@ -0,0 +1,287 @@
+"""
+Archivos estáticos servidos por la propia aplicación, sin CDN de terceros.
+
+- Bootstrap se vendoriza en productos/static/productos/vendor/ con
+  `manage.py vendorizar_estaticos`, que verifica el hash SRI publicado.
+  {% recurso_vendorizado %} siempre apunta al archivo local (con el hash
+  del manifiesto); solo en desarrollo (ESTATICOS_RESPALDO_CDN, por defecto
+  DEBUG) usa la CDN con integrity mientras no esté descargado. Qué archivos
+  están vendorizados se resuelve una vez por proceso; si falta alguno,
+  `manage.py check` avisa y, sin el respaldo de la CDN, falla.
+- AlmacenEstaticos (STORAGES['staticfiles']) es el ManifestStaticFilesStorage
+  de Django, que agrega un hash al nombre de cada archivo, y además escribe
+  variantes .gz y, si está instalado el paquete brotli, .br al ejecutar
+  collectstatic.
+- EstaticosMiddleware sirve STATIC_ROOT desde el proceso (WSGI o ASGI):
+  elige la variante según Accept-Encoding y marca como inmutables los
+  nombres con hash, que cambian cuando cambia el contenido.
+"""
+import base64
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import urllib.request
+from functools import cache
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core import checks
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse, HttpResponseNotModified
+
+try:
+    import brotli
+except ImportError:  # Solo gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+BOOTSTRAP = 'productos/vendor/bootstrap-5.3.0/'
+
+# Ruta estática: (URL de origen, hash SRI publicado por el proyecto)
+VENDORIZADOS = {
+    BOOTSTRAP + 'bootstrap.min.css': (
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css',
+        'sha384-9ndCyUaIbzAi2FUVXJi0CjmCapSmO7SnpJef0486qhLnuZ2cdeRhO02iuK6FUUVM',
+    ),
+    BOOTSTRAP + 'bootstrap.bundle.min.js': (
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js',
+        'sha384-geWF76RCwLtnZ8qwWowPQNguL3RmwHVBC9FhGdlKrxdiJJigb/j/68SIy3Te4Bkz',
+    ),
+}
+
+# Los .map no se vendorizan: sin el comentario el manifiesto no los busca
+SOURCE_MAP = re.compile(rb'\s*(/\*#|//#) sourceMappingURL=\S+?( \*/)?\s*$')
+
+COMPRIMIBLES = {'.css', '.js', '.mjs', '.map', '.svg', '.json', '.txt', '.html', '.xml', '.ico'}
+TAMANO_MINIMO = 256
+
+# Prioridad de Accept-Encoding: la primera aceptada por el cliente y disponible
+CODIFICACIONES = (('br', '.br'), ('gzip', '.gz'))
+
+INMUTABLE = 'public, max-age=31536000, immutable'
+# Nombres sin hash (p. ej. los que otros archivos referencian literalmente)
+REVALIDAR = 'public, max-age=60'
+
+
+# Vendorización
+
+def directorio_vendor():
+    return Path(apps.get_app_config('productos').path) / 'static'
+
+
+def integridad(contenido):
+    return 'sha384-' + base64.b64encode(hashlib.sha384(contenido).digest()).decode()
+
+
+def descargar(ruta, timeout=30):
+    """Descarga un recurso de VENDORIZADOS y lo guarda tras verificar su hash SRI"""
+    url, esperado = VENDORIZADOS[ruta]
+    with urllib.request.urlopen(url, timeout=timeout) as respuesta:
+        contenido = respuesta.read()
+    if integridad(contenido) != esperado:
+        raise ValueError(f'{url} no coincide con el hash SRI {esperado}')
+    destino = directorio_vendor() / ruta
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    destino.write_bytes(SOURCE_MAP.sub(b'\n', contenido))
+    disponibles.cache_clear()
+    return destino
+
+
+def vendorizado(ruta):
+    return (directorio_vendor() / ruta).is_file()
+
+
+@cache
+def disponibles():
+    """Rutas de VENDORIZADOS ya descargadas (se revisa el disco una vez por proceso)"""
+    return frozenset(ruta for ruta in VENDORIZADOS if vendorizado(ruta))
+
+
+def respaldo_cdn():
+    return getattr(settings, 'ESTATICOS_RESPALDO_CDN', settings.DEBUG)
+
+
+@checks.register(checks.Tags.staticfiles)
+def verificar_vendorizados(app_configs=None, **kwargs):
+    """Sin el respaldo de la CDN las páginas solo usan los archivos locales: tienen que estar descargados"""
+    faltantes = [ruta for ruta in VENDORIZADOS if ruta not in disponibles()]
+    pista = 'Ejecutar `manage.py vendorizar_estaticos` y luego collectstatic.'
+    if respaldo_cdn():
+        return [
+            checks.Warning(f'{ruta} no está vendorizado: las páginas lo cargan de la CDN.', hint=pista,
+                           id='productos.W001')
+            for ruta in faltantes
+        ]
+    return [checks.Error(f'{ruta} no está vendorizado.', hint=pista, id='productos.E001') for ruta in faltantes]
+
+
+# Compresión en collectstatic
+
+def comprimir(ruta):
+    """Escribe las variantes .gz y .br de `ruta` que ahorren al menos un 5%"""
+    if os.path.splitext(ruta)[1].lower() not in COMPRIMIBLES:
+        return []
+    with open(ruta, 'rb') as archivo:
+        original = archivo.read()
+    if len(original) < TAMANO_MINIMO:
+        return []
+    variantes = {'.gz': gzip.compress(original, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variantes['.br'] = brotli.compress(original, quality=11)
+    escritas = []
+    for extension, contenido in variantes.items():
+        if len(contenido) < len(original) * 0.95:
+            with open(ruta + extension, 'wb') as archivo:
+                archivo.write(contenido)
+            escritas.append(ruta + extension)
+    return escritas
+
+
+class AlmacenEstaticos(ManifestStaticFilesStorage):
+    """Manifiesto con hash en el nombre más variantes precomprimidas"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Nombres ya avisados como servidos sin hash (un aviso por nombre)
+        self.sin_hash = set()
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for nombre in set(paths) | set(self.hashed_files.values()):
+            comprimir(self.path(nombre))
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            # Sin manifiesto (no se ejecutó collectstatic: tests, desarrollo) las URLs quedan sin hash
+            if not respaldo_cdn() and name not in self.sin_hash:
+                self.sin_hash.add(name)
+                logger.warning('Sin manifiesto de estáticos (¿falta collectstatic?): %s se sirve sin hash', name)
+            return name
+        return super().stored_name(name)
+
+
+# Servidor
+
+def aceptadas(cabecera):
+    """Codificaciones que admite un Accept-Encoding (las de q=0 quedan fuera)"""
+    resultado = set()
+    for parte in cabecera.split(','):
+        nombre, _, parametros = parte.strip().partition(';')
+        calidad = parametros.strip()
+        if calidad.startswith('q='):
+            try:
+                if float(calidad[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        resultado.add(nombre.strip().lower())
+    return resultado
+
+
+def _huella(ruta):
+    estado = os.stat(ruta)
+    return f'"{estado.st_mtime_ns:x}-{estado.st_size:x}"'
+
+
+def indexar(raiz, con_hash=()):
+    """Ruta relativa: variantes disponibles, tipo MIME y Cache-Control de cada archivo de `raiz`"""
+    con_hash = set(con_hash)
+    indice = {}
+    for directorio, _, archivos in os.walk(raiz):
+        for nombre in archivos:
+            ruta = os.path.join(directorio, nombre)
+            relativa = os.path.relpath(ruta, raiz).replace(os.sep, '/')
+            if any(relativa.endswith(extension) for _, extension in CODIFICACIONES):
+                continue
+            variantes = {None: (ruta, _huella(ruta))}
+            for codificacion, extension in CODIFICACIONES:
+                if os.path.isfile(ruta + extension):
+                    variantes[codificacion] = (ruta + extension, _huella(ruta + extension))
+            tipo, _ = mimetypes.guess_type(nombre)
+            indice[relativa] = {
+                'variantes': variantes,
+                'tipo': tipo or 'application/octet-stream',
+                'cache': INMUTABLE if relativa in con_hash else REVALIDAR,
+            }
+    return indice
+
+
+class EstaticosMiddleware:
+    """
+    Sirve STATIC_ROOT antes que cualquier vista. El índice se arma al
+    iniciar el proceso: después de collectstatic hay que reiniciar.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        raiz = settings.STATIC_ROOT
+        if not raiz or not os.path.isdir(raiz):
+            raise MiddlewareNotUsed('STATIC_ROOT vacío: ejecutar collectstatic')
+        self.get_response = get_response
+        self.prefijo = settings.STATIC_URL
+        self.indice = indexar(raiz, getattr(staticfiles_storage, 'hashed_files', {}).values())
+        self.asincrono = iscoroutinefunction(get_response)
+        if self.asincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.asincrono:
+            return self.__acall__(request)
+        encontrado = self.buscar(request)
+        if encontrado is None:
+            return self.get_response(request)
+        return self.responder(encontrado, _leer(encontrado[1]) if encontrado[3] else None)
+
+    async def __acall__(self, request):
+        encontrado = self.buscar(request)
+        if encontrado is None:
+            return await self.get_response(request)
+        # La lectura del archivo va a un hilo: no bloquea el event loop
+        contenido = await sync_to_async(_leer, thread_sensitive=False)(encontrado[1]) if encontrado[3] else None
+        return self.responder(encontrado, contenido)
+
+    def buscar(self, request):
+        """(archivo, ruta, codificación, hay que leerlo) del pedido, o None si no es un estático"""
+        if request.method not in ('GET', 'HEAD') or not request.path.startswith(self.prefijo):
+            return None
+        archivo = self.indice.get(request.path[len(self.prefijo):])
+        if archivo is None:
+            return None
+
+        cliente = aceptadas(request.headers.get('Accept-Encoding', ''))
+        codificacion = next(
+            (nombre for nombre, _ in CODIFICACIONES if nombre in cliente and nombre in archivo['variantes']),
+            None,
+        )
+        ruta, huella = archivo['variantes'][codificacion]
+        return archivo, ruta, codificacion, huella not in request.headers.get('If-None-Match', '')
+
+    def responder(self, encontrado, contenido):
+        archivo, ruta, codificacion, _ = encontrado
+        if contenido is None:
+            respuesta = HttpResponseNotModified()
+        else:
+            respuesta = HttpResponse(contenido, content_type=archivo['tipo'])
+            if codificacion:
+                respuesta['Content-Encoding'] = codificacion
+        respuesta['ETag'] = archivo['variantes'][codificacion][1]
+        respuesta['Cache-Control'] = archivo['cache']
+        respuesta['X-Content-Type-Options'] = 'nosniff'
+        if len(archivo['variantes']) > 1:
+            respuesta['Vary'] = 'Accept-Encoding'
+        return respuesta
+
+
+def _leer(ruta):
+    with open(ruta, 'rb') as contenido:
+        return contenido.read()
@@ -1,15 +1,93 @@
 from django import forms
+from django.contrib.auth import password_validation
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from django.utils.safestring import mark_safe
 from django.core.exceptions import ValidationError
 from .models import Producto
 
-class ProductoForm(forms.ModelForm):
+
+def validar_precio(precio):
+    """Reglas de precio compartidas por el formulario y la importación masiva"""
+    if precio and precio <= 0:
+        raise forms.ValidationError("El precio debe ser mayor a cero")
+    return precio
+
+
+def validar_stock(stock):
+    if stock is not None and stock < 0:
+        raise forms.ValidationError("El stock no puede ser negativo")
+    return stock
+
+
+MENSAJE_CONFLICTO = (
+    "Otro usuario modificó este producto mientras lo editabas (valor actual: %(actual)s). "
+    "Guarda de nuevo para reemplazarlo por el tuyo."
+)
+
+
+class CampoVersion(forms.IntegerField):
+    """Versión leída al abrir el formulario; nunca cuenta como un cambio"""
+    widget = forms.HiddenInput
+
+    def has_changed(self, initial, data):
+        return False
+
+
+class FormularioConVersion(forms.ModelForm):
+    """
+    ModelForm con control de concurrencia optimista.
+
+    El campo oculto `version` lleva la versión con la que se abrió el
+    formulario. Si al enviarlo el producto ya va por otra, los campos que el
+    usuario cambió se marcan en conflicto (con el valor actual) en vez de
+    pisar lo que guardó el otro; el formulario vuelve con la versión actual,
+    así que reenviarlo confirma la sobrescritura. Al guardar solo se escriben
+    los campos modificados.
+    """
+    version = CampoVersion(required=False)
+    conflicto = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.initial.setdefault('version', self.instance.version)
+
+    def campos_modificados(self):
+        return [campo for campo in self.changed_data if campo != 'version']
+
+    def clean(self):
+        cleaned_data = super().clean()
+        # La versión no se copia a la instancia: el UPDATE compara con la leída de la base
+        leida = cleaned_data.pop('version', None)
+        if self.instance.pk is None or leida is None or leida == self.instance.version:
+            return cleaned_data
+
+        self.conflicto = bool(self.campos_modificados())
+        for campo in self.campos_modificados():
+            self.add_error(campo, MENSAJE_CONFLICTO % {'actual': self.initial.get(campo)})
+        self.data = self.data.copy()
+        self.data[self.add_prefix('version')] = self.instance.version
+        return cleaned_data
+
+    def save(self, commit=True):
+        if not commit or self.instance._state.adding:
+            return super().save(commit)
+        instancia = super().save(commit=False)
+        # Puede lanzar ConflictoVersion si otro guardó entre la lectura y el UPDATE
+        instancia.save(update_fields=self.campos_modificados())
+        self._save_m2m()
+        return instancia
+
+
+class ProductoForm(FormularioConVersion):
     class Meta:
         model = Producto
-        fields = ['nombre', 'descripcion', 'precio', 'stock', 'activo', 'imagen_url']
+        fields = ['codigo', 'nombre', 'descripcion', 'precio', 'stock', 'activo', 'imagen_url', 'imagen']
         widgets = {
+            'codigo': forms.TextInput(attrs={
+                'class': 'form-control',
+                'placeholder': 'Ej: LAP-DELL-001'
+            }),
             'nombre': forms.TextInput(attrs={
                 'class': 'form-control',
                 'placeholder': 'Ej: Laptop Dell Inspiron'
@@ -33,19 +111,51 @@ class ProductoForm(forms.ModelForm):
                 'class': 'form-control',
                 'placeholder': 'https://ejemplo.com/imagen.jpg'
             }),
+            'imagen': forms.ClearableFileInput(attrs={'class': 'form-control'}),
         }
 
     def clean_precio(self):
-        precio = self.cleaned_data.get('precio')
-        if precio and precio <= 0:
-            raise forms.ValidationError("El precio debe ser mayor a cero")
-        return precio
+        return validar_precio(self.cleaned_data.get('precio'))
+
+    def clean_stock(self):
+        return validar_stock(self.cleaned_data.get('stock'))
+
+class ImportacionProductoForm(forms.ModelForm):
+    """Valida una fila de la importación masiva con las reglas de ProductoForm"""
+    class Meta:
+        model = Producto
+        fields = ['codigo', 'nombre', 'descripcion', 'precio', 'stock', 'activo', 'imagen_url']
+
+    def clean_precio(self):
+        return validar_precio(self.cleaned_data.get('precio'))
 
     def clean_stock(self):
-        stock = self.cleaned_data.get('stock')
-        if stock < 0:
-            raise forms.ValidationError("El stock no puede ser negativo")
-        return stock
+        return validar_stock(self.cleaned_data.get('stock'))
+
+    def validate_unique(self):
+        # El código repetido no es un error: la importación actualiza esa fila
+        pass
+
+
+# Traducción de los errores de AUTH_PASSWORD_VALIDATORS, por código
+MENSAJES_CONTRASENA = {
+    'password_too_similar': 'La contraseña es muy similar a tu información personal.',
+    'password_too_short': 'La contraseña debe contener al menos 8 caracteres.',
+    'password_too_common': 'Esta contraseña es muy común.',
+    'password_entirely_numeric': 'La contraseña no puede ser completamente numérica.',
+}
+
+
+def precargar_validadores_contrasena():
+    """
+    Instancia los validadores de contraseña (quedan en caché por proceso).
+
+    CommonPasswordValidator descomprime una lista de 20.000 contraseñas al
+    crearse; se llama desde wsgi.py/asgi.py para que ese costo no lo pague el
+    primer registro y, con --preload, los workers compartan el conjunto.
+    """
+    return password_validation.get_default_password_validators()
+
 
 class RegistroUsuarioForm(UserCreationForm):
     email = forms.EmailField(
@@ -159,30 +269,18 @@ class RegistroUsuarioForm(UserCreationForm):
 
         return password2
 
-    def _post_clean(self):
-        super()._post_clean()
-        # Traducir mensajes de validación de contraseña
-        password = self.cleaned_data.get('password2')
-        if password:
-            try:
-                from django.contrib.auth.password_validation import validate_password
-                validate_password(password, self.instance)
-            except ValidationError as error:
-                # Traducir mensajes de error
-                translated_messages = []
-                for message in error.messages:
-                    if 'too similar' in message.lower():
-                        translated_messages.append('La contraseña es muy similar a tu información personal.')
-                    elif 'at least' in message.lower() or 'too short' in message.lower():
-                        translated_messages.append('La contraseña debe contener al menos 8 caracteres.')
-                    elif 'common' in message.lower():
-                        translated_messages.append('Esta contraseña es muy común.')
-                    elif 'numeric' in message.lower() or 'entirely' in message.lower():
-                        translated_messages.append('La contraseña no puede ser completamente numérica.')
-                    else:
-                        translated_messages.append(message)
-
-                self.add_error('password2', ValidationError(translated_messages))
+    def validate_password_for_user(self, user, password_field_name='password2'):
+        # UserCreationForm llama a este método una sola vez desde _post_clean;
+        # aquí solo se traducen los mensajes según el código de cada error
+        password = self.cleaned_data.get(password_field_name)
+        if not password:
+            return
+        try:
+            password_validation.validate_password(password, user)
+        except ValidationError as error:
+            self.add_error(password_field_name, ValidationError([
+                MENSAJES_CONTRASENA.get(detalle.code, detalle.messages[0]) for detalle in error.error_list
+            ]))
 
     def save(self, commit=True):
         user = super().save(commit=False)
@@ -0,0 +1,180 @@
+"""
+Historial de precio y stock de los productos, con acumulados por hora y por día.
+
+Producto guarda solo el precio y el stock actuales. Cada alta, edición que
+toque el precio o el stock, reserva y baja agrega filas a HistorialProducto
+(append-only): el precio resultante en centavos y la variación de stock. Un
+mismo camino de escritura (formulario, list_editable del admin, importación,
+reservas) registra todo su lote con un solo INSERT, dentro de su transacción.
+
+Las variaciones que no entran en un SmallIntegerField se parten en varias
+filas consecutivas con la misma fecha; los acumulados las cuentan como un
+solo movimiento.
+
+Al registrar se suman los totales del lote a HistorialHora y HistorialDia
+(un UPDATE por período, como ResumenInventario): el dashboard grafica meses
+de tendencia leyendo una fila por día, sin recorrer el historial.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+
+from .models import HistorialDia, HistorialHora, HistorialProducto
+
+# Rango de HistorialProducto.delta_stock
+LIMITE_DELTA = 32767
+
+
+def centavos(precio):
+    return int((Decimal(precio) * 100).to_integral_value())
+
+
+def estado(producto):
+    """Lo que el historial sigue de un producto: (precio, stock)"""
+    return producto.precio, producto.stock
+
+
+def _filas(producto_id, fecha, precio, delta):
+    while True:
+        parte = max(-LIMITE_DELTA, min(LIMITE_DELTA, delta))
+        yield HistorialProducto(producto_id=producto_id, fecha=fecha, precio_centavos=precio, delta_stock=parte)
+        delta -= parte
+        if not delta:
+            return
+
+
+def registrar(cambios, fecha=None):
+    """
+    Registra ternas (producto_id, anterior, nuevo) donde anterior y nuevo son
+    estado() o None (alta y baja). Ignora las ediciones que no movieron el
+    precio ni el stock. Retorna la cantidad de filas escritas.
+    """
+    fecha = fecha or timezone.now()
+    filas = []
+    totales = {'movimientos': 0, 'cambios_precio': 0, 'entradas': 0, 'salidas': 0, 'suma_precios_centavos': 0}
+    minimo = maximo = None
+    for producto_id, anterior, nuevo in cambios:
+        precio_anterior, stock_anterior = anterior or (None, 0)
+        # Una baja conserva el último precio y retira todo el stock
+        precio, stock = nuevo or (precio_anterior, 0)
+        precio = centavos(precio)
+        delta = (stock or 0) - (stock_anterior or 0)
+        cambio_precio = anterior is not None and nuevo is not None and precio != centavos(precio_anterior)
+        if anterior is not None and nuevo is not None and not cambio_precio and not delta:
+            continue
+        filas.extend(_filas(producto_id, fecha, precio, delta))
+        totales['movimientos'] += 1
+        totales['cambios_precio'] += cambio_precio
+        totales['entradas'] += max(delta, 0)
+        totales['salidas'] += max(-delta, 0)
+        totales['suma_precios_centavos'] += precio
+        minimo = precio if minimo is None else min(minimo, precio)
+        maximo = precio if maximo is None else max(maximo, precio)
+    if not filas:
+        return 0
+
+    with transaction.atomic():
+        HistorialProducto.objects.bulk_create(filas, batch_size=getattr(settings, 'HISTORIAL_LOTE', 1000))
+        hora = fecha.replace(minute=0, second=0, microsecond=0)
+        _sumar(HistorialHora, {'inicio': hora}, totales, minimo, maximo)
+        _sumar(HistorialDia, {'dia': timezone.localdate(fecha)}, totales, minimo, maximo)
+    return len(filas)
+
+
+def _sumar(modelo, periodo, totales, minimo, maximo):
+    cambios = {campo: F(campo) + valor for campo, valor in totales.items()}
+    cambios['precio_minimo_centavos'] = Least(
+        'precio_minimo_centavos', Value(minimo, output_field=models.BigIntegerField())
+    )
+    cambios['precio_maximo_centavos'] = Greatest(
+        'precio_maximo_centavos', Value(maximo, output_field=models.BigIntegerField())
+    )
+    if modelo.objects.filter(**periodo).update(**cambios):
+        return
+    try:
+        with transaction.atomic():
+            modelo.objects.create(
+                **periodo, **totales, precio_minimo_centavos=minimo, precio_maximo_centavos=maximo
+            )
+    except IntegrityError:
+        # Otra petición creó la fila entre el UPDATE y el INSERT
+        modelo.objects.filter(**periodo).update(**cambios)
+
+
+# Lectura
+
+def _desde(dias, hoy):
+    hoy = hoy or timezone.localdate()
+    return hoy - timedelta(days=dias - 1), hoy
+
+
+def _completar(filas, inicio, fin):
+    # Los días sin movimientos no tienen fila: se muestran en cero
+    por_dia = {fila.dia: fila for fila in filas}
+    return [
+        por_dia.get(inicio + timedelta(days=n)) or HistorialDia(dia=inicio + timedelta(days=n))
+        for n in range((fin - inicio).days + 1)
+    ]
+
+
+def tendencia(dias=None, hoy=None):
+    """Un HistorialDia por cada uno de los últimos `dias` días (HISTORIAL_DIAS_DASHBOARD)"""
+    inicio, fin = _desde(dias or getattr(settings, 'HISTORIAL_DIAS_DASHBOARD', 90), hoy)
+    return _completar(HistorialDia.objects.filter(dia__range=(inicio, fin)), inicio, fin)
+
+
+async def atendencia(dias=None, hoy=None):
+    """Versión asíncrona de tendencia"""
+    inicio, fin = _desde(dias or getattr(settings, 'HISTORIAL_DIAS_DASHBOARD', 90), hoy)
+    filas = [fila async for fila in HistorialDia.objects.filter(dia__range=(inicio, fin))]
+    return _completar(filas, inicio, fin)
+
+
+async def aultimas_horas(horas=24):
+    """Totales de las últimas `horas` horas, sumando las filas de HistorialHora"""
+    desde = timezone.now().replace(minute=0, second=0, microsecond=0) - timedelta(hours=horas - 1)
+    total = HistorialHora(inicio=desde)
+    async for fila in HistorialHora.objects.filter(inicio__gte=desde):
+        for campo in ('movimientos', 'cambios_precio', 'entradas', 'salidas', 'suma_precios_centavos'):
+            setattr(total, campo, getattr(total, campo) + getattr(fila, campo))
+    return total
+
+
+def por_mes(dias):
+    """Agrupa una tendencia por mes: [(primer día del mes, HistorialDia con los totales)]"""
+    meses = defaultdict(HistorialDia)
+    for fila in dias:
+        mes = meses[fila.dia.replace(day=1)]
+        if not fila.movimientos:
+            continue
+        if mes.movimientos:
+            mes.precio_minimo_centavos = min(mes.precio_minimo_centavos, fila.precio_minimo_centavos)
+            mes.precio_maximo_centavos = max(mes.precio_maximo_centavos, fila.precio_maximo_centavos)
+        else:
+            mes.precio_minimo_centavos = fila.precio_minimo_centavos
+            mes.precio_maximo_centavos = fila.precio_maximo_centavos
+        for campo in ('movimientos', 'cambios_precio', 'entradas', 'salidas', 'suma_precios_centavos'):
+            setattr(mes, campo, getattr(mes, campo) + getattr(fila, campo))
+    return sorted(meses.items())
+
+
+def puntos(valores, ancho=600, alto=120):
+    """Coordenadas de un <polyline> SVG para `valores` (los None continúan el último valor)"""
+    conocidos = [valor for valor in valores if valor is not None]
+    if len(valores) < 2 or not conocidos:
+        return ''
+    bajo, alto_valor = min(conocidos), max(conocidos)
+    rango = (alto_valor - bajo) or 1
+    paso = ancho / (len(valores) - 1)
+    coordenadas, ultimo = [], conocidos[0]
+    for indice, valor in enumerate(valores):
+        ultimo = ultimo if valor is None else valor
+        y = alto - (ultimo - bajo) / rango * alto
+        coordenadas.append(f'{indice * paso:.1f},{y:.1f}')
+    return ' '.join(coordenadas)
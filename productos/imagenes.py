@@ -0,0 +1,269 @@
+"""
+Miniaturas locales de las imágenes externas de los productos.
+
+Cada `imagen_url` se descarga una sola vez en un pool de hilos (con timeout y
+límite de tamaño) y se generan derivados de tamaño fijo que se guardan bajo
+MEDIA_ROOT/derivados, nombrados por el hash SHA-256 del contenido original.
+Mientras el derivado no exista las plantillas usan la URL original.
+
+La descarga se encola al guardar un producto; `manage.py generar_miniaturas`
+procesa los productos existentes.
+
+`imagen_url` la escribe el usuario: solo se descargan direcciones públicas.
+El host se resuelve antes de pedir (y en cada redirección) y cada conexión
+verifica además la dirección a la que quedó conectada, así que un DNS que
+cambia de respuesta tampoco alcanza la red interna ni la metadata del
+proveedor (169.254.169.254). IMAGENES_PERMITIR_RED_PRIVADA lo desactiva.
+"""
+import hashlib
+import http.client
+import io
+import ipaddress
+import logging
+import os
+import socket
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.db import connections
+
+from .models import ImagenRemota
+
+logger = logging.getLogger(__name__)
+
+# Tamaño máximo (ancho, alto) y si se recorta para cubrir la caja o se ajusta dentro
+TAMANOS = {
+    'tarjeta': ((600, 300), True),
+    'detalle': ((1000, 1000), False),
+    'admin': ((300, 200), False),
+}
+
+DIRECTORIO = 'derivados'
+
+_pool = None
+_en_curso = set()
+_candado = threading.Lock()
+
+
+class ImagenNoValida(Exception):
+    """La URL no se pudo descargar o no contiene una imagen utilizable"""
+
+
+def hash_url(url):
+    return hashlib.sha256(url.encode()).hexdigest()
+
+
+def ruta_relativa(contenido, tamano, formato):
+    extension = 'webp' if formato == 'WEBP' else 'jpg'
+    return f'{DIRECTORIO}/{contenido[:2]}/{contenido}-{tamano}.{extension}'
+
+
+def _formato():
+    return getattr(settings, 'IMAGENES_FORMATO', 'WEBP')
+
+
+def _red_privada_permitida():
+    return getattr(settings, 'IMAGENES_PERMITIR_RED_PRIVADA', False)
+
+
+def _es_publica(direccion):
+    ip = ipaddress.ip_address(direccion.split('%')[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global
+
+
+def validar_url(url):
+    """Lanza ImagenNoValida si `url` no es http(s) o su host resuelve a una dirección no pública"""
+    partes = urlparse(url)
+    if partes.scheme not in ('http', 'https') or not partes.hostname:
+        raise ImagenNoValida(f'URL no soportada: {url}')
+    if _red_privada_permitida():
+        return
+    try:
+        direcciones = socket.getaddrinfo(partes.hostname, partes.port, type=socket.SOCK_STREAM)
+    except (OSError, ValueError) as error:
+        raise ImagenNoValida(f'No se pudo resolver {partes.hostname}: {error}') from error
+    for *_, (direccion, *_) in direcciones:
+        if not _es_publica(direccion):
+            raise ImagenNoValida(f'{partes.hostname} resuelve a una dirección no pública ({direccion})')
+
+
+class _ConexionPublica:
+    def connect(self):
+        super().connect()
+        direccion = self.sock.getpeername()[0]
+        if not _red_privada_permitida() and not _es_publica(direccion):
+            self.close()
+            raise ImagenNoValida(f'{self.host} se conectó a una dirección no pública ({direccion})')
+
+
+class _HTTPConexionPublica(_ConexionPublica, http.client.HTTPConnection):
+    pass
+
+
+class _HTTPSConexionPublica(_ConexionPublica, http.client.HTTPSConnection):
+    pass
+
+
+class _HTTPPublico(urllib.request.HTTPHandler):
+    def http_open(self, req):
+        return self.do_open(_HTTPConexionPublica, req)
+
+
+class _HTTPSPublico(urllib.request.HTTPSHandler):
+    def https_open(self, req):
+        return self.do_open(_HTTPSConexionPublica, req, context=self._context)
+
+
+class _RedireccionPublica(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        validar_url(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+# Sin proxies del entorno: la dirección verificada es la del servidor de la imagen
+_abridor = urllib.request.build_opener(
+    urllib.request.ProxyHandler({}), _HTTPPublico, _HTTPSPublico, _RedireccionPublica
+)
+
+
+def descargar(url):
+    """Descarga `url` respetando el timeout y el tamaño máximo configurados"""
+    validar_url(url)
+    limite = getattr(settings, 'IMAGENES_MAX_BYTES', 5 * 1024 * 1024)
+    timeout = getattr(settings, 'IMAGENES_TIMEOUT', 5)
+    peticion = urllib.request.Request(url, headers={'User-Agent': 'portafolio-miniaturas/1.0'})
+    try:
+        with _abridor.open(peticion, timeout=timeout) as respuesta:
+            datos = respuesta.read(limite + 1)
+    except OSError as error:
+        raise ImagenNoValida(str(error)) from error
+    if len(datos) > limite:
+        raise ImagenNoValida(f'La imagen supera {limite} bytes')
+    return datos
+
+
+def generar_derivados(datos):
+    """Genera y guarda las miniaturas de `datos`; retorna el hash del contenido"""
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    contenido = hashlib.sha256(datos).hexdigest()
+    formato = _formato()
+    try:
+        original = Image.open(io.BytesIO(datos))
+        original.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as error:
+        raise ImagenNoValida(str(error)) from error
+    original = ImageOps.exif_transpose(original).convert('RGB')
+
+    for tamano, (caja, recortar) in TAMANOS.items():
+        destino = os.path.join(settings.MEDIA_ROOT, ruta_relativa(contenido, tamano, formato))
+        if os.path.exists(destino):
+            # Mismo contenido ya procesado desde otra URL
+            continue
+        if recortar:
+            imagen = ImageOps.fit(original, caja, Image.Resampling.LANCZOS)
+        else:
+            imagen = original.copy()
+            imagen.thumbnail(caja, Image.Resampling.LANCZOS)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        temporal = f'{destino}.tmp'
+        imagen.save(temporal, formato, quality=82)
+        os.replace(temporal, destino)
+    return contenido
+
+
+def procesar(url, forzar=False):
+    """Descarga `url` y registra el resultado en ImagenRemota (se ejecuta en el pool)"""
+    from . import cache_catalogo
+    from .models import Producto
+
+    registro, _ = ImagenRemota.objects.get_or_create(url_hash=hash_url(url), defaults={'url': url})
+    if registro.estado == ImagenRemota.LISTA and not forzar:
+        return registro
+    try:
+        registro.contenido = generar_derivados(descargar(url))
+        registro.formato = _formato()
+        registro.estado = ImagenRemota.LISTA
+        registro.error = ''
+    except ImagenNoValida as error:
+        logger.warning('No se pudo procesar la imagen %s: %s', url, error)
+        registro.estado = ImagenRemota.ERROR
+        registro.error = str(error)[:200]
+    registro.save()
+
+    # Las tarjetas cacheadas seguían apuntando a la URL original
+    for pk in Producto.objects.filter(imagen_url=url).values_list('pk', flat=True):
+        cache_catalogo.invalidar_producto(pk)
+    return registro
+
+
+def _procesar_en_hilo(url):
+    try:
+        procesar(url)
+    except Exception:
+        logger.exception('Error inesperado procesando %s', url)
+    finally:
+        with _candado:
+            _en_curso.discard(url)
+        connections.close_all()
+
+
+def encolar(url):
+    """Programa el procesamiento de `url` si no está ya en curso"""
+    if not url:
+        return
+    if not getattr(settings, 'IMAGENES_EN_SEGUNDO_PLANO', True):
+        procesar(url)
+        return
+
+    global _pool
+    with _candado:
+        if url in _en_curso:
+            return
+        _en_curso.add(url)
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'IMAGENES_WORKERS', 4),
+                thread_name_prefix='miniaturas',
+            )
+    _pool.submit(_procesar_en_hilo, url)
+
+
+def _hashes(productos):
+    return list({hash_url(p.imagen_url) for p in productos if p.imagen_url})
+
+
+def _asignar(productos, registros, tamano):
+    for producto in productos:
+        producto.miniatura = producto.imagen_principal
+        if producto.imagen_url:
+            registro = registros.get(hash_url(producto.imagen_url))
+            if registro is not None and registro.estado == ImagenRemota.LISTA:
+                producto.miniatura = settings.MEDIA_URL + ruta_relativa(
+                    registro.contenido, tamano, registro.formato
+                )
+    return productos
+
+
+def adjuntar_miniaturas(productos, tamano):
+    """
+    Asigna `producto.miniatura` a cada producto con una sola consulta.
+
+    Usa el derivado local si ya existe y, si no, Producto.imagen_principal
+    (URL original, archivo subido o placeholder).
+    """
+    productos = list(productos)
+    registros = ImagenRemota.objects.in_bulk(_hashes(productos), field_name='url_hash')
+    return _asignar(productos, registros, tamano)
+
+
+async def aadjuntar_miniaturas(productos, tamano):
+    """Versión asíncrona de adjuntar_miniaturas"""
+    productos = list(productos)
+    registros = await ImagenRemota.objects.ain_bulk(_hashes(productos), field_name='url_hash')
+    return _asignar(productos, registros, tamano)
@@ -0,0 +1,196 @@
+"""
+Importación y exportación masiva de productos en CSV o NDJSON (un objeto JSON
+por línea), leyendo y escribiendo en streaming para mantener la memoria plana.
+
+Las filas con `codigo` se insertan o actualizan (upsert) por ese campo; las
+filas sin código se insertan. Cada lote se guarda en su propia transacción,
+junto con sus deltas de estadísticas (sin recalcular los resúmenes).
+"""
+import csv
+import json
+import time
+
+from django.db import transaction
+from django.http import StreamingHttpResponse
+
+from . import cache_catalogo, cambios, estadisticas, historial
+from .busqueda import obtener_backend
+from .forms import ImportacionProductoForm
+from .models import CambioProducto, Producto
+
+CAMPOS_IMPORTACION = ImportacionProductoForm._meta.fields
+CAMPOS_ACTUALIZABLES = [campo for campo in CAMPOS_IMPORTACION if campo != 'codigo']
+# El upsert también reescribe lo que se calcula a partir de esos campos
+CAMPOS_UPSERT = [*CAMPOS_ACTUALIZABLES, *Producto.campos_derivados(CAMPOS_ACTUALIZABLES)]
+CAMPOS_EXPORTACION = ['id', *CAMPOS_IMPORTACION, 'fecha_creacion']
+# Lo que hace falta de cada fila para los deltas de estadísticas y el historial
+CAMPOS_ESTADO = ('codigo', 'precio', 'stock', 'activo', 'usuario_creador_id', 'fecha_creacion')
+
+# formato: (extensión, Content-Type)
+TIPOS_EXPORTACION = {
+    'csv': ('csv', 'text/csv; charset=utf-8'),
+    'json': ('ndjson', 'application/x-ndjson'),
+}
+
+
+def leer_filas(archivo, formato):
+    """Itera diccionarios desde un archivo de texto abierto, sin cargarlo entero"""
+    if formato == 'csv':
+        yield from csv.DictReader(archivo)
+    else:
+        for linea in archivo:
+            if linea.strip():
+                yield json.loads(linea)
+
+
+def validar_fila(datos, usuario=None):
+    """Retorna un Producto sin guardar o lanza ValueError con los errores de la fila"""
+    datos = {campo: datos.get(campo) for campo in CAMPOS_IMPORTACION}
+    if datos['activo'] in (None, ''):
+        datos['activo'] = True
+    form = ImportacionProductoForm(datos)
+    if not form.is_valid():
+        errores = '; '.join(f'{campo}: {" ".join(mensajes)}' for campo, mensajes in form.errors.items())
+        raise ValueError(errores)
+    producto = form.save(commit=False)
+    producto.usuario_creador = usuario
+    return producto
+
+
+def _guardar_lote(productos):
+    """Upsert de un lote; retorna los ids afectados"""
+    # Un mismo código dos veces en el lote: gana la última fila
+    con_codigo = {p.codigo: p for p in productos if p.codigo}
+    sin_codigo = [p for p in productos if not p.codigo]
+
+    with transaction.atomic():
+        anteriores = {}
+        if con_codigo:
+            # El upsert no informa el estado anterior: se lee (y bloquea) antes para estadísticas e historial
+            anteriores = Producto.objects.select_for_update().only(*CAMPOS_ESTADO).in_bulk(
+                list(con_codigo), field_name='codigo'
+            )
+            Producto.objects.bulk_create(
+                con_codigo.values(),
+                update_conflicts=True,
+                unique_fields=['codigo'],
+                update_fields=CAMPOS_UPSERT,
+            )
+        creados = Producto.objects.bulk_create(sin_codigo)
+        pks = [p.pk for p in creados]
+        # bulk_create no dispara señales: se registran y reindexan explícitamente
+        cambios.registrar(creados, CambioProducto.ALTA)
+        deltas = [(None, estadisticas.estado(p)) for p in creados]
+        movimientos = [(p.pk, None, historial.estado(p)) for p in creados]
+        if con_codigo:
+            actualizados = Producto.objects.filter(codigo__in=list(con_codigo))
+            # El upsert no puede incrementar la versión: así las ediciones abiertas detectan el cambio
+            actualizados.update(**Producto.marcar_modificacion())
+            upsert = list(actualizados.only(*CAMPOS_ESTADO))
+            pks_upsert = [p.pk for p in upsert]
+            cambios.registrar_ids(pks_upsert)
+            for producto in upsert:
+                anterior = anteriores.get(producto.codigo)
+                deltas.append((anterior and estadisticas.estado(anterior), estadisticas.estado(producto)))
+                movimientos.append((producto.pk, anterior and historial.estado(anterior), historial.estado(producto)))
+            pks += pks_upsert
+        estadisticas.aplicar_deltas(deltas)
+        historial.registrar(movimientos)
+        obtener_backend().actualizar_ids(pks)
+    cache_catalogo.invalidar_productos(pks)
+    return pks
+
+
+def importar(filas, usuario=None, lote=1000, al_avanzar=None, al_fallar=None):
+    """
+    Valida e importa `filas` en lotes de `lote`.
+
+    `al_avanzar(procesadas, segundos)` se llama tras cada lote y
+    `al_fallar(numero_fila, mensaje)` por cada fila inválida.
+    """
+    inicio = time.perf_counter()
+    resultado = {'procesadas': 0, 'guardadas': 0, 'errores': 0}
+    pendientes = []
+
+    def vaciar():
+        if pendientes:
+            resultado['guardadas'] += len(_guardar_lote(pendientes))
+            pendientes.clear()
+        if al_avanzar:
+            al_avanzar(resultado['procesadas'], time.perf_counter() - inicio)
+
+    for numero, datos in enumerate(filas, start=1):
+        resultado['procesadas'] += 1
+        try:
+            pendientes.append(validar_fila(datos, usuario))
+        except ValueError as error:
+            resultado['errores'] += 1
+            if al_fallar:
+                al_fallar(numero, str(error))
+            continue
+        if len(pendientes) >= lote:
+            vaciar()
+    vaciar()
+
+    resultado['segundos'] = time.perf_counter() - inicio
+    return resultado
+
+
+def _exportable(valor):
+    if hasattr(valor, 'isoformat'):
+        return valor.isoformat()
+    if valor is None or isinstance(valor, (bool, int, str)):
+        return valor
+    return str(valor)
+
+
+class _Eco:
+    """Pseudo-archivo: csv.writer retorna la línea en vez de escribirla"""
+
+    def write(self, valor):
+        return valor
+
+
+def lineas_exportacion(queryset, formato, chunk_size=2000):
+    """
+    Genera el contenido de la exportación línea por línea.
+
+    `.iterator()` usa un cursor del lado del servidor en PostgreSQL (bloques
+    de `chunk_size` en SQLite), así que la memoria no crece con la tabla.
+    """
+    filas = queryset.order_by('pk').values_list(*CAMPOS_EXPORTACION).iterator(chunk_size=chunk_size)
+    if formato == 'csv':
+        escritor = csv.writer(_Eco())
+        yield escritor.writerow(CAMPOS_EXPORTACION)
+        for fila in filas:
+            yield escritor.writerow(fila)
+    else:
+        for fila in filas:
+            datos = {campo: _exportable(valor) for campo, valor in zip(CAMPOS_EXPORTACION, fila)}
+            yield json.dumps(datos, ensure_ascii=False) + '\n'
+
+
+def respuesta_exportacion(queryset, formato, nombre='productos'):
+    """StreamingHttpResponse con la exportación de `queryset` como descarga"""
+    extension, tipo = TIPOS_EXPORTACION[formato]
+    respuesta = StreamingHttpResponse(lineas_exportacion(queryset, formato), content_type=tipo)
+    respuesta['Content-Disposition'] = f'attachment; filename="{nombre}.{extension}"'
+    return respuesta
+
+
+def exportar(salida, formato, queryset=None, chunk_size=2000, al_avanzar=None):
+    """Escribe los productos en `salida` recorriendo la consulta por bloques"""
+    if queryset is None:
+        queryset = Producto.objects.all()
+    lineas = lineas_exportacion(queryset, formato, chunk_size)
+    if formato == 'csv':
+        salida.write(next(lineas))
+
+    inicio = time.perf_counter()
+    total = 0
+    for linea in lineas:
+        salida.write(linea)
+        total += 1
+        if al_avanzar and total % chunk_size == 0:
+            al_avanzar(total, time.perf_counter() - inicio)
+    return {'exportadas': total, 'segundos': time.perf_counter() - inicio}
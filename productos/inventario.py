@@ -0,0 +1,104 @@
+"""
+Reservas de stock seguras ante concurrencia.
+
+Cada reserva es un único UPDATE condicional
+    UPDATE ... SET stock = stock - n WHERE id = ? AND stock >= n
+así que dos peticiones simultáneas nunca venden la misma unidad: la base de
+datos serializa las escrituras sobre la fila y la segunda solo descuenta si
+todavía alcanza. No hay lectura previa del stock (read-modify-write).
+
+`.update()` no dispara las señales de Producto: el valor del inventario en
+ResumenInventario, el registro de cambios, el historial de stock y la caché
+del catálogo se actualizan aquí. Cada UPDATE incrementa también la versión (y la fecha de
+modificación) del producto, para que una edición abierta antes de la
+reserva no devuelva el stock viejo.
+"""
+from collections import Counter
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+
+from . import cache_catalogo, cambios, estadisticas, historial
+from .models import Producto
+
+
+class StockInsuficiente(Exception):
+    """No hay stock para la reserva (o el producto no existe)"""
+
+    def __init__(self, producto_id, cantidad):
+        self.producto_id = producto_id
+        self.cantidad = cantidad
+        super().__init__(f'Stock insuficiente para reservar {cantidad} del producto {producto_id}')
+
+
+def _agrupar(items):
+    # Acepta {producto_id: cantidad} o pares (producto_id, cantidad); suma repetidos
+    pares = items.items() if isinstance(items, dict) else items
+    cantidades = Counter()
+    for producto_id, cantidad in pares:
+        if cantidad <= 0:
+            raise ValueError(f'Cantidad inválida para el producto {producto_id}: {cantidad}')
+        cantidades[producto_id] += cantidad
+    return cantidades
+
+
+def _registrar(cantidades, signo):
+    """Ajusta el valor del inventario, registra el cambio e invalida la caché de los productos movidos"""
+    productos = list(
+        Producto.objects.filter(pk__in=list(cantidades)).only(*cambios.COLUMNAS, 'usuario_creador_id')
+    )
+    deltas = []
+    for producto in productos:
+        ambitos = estadisticas.estado(producto)[0]
+        valor = signo * Decimal(producto.precio) * cantidades[producto.pk]
+        deltas.append((None, (ambitos, 0, 0, valor)))
+    estadisticas.aplicar_deltas(deltas)
+    cambios.registrar(productos)
+    historial.registrar([
+        (producto.pk, (producto.precio, producto.stock - signo * cantidades[producto.pk]), historial.estado(producto))
+        for producto in productos
+    ])
+    pks = list(cantidades)
+    transaction.on_commit(lambda: cache_catalogo.invalidar_productos(pks))
+
+
+def reservar_varios(items):
+    """
+    Reserva todos los ítems o ninguno, en una transacción.
+
+    Los productos se bloquean en orden de id para que dos reservas con los
+    mismos productos en distinto orden no se bloqueen mutuamente.
+    Lanza StockInsuficiente con el primer producto que no alcanza.
+    """
+    cantidades = _agrupar(items)
+    with transaction.atomic():
+        for producto_id in sorted(cantidades):
+            cantidad = cantidades[producto_id]
+            actualizadas = Producto.objects.filter(pk=producto_id, stock__gte=cantidad).update(
+                stock=F('stock') - cantidad, **Producto.marcar_modificacion()
+            )
+            if not actualizadas:
+                raise StockInsuficiente(producto_id, cantidad)
+        _registrar(cantidades, -1)
+
+
+def reservar(producto_id, cantidad):
+    """Descuenta `cantidad` del stock del producto si alcanza"""
+    reservar_varios([(producto_id, cantidad)])
+
+
+def liberar_varios(items):
+    """Devuelve al stock las cantidades de una reserva anulada"""
+    cantidades = _agrupar(items)
+    with transaction.atomic():
+        for producto_id in sorted(cantidades):
+            if not Producto.objects.filter(pk=producto_id).update(
+                stock=F('stock') + cantidades[producto_id], **Producto.marcar_modificacion()
+            ):
+                raise Producto.DoesNotExist(f'No existe el producto {producto_id}')
+        _registrar(cantidades, 1)
+
+
+def liberar(producto_id, cantidad):
+    liberar_varios([(producto_id, cantidad)])
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from productos.benchmarks import sembrar_productos, medir
+from productos.busqueda import obtener_backend, BusquedaIcontains, ORDEN_RELEVANCIA
+from productos.models import Producto
+from productos.paginacion import paginar_por_cursor, ORDEN_CATALOGO
+
+
+class Command(BaseCommand):
+    help = 'Compara la búsqueda con icontains contra el índice de texto completo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanos', type=int, nargs='+', default=[10000, 100000, 1000000])
+        parser.add_argument('--consultas', nargs='+', default=['producto 4242', 'numero 77', 'inexistente'])
+        parser.add_argument('--repeticiones', type=int, default=10)
+
+    def handle(self, *args, **options):
+        indice = obtener_backend()
+        icontains = BusquedaIcontains()
+        queryset = Producto.objects.filter(activo=True)
+
+        self.stdout.write(f'{"filas":>9} {"consulta":<16} {"icontains ms":>13} {type(indice).__name__ + " ms":>20}')
+        with transaction.atomic():
+            sembrados = 0
+            for tamano in sorted(options['tamanos']):
+                sembrados += sembrar_productos(tamano - sembrados)
+                # bulk_create no dispara señales: se indexa todo de una vez
+                indice.reconstruir()
+                for consulta in options['consultas']:
+                    lento = medir(lambda: paginar_por_cursor(
+                        icontains.buscar(queryset, consulta), orden=ORDEN_CATALOGO), options['repeticiones'])
+                    rapido = medir(lambda: paginar_por_cursor(
+                        indice.buscar(queryset, consulta), orden=ORDEN_RELEVANCIA), options['repeticiones'])
+                    self.stdout.write(
+                        f'{tamano:>9} {consulta:<16} {lento["p50"]:>13.2f} {rapido["p50"]:>20.2f}'
+                    )
+            transaction.set_rollback(True)
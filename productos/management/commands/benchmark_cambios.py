@@ -0,0 +1,105 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from contextlib import aclosing
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import override_settings, setup_databases, teardown_databases
+
+from productos import cambios, inventario
+from productos.benchmarks import percentiles, rss_maximo_mb
+from productos.models import Producto
+
+
+class Command(BaseCommand):
+    help = (
+        'Difunde el registro de cambios a muchos suscriptores SSE en un solo proceso (como un '
+        'worker ASGI) mientras otro hilo reserva stock: latencia de entrega y lecturas de la base. '
+        'Usa una base de datos de prueba.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--suscriptores', type=int, default=1000)
+        parser.add_argument('--cambios', type=int, default=200)
+        parser.add_argument('--intervalo', type=float, default=0.01, help='Segundos entre cambios')
+        parser.add_argument('--sondeo', type=float, default=0.1, help='CAMBIOS_SONDEO_SEGUNDOS')
+
+    def handle(self, *args, **options):
+        directorio = tempfile.mkdtemp(prefix='benchmark-cambios-')
+        if connection.vendor == 'sqlite':
+            # El hilo que escribe y el que lee necesitan un archivo compartido
+            connection.settings_dict['TEST']['NAME'] = os.path.join(directorio, 'cambios.sqlite3')
+        configuracion = setup_databases(verbosity=0, interactive=False)
+        try:
+            with override_settings(CAMBIOS_SONDEO_SEGUNDOS=options['sondeo'], PERFILADO_ACTIVO=False):
+                resultado = asyncio.run(self._medir(options))
+        finally:
+            connections.close_all()
+            teardown_databases(configuracion, verbosity=0)
+            shutil.rmtree(directorio, ignore_errors=True)
+
+        latencias = percentiles(resultado['latencias'])
+        self.stdout.write(
+            f'{options["suscriptores"]} suscriptores, {options["cambios"]} cambios en '
+            f'{resultado["duracion"]:.2f} s: {resultado["entregas"]} entregas '
+            f'({resultado["entregas"] / resultado["duracion"]:.0f}/s)\n'
+            f'latencia escritura→entrega ms: p50 {latencias["p50"]:.1f}  p95 {latencias["p95"]:.1f}  '
+            f'p99 {latencias["p99"]:.1f}  máx {latencias["max"]:.1f}\n'
+            f'lecturas del registro: {resultado["lecturas"]} '
+            f'({resultado["lecturas"] / resultado["duracion"]:.1f}/s para todos los suscriptores)  '
+            f'RSS máx {rss_maximo_mb():.0f} MB'
+        )
+        esperadas = options['suscriptores'] * options['cambios']
+        if resultado['entregas'] != esperadas:
+            raise CommandError(f'Se entregaron {resultado["entregas"]} de {esperadas} cambios')
+
+    async def _medir(self, options):
+        pks = await sync_to_async(self._preparar)()
+        desde = await cambios.aultima_posicion()
+        total = options['cambios']
+        latencias = []
+
+        async def suscriptor():
+            recibidas = 0
+            async with aclosing(cambios.eventos(desde, segundos=3600)) as flujo:
+                async for entrada in flujo:
+                    if entrada is None:
+                        continue
+                    latencias.append((time.time() - entrada['fecha'].timestamp()) * 1000)
+                    recibidas += 1
+                    if recibidas == total:
+                        return recibidas
+            return recibidas
+
+        tareas = [asyncio.create_task(suscriptor()) for _ in range(options['suscriptores'])]
+        # Que todos estén conectados antes de escribir
+        await cambios.difusor().listo.wait()
+        inicio = time.perf_counter()
+        await asyncio.to_thread(self._escribir, pks, total, options['intervalo'])
+        entregas = sum(await asyncio.wait_for(asyncio.gather(*tareas), timeout=120))
+        return {
+            'duracion': time.perf_counter() - inicio,
+            'entregas': entregas,
+            'latencias': latencias,
+            'lecturas': cambios.difusor().lecturas,
+        }
+
+    def _preparar(self):
+        return [
+            Producto.objects.create(
+                nombre=f'Difusión {i}', descripcion='Benchmark del registro de cambios', precio=100, stock=10 ** 6
+            ).pk
+            for i in range(20)
+        ]
+
+    def _escribir(self, pks, total, intervalo):
+        try:
+            for i in range(total):
+                inventario.reservar(pks[i % len(pks)], 1)
+                time.sleep(intervalo)
+        finally:
+            connections.close_all()
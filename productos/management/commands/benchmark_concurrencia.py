@@ -0,0 +1,121 @@
+import os
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test.utils import override_settings, setup_databases, teardown_databases
+from django.urls import reverse
+
+from productos import estadisticas
+from productos.benchmarks import (
+    cliente_de_prueba, iniciar_servidor_wsgi, peticion_http, percentiles, sembrar_productos, sesion_de,
+)
+from productos.busqueda import obtener_backend
+
+
+class Command(BaseCommand):
+    help = (
+        'Carga mixta de lecturas del catálogo y altas con agregar_producto contra un servidor '
+        'WSGI con varios hilos, comparando la configuración de base de datos actual con una sin '
+        'ajustes (sin PRAGMAs ni conexiones persistentes). Usa una base de datos de prueba.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=5000)
+        parser.add_argument('--peticiones', type=int, default=600)
+        parser.add_argument('--concurrencia', type=int, default=16)
+        parser.add_argument('--hilos', type=int, default=8, help='Hilos del servidor WSGI')
+        parser.add_argument('--escrituras', type=float, default=0.2, help='Fracción de peticiones POST')
+
+    def handle(self, *args, **options):
+        directorio = tempfile.mkdtemp(prefix='benchmark-bd-')
+        if connection.vendor == 'sqlite':
+            # Un archivo real: WAL y los bloqueos no aplican a una base en memoria
+            connection.settings_dict['TEST']['NAME'] = os.path.join(directorio, 'benchmark.sqlite3')
+        configuracion = setup_databases(verbosity=0, interactive=False)
+        try:
+            with override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver', '127.0.0.1'],
+                                   PERFILADO_ACTIVO=False, IMAGENES_EN_SEGUNDO_PLANO=False):
+                self._medir(options)
+        finally:
+            teardown_databases(configuracion, verbosity=0)
+            shutil.rmtree(directorio, ignore_errors=True)
+
+    def _medir(self, options):
+        cliente_de_prueba()
+        usuario = User.objects.create_user('benchmark-concurrencia', password='x')
+        sembrar_productos(options['productos'], usuario=usuario)
+        obtener_backend().reconstruir()
+        estadisticas.reconstruir()
+        sesion = sesion_de(usuario)
+
+        actual = connection.settings_dict
+        original = {clave: actual[clave] for clave in ('CONN_MAX_AGE', 'OPTIONS')}
+        configuraciones = [
+            # Lo que traía settings.py antes: conexión por petición, opciones y PRAGMAs por defecto
+            ('sin ajustes', {'SQLITE_PRAGMAS': {'journal_mode': 'DELETE'}}, {'CONN_MAX_AGE': 0, 'OPTIONS': {}}),
+            ('actual', {}, original),
+        ]
+        self.stdout.write(f'{"configuración":<14} {"req/s":>8} {"lect. p50":>10} {"lect. p99":>10} '
+                          f'{"escr. p50":>10} {"escr. p99":>10} {"errores":>8}')
+        try:
+            for nombre, ajustes, ajustes_bd in configuraciones:
+                connections.close_all()
+                # Las conexiones de los hilos del servidor se crean con este mismo diccionario
+                actual.update(ajustes_bd)
+                with override_settings(**ajustes):
+                    # La primera conexión aplica (o revierte) journal_mode en el archivo
+                    connection.ensure_connection()
+                    resultado = self._cargar(sesion, options)
+                connections.close_all()
+                self.stdout.write(
+                    f'{nombre:<14} {resultado["rps"]:>8.1f} {resultado["lectura"]["p50"]:>10.1f} '
+                    f'{resultado["lectura"]["p99"]:>10.1f} {resultado["escritura"]["p50"]:>10.1f} '
+                    f'{resultado["escritura"]["p99"]:>10.1f} {resultado["errores"]:>8}'
+                )
+        finally:
+            actual.update(original)
+
+    def _cargar(self, sesion, options):
+        servidor = iniciar_servidor_wsgi(hilos=options['hilos'])
+        catalogo = reverse('lista_productos')
+        agregar = reverse('agregar_producto')
+        azar = random.Random(42)
+        plan = [azar.random() < options['escrituras'] for _ in range(options['peticiones'])]
+
+        def peticion(indice):
+            escritura = plan[indice]
+            inicio = time.perf_counter()
+            if escritura:
+                estado = peticion_http(servidor.base, 'POST', agregar, {
+                    'nombre': f'Alta {indice}', 'descripcion': 'Carga concurrente',
+                    'precio': '990', 'stock': '3', 'activo': 'on',
+                }, sesion)
+                correcta = estado == 302
+            else:
+                # Sesión iniciada: el catálogo no sale de la caché de páginas anónimas
+                estado = peticion_http(servidor.base, 'GET', catalogo, {'q': f'producto {indice % 97}'}, sesion)
+                correcta = estado == 200
+            return escritura, (time.perf_counter() - inicio) * 1000, correcta
+
+        try:
+            inicio = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['concurrencia']) as pool:
+                resultados = list(pool.map(peticion, range(len(plan))))
+            duracion = time.perf_counter() - inicio
+        finally:
+            servidor.cerrar()
+
+        lecturas = [tiempo for escritura, tiempo, _ in resultados if not escritura] or [0]
+        escrituras = [tiempo for escritura, tiempo, _ in resultados if escritura] or [0]
+        return {
+            'rps': len(resultados) / duracion,
+            'lectura': percentiles(lecturas),
+            'escritura': percentiles(escrituras),
+            'errores': sum(1 for _, _, correcta in resultados if not correcta),
+        }
@@ -0,0 +1,51 @@
+import time
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.urls import reverse
+
+from productos.benchmarks import cliente_de_prueba, sembrar_productos
+
+
+class Command(BaseCommand):
+    help = 'Mide el tiempo al primer byte y la memoria máxima de las exportaciones en streaming'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanos', type=int, nargs='+', default=[10000, 100000, 1000000])
+        parser.add_argument('--formato', choices=['csv', 'json'], default='csv')
+
+    def handle(self, *args, **options):
+        rutas = {
+            'catalogo': f'{reverse("exportar_catalogo")}?formato={options["formato"]}',
+            'admin': reverse('admin:productos_producto_exportar', args=[options['formato']]),
+        }
+        # Todo corre dentro de una transacción que se revierte al final
+        with transaction.atomic():
+            cliente = cliente_de_prueba()
+            cliente.force_login(User.objects.create_superuser('benchmark-exportacion', password='x'))
+
+            self.stdout.write(f'{"filas":>9} {"vista":<9} {"TTFB ms":>9} {"total s":>8} {"pico MB":>8} {"MB":>8}')
+            sembrados = 0
+            for tamano in sorted(options['tamanos']):
+                sembrados += sembrar_productos(tamano - sembrados)
+                for nombre, ruta in rutas.items():
+                    self._medir(cliente, tamano, nombre, ruta)
+            transaction.set_rollback(True)
+
+    def _medir(self, cliente, tamano, nombre, ruta):
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        contenido = iter(cliente.get(ruta).streaming_content)
+        recibidos = len(next(contenido))
+        primer_byte = time.perf_counter() - inicio
+        for bloque in contenido:
+            recibidos += len(bloque)
+        total = time.perf_counter() - inicio
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.stdout.write(
+            f'{tamano:>9} {nombre:<9} {primer_byte * 1000:>9.1f} {total:>8.2f} '
+            f'{pico / 1024 / 1024:>8.1f} {recibidos / 1024 / 1024:>8.1f}'
+        )
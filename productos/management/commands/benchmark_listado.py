@@ -0,0 +1,78 @@
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from productos import tarjetas
+from productos.benchmarks import medir, sembrar_productos
+from productos.models import Producto
+from productos.paginacion import ORDEN_CATALOGO
+
+
+def _bytes(valor):
+    if valor is None:
+        return 0
+    if isinstance(valor, str):
+        return len(valor.encode())
+    if isinstance(valor, (bytes, memoryview)):
+        return len(valor)
+    return 8
+
+
+class Command(BaseCommand):
+    help = (
+        'Bytes por fila, filas por segundo y memoria del listado del catálogo: filas completas con '
+        'el creador (antes) frente a las columnas de la tarjeta'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=5000)
+        parser.add_argument('--palabras', type=int, default=300, help='Largo de cada descripción')
+        parser.add_argument('--repeticiones', type=int, default=10)
+
+    def handle(self, *args, **options):
+        # Todo corre dentro de una transacción que se revierte al final
+        with transaction.atomic():
+            usuario = User.objects.create_user('benchmark-listado', first_name='Ana', last_name='Pérez')
+            sembrar_productos(options['productos'], usuario=usuario)
+            texto = ' '.join(f'palabra{i}' for i in range(options['palabras']))
+            Producto.objects.update(descripcion=texto)
+            self._medir(options['repeticiones'])
+            transaction.set_rollback(True)
+
+    def _medir(self, repeticiones):
+        base = Producto.objects.filter(activo=True).order_by(*ORDEN_CATALOGO)
+        consultas = {
+            'anterior': base.select_related('usuario_creador'),
+            'proyeccion': base.only(*tarjetas.COLUMNAS, 'fecha_creacion'),
+        }
+        self.stdout.write(f'{"consulta":<11} {"bytes/fila":>11} {"filas/s":>10} {"KB/1000 filas":>14}')
+        for nombre, queryset in consultas.items():
+            filas = len(queryset)
+            resultado = medir(lambda: list(queryset.all()), repeticiones)
+            self.stdout.write(
+                f'{nombre:<11} {self._bytes_por_fila(queryset):>11.0f} {filas * 1000 / resultado["p50"]:>10.0f} '
+                f'{self._memoria(queryset) * 1000 / filas / 1024:>14.0f}'
+            )
+
+    def _bytes_por_fila(self, queryset):
+        """Lo que devuelve la base por fila (texto en UTF-8, 8 bytes por número o fecha)"""
+        sql, parametros = queryset.query.sql_with_params()
+        total = filas = 0
+        with connection.cursor() as cursor:
+            cursor.execute(sql, parametros)
+            for fila in cursor.fetchall():
+                total += sum(_bytes(valor) for valor in fila)
+                filas += 1
+        return total / filas
+
+    def _memoria(self, queryset):
+        tracemalloc.start()
+        try:
+            objetos = list(queryset.all())
+            actual, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        del objetos
+        return actual
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from productos.benchmarks import cliente_de_prueba, sembrar_productos, medir
+from productos.models import Producto
+from productos.paginacion import paginar_por_cursor
+
+
+class Command(BaseCommand):
+    help = 'Mide la latencia del catálogo paginado por cursor en páginas profundas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=20000)
+        parser.add_argument('--paginas', type=int, default=200)
+        parser.add_argument('--repeticiones', type=int, default=20)
+
+    def handle(self, *args, **options):
+        # Todo corre dentro de una transacción que se revierte al final
+        with transaction.atomic():
+            sembrar_productos(options['productos'])
+            self._medir(options['paginas'], options['repeticiones'])
+            transaction.set_rollback(True)
+
+    def _medir(self, paginas, repeticiones):
+        cliente = cliente_de_prueba()
+        queryset = Producto.objects.filter(activo=True)
+        cursores = {}
+        cursor = None
+        for numero in range(1, paginas + 1):
+            cursores[numero] = cursor
+            cursor = paginar_por_cursor(queryset, cursor).siguiente
+            if cursor is None:
+                break
+
+        self.stdout.write(f'{"página":>8} {"p50 ms":>10} {"p95 ms":>10}')
+        for numero in sorted({1, 2, 10, 50, 100, paginas} & cursores.keys()):
+            datos = {'cursor': cursores[numero]} if cursores[numero] else {}
+            resultado = medir(lambda: cliente.get('/', datos), repeticiones)
+            self.stdout.write(f'{numero:>8} {resultado["p50"]:>10.2f} {resultado["p95"]:>10.2f}')
@@ -0,0 +1,56 @@
+from django.contrib.auth import authenticate, password_validation
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client
+from django.urls import reverse
+
+from productos.benchmarks import cliente_de_prueba, medir
+from productos.forms import RegistroUsuarioForm, precargar_validadores_contrasena
+
+
+class Command(BaseCommand):
+    help = 'Mide registros por segundo de /accounts/registro/ frente al flujo anterior (doble validación y authenticate)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--registros', type=int, default=20)
+
+    def handle(self, *args, **options):
+        cliente_de_prueba()
+        precargar_validadores_contrasena()
+        self.numero = 0
+        url = reverse('registro')
+
+        def registro_actual():
+            respuesta = Client().post(url, self._datos())
+            assert respuesta.status_code == 302, respuesta.status_code
+
+        # Todo corre dentro de una transacción que se revierte al final
+        with transaction.atomic():
+            resultados = {
+                'anterior': medir(self._flujo_anterior, options['registros']),
+                'actual': medir(registro_actual, options['registros']),
+            }
+            transaction.set_rollback(True)
+
+        self.stdout.write(f'{"flujo":<10} {"p50 ms":>9} {"p95 ms":>9} {"registros/s":>12}')
+        for nombre, resultado in resultados.items():
+            self.stdout.write(
+                f'{nombre:<10} {resultado["p50"]:>9.1f} {resultado["p95"]:>9.1f} {1000 / resultado["p50"]:>12.2f}'
+            )
+
+    def _datos(self):
+        self.numero += 1
+        return {
+            'username': f'bench{self.numero}', 'email': f'bench{self.numero}@ejemplo.cl',
+            'first_name': 'Ana', 'last_name': 'Pérez',
+            'password1': 'Clave-Segura-2024', 'password2': 'Clave-Segura-2024',
+        }
+
+    def _flujo_anterior(self):
+        # Validadores dos veces (UserCreationForm y _post_clean), hash al guardar y otro en authenticate()
+        datos = self._datos()
+        form = RegistroUsuarioForm(datos)
+        assert form.is_valid(), form.errors
+        password_validation.validate_password(datos['password2'], form.instance)
+        form.save()
+        assert authenticate(username=datos['username'], password=datos['password1']) is not None
@@ -0,0 +1,73 @@
+import json
+import platform
+import shutil
+import tempfile
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_databases, teardown_databases
+from django.utils import timezone
+
+from productos.benchmarks import CASOS_RUTAS, Escenario, ejecutar_casos, rutas_sin_caso
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide todas las rutas de config/urls.py con el cliente de pruebas y con un servidor '
+        'WSGI real, sobre una base de datos de prueba sembrada a distintas escalas. '
+        'Guarda percentiles, consultas SQL y RSS máximo en JSON (ver comparar_benchmarks).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, nargs='+', default=[1000],
+                            help='Escalas a medir, p. ej. 1000 100000 1000000')
+        parser.add_argument('--usuarios', type=int, default=10)
+        parser.add_argument('--repeticiones', type=int, default=20)
+        parser.add_argument('--modos', nargs='+', choices=['cliente', 'wsgi'], default=['cliente', 'wsgi'])
+        parser.add_argument('--casos', nargs='+', choices=[caso[0] for caso in CASOS_RUTAS])
+        parser.add_argument('--salida', default='benchmark_rutas.json')
+
+    def handle(self, *args, **options):
+        faltantes = rutas_sin_caso()
+        if faltantes:
+            raise CommandError(f'Rutas sin caso en CASOS_RUTAS: {", ".join(sorted(faltantes))}')
+
+        media = tempfile.mkdtemp(prefix='benchmark-media-')
+        # Base de datos de prueba desechable: la real no se modifica
+        configuracion = setup_databases(verbosity=0, interactive=False)
+        try:
+            with override_settings(DEBUG=False, MEDIA_ROOT=media, ALLOWED_HOSTS=['testserver', '127.0.0.1'],
+                                   IMAGENES_EN_SEGUNDO_PLANO=False, PERFILADO_ACTIVO=False):
+                resultados = self._medir(options)
+        finally:
+            teardown_databases(configuracion, verbosity=0)
+            shutil.rmtree(media, ignore_errors=True)
+
+        with open(options['salida'], 'w', encoding='utf-8') as salida:
+            json.dump({
+                'fecha': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'motor': connection.vendor,
+                'repeticiones': options['repeticiones'],
+                'resultados': resultados,
+            }, salida, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f'{len(resultados)} mediciones guardadas en {options["salida"]}'))
+
+    def _medir(self, options):
+        escenario = Escenario(usuarios=options['usuarios'])
+        resultados = []
+        self.stdout.write(f'{"escala":>8} {"modo":<8} {"caso":<22} {"p50 ms":>8} {"p95 ms":>8} '
+                          f'{"p99 ms":>8} {"SQL":>4} {"err":>4} {"RSS MB":>7}')
+        for escala in sorted(options['productos']):
+            escenario.ampliar(escala)
+            for fila in ejecutar_casos(escenario, options['repeticiones'], options['modos'], options['casos']):
+                fila['escala'] = escala
+                resultados.append(fila)
+                consultas = '-' if fila['consultas'] is None else fila['consultas']
+                self.stdout.write(
+                    f'{escala:>8} {fila["modo"]:<8} {fila["caso"]:<22} {fila["p50"]:>8.2f} {fila["p95"]:>8.2f} '
+                    f'{fila["p99"]:>8.2f} {consultas:>4} {fila["errores"]:>4} {fila["rss_mb"]:>7.1f}'
+                )
+        return resultados
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.template import Context, Template
+
+from productos import tarjetas
+from productos.benchmarks import medir
+from productos.models import Producto
+
+
+class Command(BaseCommand):
+    help = 'Tarjetas del catálogo por segundo: plantilla de Django frente a productos/tarjetas.py (sin base de datos)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tarjetas', type=int, default=3000)
+        parser.add_argument('--repeticiones', type=int, default=10)
+
+    def handle(self, *args, **options):
+        productos = self._productos(options['tarjetas'])
+        plantilla = Template(tarjetas.PLANTILLA_REFERENCIA)
+
+        def con_plantilla():
+            for producto in productos:
+                plantilla.render(Context({'producto': producto}))
+
+        def precompilada():
+            renderizar = tarjetas.Renderizador()
+            for producto in productos:
+                renderizar(producto)
+
+        assert all(plantilla.render(Context({'producto': p})) == tarjetas.renderizar(p) for p in productos[:50])
+        self.stdout.write(f'{"render":<13} {"p50 ms":>9} {"p95 ms":>9} {"tarjetas/s":>12}')
+        for nombre, funcion in (('plantilla', con_plantilla), ('precompilada', precompilada)):
+            resultado = medir(funcion, options['repeticiones'])
+            self.stdout.write(
+                f'{nombre:<13} {resultado["p50"]:>9.1f} {resultado["p95"]:>9.1f} '
+                f'{len(productos) * 1000 / resultado["p50"]:>12.0f}'
+            )
+
+    def _productos(self, cantidad):
+        resumen = Producto._meta.get_field('descripcion_corta')
+        productos = []
+        for i in range(cantidad):
+            producto = Producto(
+                pk=i + 1, nombre=f'Producto {i} <edición "especial">', precio=f'{i % 1000 + 1}.50', stock=i % 50,
+                descripcion=' '.join(f'palabra{j}' for j in range(i % 30)),
+            )
+            producto.precio = Producto._meta.get_field('precio').to_python(producto.precio)
+            resumen.pre_save(producto, add=True)
+            producto.miniatura = f'/media/derivados/tarjeta/{i}.webp' if i % 2 else None
+            productos.append(producto)
+        return productos
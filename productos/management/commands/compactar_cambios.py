@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from productos import cambios
+
+
+class Command(BaseCommand):
+    help = (
+        'Acota el registro de cambios de productos (CAMBIOS_RETENCION_DIAS, CAMBIOS_MAXIMO). '
+        'Pensado para ejecutarse periódicamente (cron).'
+    )
+
+    def handle(self, *args, **options):
+        eliminadas = cambios.compactar()
+        self.stdout.write(self.style.SUCCESS(
+            f'{eliminadas} entradas eliminadas; registro completo desde la posición {cambios.horizonte()}'
+        ))
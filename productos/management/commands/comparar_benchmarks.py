@@ -0,0 +1,35 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from productos.benchmarks import comparar_resultados
+
+
+class Command(BaseCommand):
+    help = 'Compara dos archivos de benchmark_rutas y falla si hay regresiones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('base', help='JSON de referencia (p. ej. el de la rama principal)')
+        parser.add_argument('nuevo')
+        parser.add_argument('--tolerancia', type=float, default=0.2,
+                            help='Aumento relativo de p50/p95 tolerado (0.2 = 20%%)')
+        parser.add_argument('--minimo-ms', type=float, default=1.0,
+                            help='Diferencias absolutas menores se consideran ruido')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['base'], encoding='utf-8') as archivo:
+                base = json.load(archivo)
+            with open(options['nuevo'], encoding='utf-8') as archivo:
+                nuevo = json.load(archivo)
+        except (OSError, ValueError) as error:
+            raise CommandError(str(error))
+
+        regresiones = comparar_resultados(base, nuevo, options['tolerancia'], options['minimo_ms'])
+        for (escala, modo, caso), metrica, antes, despues in regresiones:
+            self.stdout.write(self.style.WARNING(
+                f'{escala:>8} {modo:<8} {caso:<22} {metrica:<10} {antes:>10.2f} -> {despues:>10.2f}'
+            ))
+        if regresiones:
+            raise CommandError(f'{len(regresiones)} regresiones respecto de {options["base"]}')
+        self.stdout.write(self.style.SUCCESS('Sin regresiones'))
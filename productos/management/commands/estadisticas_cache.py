@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from productos import cache_catalogo
+
+
+class Command(BaseCommand):
+    help = 'Muestra los aciertos y fallos de la caché de páginas del catálogo'
+
+    def handle(self, *args, **options):
+        datos = cache_catalogo.estadisticas()
+        self.stdout.write(
+            f"Aciertos: {datos['aciertos']}  Fallos: {datos['fallos']}  "
+            f"Tasa de aciertos: {datos['tasa_aciertos']:.1%}  "
+            f"Versión del catálogo: {cache_catalogo.version_catalogo()}"
+        )
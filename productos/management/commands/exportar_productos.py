@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from productos import importacion
+from productos.models import Producto
+
+
+class Command(BaseCommand):
+    help = 'Exporta los productos a CSV o NDJSON sin cargarlos todos en memoria'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--formato', choices=['csv', 'json'], default='csv')
+        parser.add_argument('--salida', help='Archivo de destino (por defecto la salida estándar)')
+        parser.add_argument('--bloque', type=int, default=2000, help='Filas leídas por consulta')
+        parser.add_argument('--solo-activos', action='store_true')
+
+    def handle(self, *args, **options):
+        queryset = Producto.objects.all()
+        if options['solo_activos']:
+            queryset = queryset.filter(activo=True)
+
+        def al_avanzar(filas, segundos):
+            self.stderr.write(f'{filas} filas exportadas ({filas / segundos if segundos else 0:.0f} filas/s)')
+
+        if options['salida']:
+            with open(options['salida'], 'w', newline='', encoding='utf-8') as salida:
+                resultado = importacion.exportar(salida, options['formato'], queryset, options['bloque'], al_avanzar)
+        else:
+            resultado = importacion.exportar(self.stdout, options['formato'], queryset, options['bloque'], al_avanzar)
+        self.stderr.write(self.style.SUCCESS(
+            f'{resultado["exportadas"]} productos exportados en {resultado["segundos"]:.1f} s'
+        ))
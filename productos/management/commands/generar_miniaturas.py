@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from productos import imagenes
+from productos.models import ImagenRemota, Producto
+
+
+class Command(BaseCommand):
+    help = 'Descarga las imágenes de los productos y genera sus miniaturas locales'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--forzar', action='store_true', help='Regenera también las ya procesadas')
+
+    def handle(self, *args, **options):
+        urls = Producto.objects.exclude(imagen_url__isnull=True).exclude(imagen_url='') \
+            .order_by().values_list('imagen_url', flat=True).distinct()
+        listas = errores = 0
+        for url in urls.iterator():
+            registro = imagenes.procesar(url, forzar=options['forzar'])
+            if registro.estado == ImagenRemota.LISTA:
+                listas += 1
+            else:
+                errores += 1
+                self.stderr.write(f'{url}: {registro.error}')
+        self.stdout.write(self.style.SUCCESS(f'{listas} imágenes listas, {errores} con error'))
@@ -0,0 +1,57 @@
+import os
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from productos import importacion
+
+
+class Command(BaseCommand):
+    help = 'Importa productos desde CSV o NDJSON, actualizando por código los existentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help="Ruta del archivo, o '-' para leer de la entrada estándar")
+        parser.add_argument('--formato', choices=['csv', 'json'],
+                            help='Por defecto se deduce de la extensión (.csv, .json, .ndjson)')
+        parser.add_argument('--lote', type=int, default=1000)
+        parser.add_argument('--usuario', help='Nombre del usuario creador de los productos nuevos')
+
+    def handle(self, *args, **options):
+        archivo = options['archivo']
+        formato = options['formato'] or ('csv' if archivo.endswith('.csv') else 'json')
+        if archivo == '-' and not options['formato']:
+            raise CommandError('Indique --formato al leer de la entrada estándar')
+
+        usuario = None
+        if options['usuario']:
+            try:
+                usuario = User.objects.get(username=options['usuario'])
+            except User.DoesNotExist:
+                raise CommandError(f'No existe el usuario {options["usuario"]}')
+
+        def al_avanzar(filas, segundos):
+            self.stderr.write(f'{filas} filas procesadas ({filas / segundos if segundos else 0:.0f} filas/s)')
+
+        def al_fallar(numero, mensaje):
+            self.stderr.write(self.style.WARNING(f'Fila {numero} omitida: {mensaje}'))
+
+        entrada = sys.stdin if archivo == '-' else open(archivo, newline='', encoding='utf-8')
+        try:
+            resultado = importacion.importar(
+                importacion.leer_filas(entrada, formato),
+                usuario=usuario,
+                lote=options['lote'],
+                al_avanzar=al_avanzar,
+                al_fallar=al_fallar,
+            )
+        except (OSError, ValueError) as error:
+            raise CommandError(str(error))
+        finally:
+            if entrada is not sys.stdin:
+                entrada.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{resultado["guardadas"]} productos guardados, {resultado["errores"]} filas omitidas '
+            f'en {resultado["segundos"]:.1f} s'
+        ))
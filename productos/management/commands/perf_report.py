@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from productos import perfilado
+from productos.models import MetricaVista
+
+
+class Command(BaseCommand):
+    help = ('Muestra las vistas más costosas según el perfilado por petición '
+            '(solo peticiones muestreadas; valores por petición salvo "total s")')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limite', type=int, default=20)
+        parser.add_argument('--orden', choices=['tiempo_total_ms', 'p95_ms', 'consultas', 'repetidas'],
+                            default='tiempo_total_ms')
+        parser.add_argument('--reiniciar', action='store_true', help='Borra las métricas tras mostrarlas')
+
+    def handle(self, *args, **options):
+        filas = sorted(perfilado.informe(), key=lambda fila: fila[options['orden']], reverse=True)
+        if not filas:
+            self.stdout.write('Sin métricas: active PERFILADO_ACTIVO y espere el primer volcado')
+
+        encabezado = (f'{"vista":<32} {"pet.":>7} {"total s":>8} {"media ms":>9} {"p50":>6} {"p95":>6} '
+                      f'{"p99":>6} {"SQL":>6} {"SQL ms":>7} {"rep.":>5} {"tpl ms":>7}')
+        if filas:
+            self.stdout.write(encabezado)
+        for fila in filas[:options['limite']]:
+            self.stdout.write(
+                f'{fila["vista"][:32]:<32} {fila["peticiones"]:>7} {fila["tiempo_total_ms"] / 1000:>8.1f} '
+                f'{fila["media_ms"]:>9.1f} {fila["p50_ms"]:>6} {fila["p95_ms"]:>6} {fila["p99_ms"]:>6} '
+                f'{fila["consultas"]:>6.1f} {fila["sql_ms"]:>7.1f} {fila["repetidas"]:>5.1f} '
+                f'{fila["plantillas_ms"]:>7.1f}'
+            )
+
+        if options['reiniciar']:
+            MetricaVista.objects.all().delete()
+            self.stdout.write(self.style.SUCCESS('Métricas reiniciadas'))
@@ -0,0 +1,66 @@
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from productos.benchmarks import percentiles
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera carga HTTP concurrente contra uno o más servidores y compara '
+        'peticiones por segundo y latencias. Ejemplo, con el mismo hardware:\n'
+        '  gunicorn config.wsgi -w 4 -b :8000 & uvicorn config.asgi:application --workers 4 --port 8001 &\n'
+        '  manage.py prueba_carga wsgi=http://127.0.0.1:8000 asgi=http://127.0.0.1:8001'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('destinos', nargs='+', help='nombre=url_base')
+        parser.add_argument('--rutas', nargs='+', default=['/', '/?q=producto'])
+        parser.add_argument('--peticiones', type=int, default=2000)
+        parser.add_argument('--concurrencia', type=int, default=32)
+        parser.add_argument('--timeout', type=float, default=10)
+
+    def handle(self, *args, **options):
+        destinos = []
+        for destino in options['destinos']:
+            nombre, separador, url = destino.partition('=')
+            if not separador:
+                raise CommandError(f'Formato esperado nombre=url, recibido: {destino}')
+            destinos.append((nombre, url.rstrip('/')))
+
+        self.stdout.write(f'{"servidor":<10} {"ruta":<16} {"req/s":>9} {"p50 ms":>9} {"p99 ms":>9} {"errores":>8}')
+        for nombre, base in destinos:
+            for ruta in options['rutas']:
+                resultado = self._cargar(base + ruta, options)
+                self.stdout.write(
+                    f'{nombre:<10} {ruta:<16} {resultado["rps"]:>9.1f} '
+                    f'{resultado["p50"]:>9.2f} {resultado["p99"]:>9.2f} {resultado["errores"]:>8}'
+                )
+
+    def _peticion(self, url, timeout):
+        inicio = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=timeout) as respuesta:
+                respuesta.read()
+                correcta = respuesta.status == 200
+        except (urllib.error.URLError, OSError):
+            correcta = False
+        return (time.perf_counter() - inicio) * 1000, correcta
+
+    def _cargar(self, url, options):
+        # Calentamiento: la primera petición carga plantillas y conexiones
+        self._peticion(url, options['timeout'])
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrencia']) as pool:
+            resultados = list(pool.map(
+                lambda _: self._peticion(url, options['timeout']), range(options['peticiones'])
+            ))
+        duracion = time.perf_counter() - inicio
+        return {
+            'rps': len(resultados) / duracion,
+            'errores': sum(1 for _, correcta in resultados if not correcta),
+            **percentiles([tiempo for tiempo, _ in resultados]),
+        }
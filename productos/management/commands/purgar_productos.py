@@ -0,0 +1,38 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from productos import eliminacion
+from productos.models import Producto
+
+
+class Command(BaseCommand):
+    help = (
+        'Borra definitivamente los productos dados de baja, por lotes y con pausas entre ellos. '
+        'Con --continuo queda como worker revisando cada --intervalo segundos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=None, help='Filas por transacción (PURGA_LOTE)')
+        parser.add_argument('--pausa', type=float, default=None, help='Segundos entre lotes (PURGA_PAUSA_SEGUNDOS)')
+        parser.add_argument('--minutos', type=float, default=0, help='Solo bajas más antiguas que esto')
+        parser.add_argument('--continuo', action='store_true')
+        parser.add_argument('--intervalo', type=float, default=60)
+
+    def handle(self, *args, **options):
+        while True:
+            pendientes = Producto.todos.eliminados().count()
+            inicio = time.perf_counter()
+            borrados = eliminacion.purgar(
+                lote=options['lote'], pausa=options['pausa'], antiguedad=timedelta(minutes=options['minutos']),
+                al_avanzar=lambda n: self.stdout.write(f'\r{n}/{pendientes}', ending=''),
+            )
+            if borrados:
+                self.stdout.write('')
+            self.stdout.write(self.style.SUCCESS(
+                f'{borrados} productos purgados en {time.perf_counter() - inicio:.1f} s'
+            ))
+            if not options['continuo']:
+                return
+            time.sleep(options['intervalo'])
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from productos import estadisticas
+
+
+class Command(BaseCommand):
+    help = 'Recalcula desde cero los resúmenes de inventario del dashboard'
+
+    def handle(self, *args, **options):
+        filas = estadisticas.reconstruir()
+        self.stdout.write(self.style.SUCCESS(f'{filas} resúmenes reconstruidos'))
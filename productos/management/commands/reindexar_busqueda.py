@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from productos.busqueda import obtener_backend
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye desde cero el índice de búsqueda de texto completo'
+
+    def handle(self, *args, **options):
+        backend = obtener_backend()
+        backend.reconstruir()
+        self.stdout.write(self.style.SUCCESS(f'Índice reconstruido con {type(backend).__name__}'))
@@ -0,0 +1,114 @@
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+from django.test.utils import setup_databases, teardown_databases
+
+from productos import estadisticas
+from productos.inventario import StockInsuficiente, reservar_varios
+from productos.models import Producto
+
+
+def _trabajador(semilla, pks, reservas, maximo, items):
+    """Proceso hijo: intenta `reservas` reservas aleatorias y cuenta lo reservado"""
+    connections.close_all()
+    azar = random.Random(semilla)
+    reservado = Counter()
+    exitosas = rechazadas = errores = 0
+    for _ in range(reservas):
+        pedido = {pk: azar.randint(1, maximo) for pk in azar.sample(pks, items)}
+        try:
+            reservar_varios(pedido)
+        except StockInsuficiente:
+            rechazadas += 1
+        except OperationalError:
+            errores += 1
+        else:
+            exitosas += 1
+            reservado.update(pedido)
+    connections.close_all()
+    return exitosas, rechazadas, errores, reservado
+
+
+class Command(BaseCommand):
+    help = (
+        'Reserva stock desde varios procesos a la vez sobre pocos productos y verifica que '
+        'no haya sobreventa; informa reservas por segundo. Usa una base de datos de prueba.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=8)
+        parser.add_argument('--reservas', type=int, default=300, help='Reservas por proceso')
+        parser.add_argument('--productos', type=int, default=5)
+        parser.add_argument('--stock', type=int, default=1000)
+        parser.add_argument('--maximo', type=int, default=3, help='Unidades máximas por ítem')
+        parser.add_argument('--items', type=int, default=2, help='Productos por reserva')
+
+    def handle(self, *args, **options):
+        if options['items'] > options['productos']:
+            raise CommandError('--items no puede superar --productos')
+        directorio = tempfile.mkdtemp(prefix='stress-reservas-')
+        if connection.vendor == 'sqlite':
+            # Los procesos hijos necesitan un archivo compartido, no una base en memoria
+            connection.settings_dict['TEST']['NAME'] = os.path.join(directorio, 'stress.sqlite3')
+        configuracion = setup_databases(verbosity=0, interactive=False)
+        try:
+            self._ejecutar(options)
+        finally:
+            teardown_databases(configuracion, verbosity=0)
+            shutil.rmtree(directorio, ignore_errors=True)
+
+    def _ejecutar(self, options):
+        pks = [
+            Producto.objects.create(
+                nombre=f'Stress {i}', descripcion='Reservas concurrentes', precio=100 + i, stock=options['stock']
+            ).pk
+            for i in range(options['productos'])
+        ]
+        connections.close_all()
+
+        contexto = multiprocessing.get_context('fork')
+        argumentos = [
+            (semilla, pks, options['reservas'], options['maximo'], options['items'])
+            for semilla in range(options['procesos'])
+        ]
+        inicio = time.perf_counter()
+        with contexto.Pool(options['procesos']) as pool:
+            resultados = pool.starmap(_trabajador, argumentos)
+        duracion = time.perf_counter() - inicio
+
+        exitosas = sum(r[0] for r in resultados)
+        rechazadas = sum(r[1] for r in resultados)
+        errores = sum(r[2] for r in resultados)
+        reservado = sum((r[3] for r in resultados), Counter())
+
+        sobreventa = []
+        for producto in Producto.objects.filter(pk__in=pks):
+            esperado = options['stock'] - reservado[producto.pk]
+            if producto.stock < 0 or producto.stock != esperado:
+                sobreventa.append(f'{producto.pk}: stock {producto.stock}, esperado {esperado}')
+
+        valor_real = Producto.objects.aggregate(valor=Sum(
+            ExpressionWrapper(F('precio') * F('stock'), output_field=DecimalField())
+        ))['valor'] or 0
+        resumen = estadisticas.leer(estadisticas.GLOBAL)[estadisticas.GLOBAL]
+
+        intentos = exitosas + rechazadas + errores
+        self.stdout.write(
+            f'{options["procesos"]} procesos, {intentos} intentos en {duracion:.2f} s: '
+            f'{intentos / duracion:.0f} reservas/s ({exitosas / duracion:.0f} exitosas/s)\n'
+            f'exitosas {exitosas}, sin stock {rechazadas}, errores de bloqueo {errores}, '
+            f'unidades reservadas {sum(reservado.values())}'
+        )
+        if resumen.valor_inventario != valor_real:
+            sobreventa.append(f'valor del inventario {resumen.valor_inventario}, real {valor_real}')
+        if sobreventa:
+            raise CommandError('Inconsistencias: ' + '; '.join(sobreventa))
+        self.stdout.write(self.style.SUCCESS('Sin sobreventa: el stock final cuadra con lo reservado'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from productos import estaticos
+
+
+class Command(BaseCommand):
+    help = 'Descarga Bootstrap a productos/static/productos/vendor/ verificando su hash SRI'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--forzar', action='store_true', help='Descarga también los ya vendorizados')
+
+    def handle(self, *args, **options):
+        for ruta in estaticos.VENDORIZADOS:
+            if estaticos.vendorizado(ruta) and not options['forzar']:
+                self.stdout.write(f'{ruta}: ya vendorizado')
+                continue
+            try:
+                destino = estaticos.descargar(ruta)
+            except (OSError, ValueError) as error:
+                raise CommandError(f'{ruta}: {error}')
+            self.stdout.write(f'{ruta}: {destino.stat().st_size} bytes')
+        self.stdout.write(self.style.SUCCESS('Listo; ejecutar collectstatic para publicarlos'))
@@ -0,0 +1,49 @@
+from django.db import migrations
+
+
+def crear_indice(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE productos_producto_fts USING fts5("
+            "nombre, descripcion, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            "INSERT INTO productos_producto_fts (rowid, nombre, descripcion) "
+            "SELECT id, nombre, descripcion FROM productos_producto"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+        schema_editor.execute(
+            "CREATE TABLE productos_producto_busqueda ("
+            "producto_id bigint PRIMARY KEY REFERENCES productos_producto (id) ON DELETE CASCADE, "
+            "documento tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX productos_producto_busqueda_gin "
+            "ON productos_producto_busqueda USING GIN (documento)"
+        )
+        schema_editor.execute(
+            "INSERT INTO productos_producto_busqueda (producto_id, documento) "
+            "SELECT id, setweight(to_tsvector('spanish', unaccent(nombre)), 'A') || "
+            "setweight(to_tsvector('spanish', unaccent(descripcion)), 'B') FROM productos_producto"
+        )
+
+
+def eliminar_indice(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS productos_producto_fts")
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP TABLE IF EXISTS productos_producto_busqueda")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("productos", "0003_remove_producto_categoria_producto_imagen_url_and_more"),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, eliminar_indice),
+    ]
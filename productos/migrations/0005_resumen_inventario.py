@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:09
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def poblar_resumenes(apps, schema_editor):
+    Producto = apps.get_model("productos", "Producto")
+    ResumenInventario = apps.get_model("productos", "ResumenInventario")
+    acumulado = defaultdict(lambda: [0, 0, Decimal(0)])
+    for producto in Producto.objects.iterator():
+        ambitos = ["global", f"dia:{timezone.localdate(producto.fecha_creacion).isoformat()}"]
+        if producto.usuario_creador_id:
+            ambitos.append(f"usuario:{producto.usuario_creador_id}")
+        for ambito in ambitos:
+            fila = acumulado[ambito]
+            fila[0] += 1
+            fila[1] += int(producto.activo)
+            fila[2] += producto.precio * producto.stock
+    ResumenInventario.objects.bulk_create(
+        ResumenInventario(
+            ambito=ambito, total_productos=t, productos_activos=a, valor_inventario=v
+        )
+        for ambito, (t, a, v) in acumulado.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("productos", "0004_indice_busqueda"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ResumenInventario",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "ambito",
+                    models.CharField(max_length=40, unique=True, verbose_name="Ámbito"),
+                ),
+                (
+                    "total_productos",
+                    models.IntegerField(default=0, verbose_name="Total de Productos"),
+                ),
+                (
+                    "productos_activos",
+                    models.IntegerField(default=0, verbose_name="Productos Activos"),
+                ),
+                (
+                    "valor_inventario",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=18,
+                        verbose_name="Valor Inventario",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Resumen de Inventario",
+                "verbose_name_plural": "Resúmenes de Inventario",
+            },
+        ),
+        migrations.RunPython(poblar_resumenes, migrations.RunPython.noop),
+    ]
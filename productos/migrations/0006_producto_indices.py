@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("productos", "0005_resumen_inventario"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="producto",
+            index=models.Index(
+                condition=models.Q(("activo", True)),
+                fields=["-fecha_creacion", "-id"],
+                name="producto_catalogo_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="producto",
+            index=models.Index(
+                fields=["-fecha_creacion", "-id"], name="producto_fecha_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("productos", "0006_producto_indices"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImagenRemota",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "url_hash",
+                    models.CharField(
+                        max_length=64, unique=True, verbose_name="Hash de la URL"
+                    ),
+                ),
+                ("url", models.URLField(max_length=500, verbose_name="URL")),
+                (
+                    "contenido",
+                    models.CharField(
+                        blank=True, max_length=64, verbose_name="Hash del contenido"
+                    ),
+                ),
+                (
+                    "formato",
+                    models.CharField(blank=True, max_length=10, verbose_name="Formato"),
+                ),
+                (
+                    "estado",
+                    models.CharField(
+                        choices=[
+                            ("pendiente", "Pendiente"),
+                            ("lista", "Lista"),
+                            ("error", "Error"),
+                        ],
+                        default="pendiente",
+                        max_length=10,
+                        verbose_name="Estado",
+                    ),
+                ),
+                (
+                    "error",
+                    models.CharField(blank=True, max_length=200, verbose_name="Error"),
+                ),
+                (
+                    "fecha_actualizacion",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="Última actualización"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Imagen Remota",
+                "verbose_name_plural": "Imágenes Remotas",
+            },
+        ),
+    ]
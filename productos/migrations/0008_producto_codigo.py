@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("productos", "0007_imagenremota"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="producto",
+            name="codigo",
+            field=models.CharField(
+                blank=True,
+                help_text="Identificador del producto en el ERP; se usa para importar y actualizar en lote",
+                max_length=64,
+                null=True,
+                unique=True,
+                verbose_name="Código (SKU)",
+            ),
+        ),
+    ]
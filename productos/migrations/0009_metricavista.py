@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0008_producto_codigo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricaVista',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vista', models.CharField(max_length=200, verbose_name='Vista')),
+                ('cubeta_ms', models.PositiveIntegerField(verbose_name='Hasta (ms)')),
+                ('peticiones', models.PositiveIntegerField(default=0, verbose_name='Peticiones')),
+                ('tiempo_ms', models.FloatField(default=0, verbose_name='Tiempo total (ms)')),
+                ('consultas', models.PositiveIntegerField(default=0, verbose_name='Consultas SQL')),
+                ('tiempo_sql_ms', models.FloatField(default=0, verbose_name='Tiempo SQL (ms)')),
+                ('consultas_repetidas', models.PositiveIntegerField(default=0, verbose_name='Consultas repetidas')),
+                ('tiempo_plantillas_ms', models.FloatField(default=0, verbose_name='Tiempo de plantillas (ms)')),
+            ],
+            options={
+                'verbose_name': 'Métrica de Vista',
+                'verbose_name_plural': 'Métricas de Vistas',
+                'constraints': [models.UniqueConstraint(fields=('vista', 'cubeta_ms'), name='metrica_vista_cubeta_unica')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0009_metricavista'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='version',
+            field=models.PositiveIntegerField(default=1, help_text='Aumenta con cada escritura; evita pisar cambios concurrentes', verbose_name='Versión'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:43
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0011_producto_fecha_modificacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CambioProducto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('producto_id', models.BigIntegerField(null=True, verbose_name='Producto')),
+                ('operacion', models.CharField(choices=[('alta', 'Alta'), ('cambio', 'Cambio'), ('baja', 'Baja'), ('compactacion', 'Compactación')], max_length=12, verbose_name='Operación')),
+                ('datos', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, null=True, verbose_name='Datos')),
+                ('fecha', models.DateTimeField(auto_now_add=True, verbose_name='Fecha')),
+            ],
+            options={
+                'verbose_name': 'Cambio de Producto',
+                'verbose_name_plural': 'Cambios de Productos',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['producto_id', '-id'], name='cambio_producto_idx'), models.Index(fields=['fecha'], name='cambio_fecha_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations
+
+import productos.models
+
+
+def resumir_descripciones(apps, schema_editor):
+    Producto = apps.get_model('productos', 'Producto')
+    campo = Producto._meta.get_field('descripcion_corta')
+    lote = []
+    for producto in Producto.objects.only('pk', 'descripcion').iterator(chunk_size=2000):
+        producto.descripcion_corta = campo.resumir(producto.descripcion)
+        lote.append(producto)
+        if len(lote) == 2000:
+            Producto.objects.bulk_update(lote, ['descripcion_corta'])
+            lote = []
+    Producto.objects.bulk_update(lote, ['descripcion_corta'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0012_cambioproducto'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='descripcion_corta',
+            field=productos.models.TextoResumidoField(blank=True, editable=False, origen='descripcion', palabras=15, verbose_name='Descripción corta'),
+        ),
+        migrations.RunPython(resumir_descripciones, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0013_producto_descripcion_corta'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='producto',
+            name='producto_catalogo_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='producto',
+            name='producto_fecha_idx',
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='fecha_eliminacion',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Eliminado el'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(condition=models.Q(('activo', True), ('fecha_eliminacion__isnull', True)), fields=['-fecha_creacion', '-id'], name='producto_catalogo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['-fecha_creacion', '-id', 'fecha_eliminacion'], name='producto_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(condition=models.Q(('fecha_eliminacion__isnull', False)), fields=['fecha_eliminacion'], name='producto_eliminados_idx'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0014_producto_fecha_eliminacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistorialDia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('movimientos', models.PositiveIntegerField(default=0, verbose_name='Movimientos')),
+                ('cambios_precio', models.PositiveIntegerField(default=0, verbose_name='Cambios de precio')),
+                ('entradas', models.BigIntegerField(default=0, verbose_name='Unidades ingresadas')),
+                ('salidas', models.BigIntegerField(default=0, verbose_name='Unidades egresadas')),
+                ('suma_precios_centavos', models.BigIntegerField(default=0, verbose_name='Suma de precios (centavos)')),
+                ('precio_minimo_centavos', models.BigIntegerField(default=0, verbose_name='Precio mínimo (centavos)')),
+                ('precio_maximo_centavos', models.BigIntegerField(default=0, verbose_name='Precio máximo (centavos)')),
+                ('dia', models.DateField(unique=True, verbose_name='Día')),
+            ],
+            options={
+                'verbose_name': 'Historial por Día',
+                'verbose_name_plural': 'Historial por Día',
+            },
+        ),
+        migrations.CreateModel(
+            name='HistorialHora',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('movimientos', models.PositiveIntegerField(default=0, verbose_name='Movimientos')),
+                ('cambios_precio', models.PositiveIntegerField(default=0, verbose_name='Cambios de precio')),
+                ('entradas', models.BigIntegerField(default=0, verbose_name='Unidades ingresadas')),
+                ('salidas', models.BigIntegerField(default=0, verbose_name='Unidades egresadas')),
+                ('suma_precios_centavos', models.BigIntegerField(default=0, verbose_name='Suma de precios (centavos)')),
+                ('precio_minimo_centavos', models.BigIntegerField(default=0, verbose_name='Precio mínimo (centavos)')),
+                ('precio_maximo_centavos', models.BigIntegerField(default=0, verbose_name='Precio máximo (centavos)')),
+                ('inicio', models.DateTimeField(unique=True, verbose_name='Hora')),
+            ],
+            options={
+                'verbose_name': 'Historial por Hora',
+                'verbose_name_plural': 'Historial por Hora',
+            },
+        ),
+        migrations.CreateModel(
+            name='HistorialProducto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('producto_id', models.BigIntegerField(verbose_name='Producto')),
+                ('fecha', models.DateTimeField(verbose_name='Fecha')),
+                ('precio_centavos', models.BigIntegerField(verbose_name='Precio (centavos)')),
+                ('delta_stock', models.SmallIntegerField(verbose_name='Variación de stock')),
+            ],
+            options={
+                'verbose_name': 'Historial de Producto',
+                'verbose_name_plural': 'Historial de Productos',
+                'indexes': [models.Index(fields=['producto_id', 'fecha'], name='historial_producto_idx')],
+            },
+        ),
+    ]
@@ -1,12 +1,82 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
+from django.utils.functional import cached_property
+from django.utils.text import Truncator
+
+class ConflictoVersion(Exception):
+    """Otro usuario guardó el producto después de que se leyó (control optimista)"""
+
+    def __init__(self, producto_id, version):
+        self.producto_id = producto_id
+        self.version = version
+        super().__init__(f'El producto {producto_id} ya no está en la versión {version}')
+
+
+class TextoResumidoField(models.TextField):
+    """
+    Primeras `palabras` palabras del campo `origen`, igual que el filtro
+    truncatewords. Se calcula al guardar, también en bulk_create.
+    """
+
+    def __init__(self, *args, origen, palabras, **kwargs):
+        self.origen = origen
+        self.palabras = palabras
+        kwargs.setdefault('editable', False)
+        kwargs.setdefault('blank', True)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        nombre, ruta, args, kwargs = super().deconstruct()
+        kwargs.update(origen=self.origen, palabras=self.palabras)
+        return nombre, ruta, args, kwargs
+
+    def resumir(self, texto):
+        return Truncator(texto or '').words(self.palabras, truncate=' …')
+
+    def pre_save(self, model_instance, add):
+        valor = self.resumir(getattr(model_instance, self.origen))
+        setattr(model_instance, self.attname, valor)
+        return valor
+
+
+class ProductoQuerySet(models.QuerySet):
+
+    def vigentes(self):
+        return self.filter(fecha_eliminacion__isnull=True)
+
+    def eliminados(self):
+        return self.filter(fecha_eliminacion__isnull=False)
+
+
+class ProductoManager(models.Manager.from_queryset(ProductoQuerySet)):
+    """Manager por defecto: oculta los productos dados de baja, que quedan para purgar_productos"""
+
+    def get_queryset(self):
+        return super().get_queryset().vigentes()
+
 
 class Producto(models.Model):
+    codigo = models.CharField(
+        max_length=64,
+        unique=True,
+        null=True,
+        blank=True,
+        verbose_name="Código (SKU)",
+        help_text="Identificador del producto en el ERP; se usa para importar y actualizar en lote"
+    )
     nombre = models.CharField(max_length=200, verbose_name="Nombre del Producto")
     descripcion = models.TextField(verbose_name="Descripción")
+    # Lo que muestran las tarjetas del catálogo (productos/tarjetas.py)
+    descripcion_corta = TextoResumidoField(origen='descripcion', palabras=15, verbose_name="Descripción corta")
     precio = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Precio")
     stock = models.IntegerField(default=0, verbose_name="Stock")
     fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Creación")
+    fecha_modificacion = models.DateTimeField(auto_now=True, verbose_name="Última Modificación")
     usuario_creador = models.ForeignKey(
         User,
         on_delete=models.SET_NULL,
@@ -21,11 +91,48 @@ class Producto(models.Model):
         verbose_name="URL de Imagen",
         help_text="Ingresa la URL de una imagen (ej: https://ejemplo.com/imagen.jpg)"
     )
+    imagen = models.ImageField(
+        upload_to='productos/',
+        blank=True,
+        null=True,
+        verbose_name="Imagen (Archivo)"
+    )
+    version = models.PositiveIntegerField(
+        default=1,
+        verbose_name="Versión",
+        help_text="Aumenta con cada escritura; evita pisar cambios concurrentes"
+    )
+    # Baja lógica (productos/eliminacion.py): la fila se borra después, de a lotes
+    fecha_eliminacion = models.DateTimeField(null=True, blank=True, editable=False, verbose_name="Eliminado el")
+
+    objects = ProductoManager()
+    # Incluye los dados de baja
+    todos = ProductoQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Producto"
         verbose_name_plural = "Productos"
         ordering = ['-fecha_creacion']
+        indexes = [
+            # Catálogo público: WHERE activo AND no eliminado ORDER BY fecha_creacion DESC, id DESC.
+            # Parcial porque Django filtra booleanos como `WHERE activo`, no `activo = 1`
+            models.Index(
+                fields=['-fecha_creacion', '-id'],
+                condition=models.Q(activo=True, fecha_eliminacion__isnull=True),
+                name='producto_catalogo_idx',
+            ),
+            # Admin (date_hierarchy y orden por defecto sin filtrar por activo). Incluye
+            # fecha_eliminacion para resolver el filtro de Producto.objects (y su COUNT) en el índice
+            models.Index(fields=['-fecha_creacion', '-id', 'fecha_eliminacion'], name='producto_fecha_idx'),
+            # Max(fecha_modificacion) para los ETag de la API
+            models.Index(fields=['fecha_modificacion'], name='producto_modificacion_idx'),
+            # Lo pendiente de purgar, sin indexar las filas vigentes
+            models.Index(
+                fields=['fecha_eliminacion'],
+                condition=models.Q(fecha_eliminacion__isnull=False),
+                name='producto_eliminados_idx',
+            ),
+        ]
         permissions = [
             ("puede_ver_estadisticas", "Puede ver estadísticas de productos"),
         ]
@@ -33,10 +140,233 @@ class Producto(models.Model):
     def __str__(self):
         return f"{self.nombre} - ${self.precio}"
 
-    def get_imagen(self):
-        """Retorna la URL de la imagen, priorizando imagen_url sobre imagen local"""
+    def save(self, *args, **kwargs):
+        """
+        Al editar, el UPDATE solo afecta a la fila si sigue en la versión leída
+        (compare-and-swap) y la incrementa; si otro la cambió antes lanza
+        ConflictoVersion. Con update_fields solo se escriben esos campos.
+        """
+        # La imagen pudo cambiar: se vuelve a resolver en el próximo acceso
+        self.__dict__.pop('imagen_principal', None)
+        campos = kwargs.get('update_fields')
+        if self._state.adding or self.pk is None or kwargs.get('force_insert') or campos == []:
+            super().save(*args, **kwargs)
+            return
+
+        if campos is not None:
+            kwargs['update_fields'] = {*campos, *self.campos_derivados(campos), 'version', 'fecha_modificacion'}
+        self._version_esperada = self.version
+        self.version += 1
+        try:
+            super().save(*args, **kwargs)
+        except ConflictoVersion:
+            self.version = self._version_esperada
+            raise
+        finally:
+            self._version_esperada = None
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        esperada = getattr(self, '_version_esperada', None)
+        if esperada is None:
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+        if super()._do_update(base_qs.filter(version=esperada), using, pk_val, values, update_fields, forced_update):
+            return True
+        if base_qs.filter(pk=pk_val).exists():
+            raise ConflictoVersion(pk_val, esperada)
+        return False
+
+    @classmethod
+    def campos_derivados(cls, campos):
+        """Campos calculados al guardar que dependen de `campos` (para update_fields y bulk_update)"""
+        return [
+            campo.name for campo in cls._meta.concrete_fields
+            if isinstance(campo, TextoResumidoField) and campo.origen in campos
+        ]
+
+    @staticmethod
+    def marcar_modificacion():
+        """Valores para .update()/bulk_update: lo que save() hace al editar (nueva versión y fecha)"""
+        return {'version': models.F('version') + 1, 'fecha_modificacion': timezone.now()}
+
+    @cached_property
+    def imagen_principal(self):
+        """
+        URL de la imagen a mostrar, resuelta una sola vez por instancia.
+
+        Orden de prioridad: imagen_url, archivo subido y, por último, el
+        placeholder de PRODUCTO_IMAGEN_PLACEHOLDER (None si no hay ninguno).
+        """
         if self.imagen_url:
             return self.imagen_url
-        elif self.imagen:
+        if self.imagen:
             return self.imagen.url
-        return None
+        return getattr(settings, 'PRODUCTO_IMAGEN_PLACEHOLDER', None)
+
+    def get_imagen(self):
+        """Retorna la URL de la imagen, priorizando imagen_url sobre imagen local"""
+        return self.imagen_principal
+
+
+class ResumenInventario(models.Model):
+    """Contadores precalculados del inventario, mantenidos por deltas desde las señales"""
+    ambito = models.CharField(max_length=40, unique=True, verbose_name="Ámbito")
+    total_productos = models.IntegerField(default=0, verbose_name="Total de Productos")
+    productos_activos = models.IntegerField(default=0, verbose_name="Productos Activos")
+    valor_inventario = models.DecimalField(
+        max_digits=18, decimal_places=2, default=0, verbose_name="Valor Inventario"
+    )
+
+    class Meta:
+        verbose_name = "Resumen de Inventario"
+        verbose_name_plural = "Resúmenes de Inventario"
+
+    def __str__(self):
+        return f"{self.ambito}: {self.total_productos} productos"
+
+
+class ImagenRemota(models.Model):
+    """Estado de la descarga y de las miniaturas locales de una imagen_url"""
+    PENDIENTE = 'pendiente'
+    LISTA = 'lista'
+    ERROR = 'error'
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (LISTA, 'Lista'),
+        (ERROR, 'Error'),
+    ]
+
+    url_hash = models.CharField(max_length=64, unique=True, verbose_name="Hash de la URL")
+    url = models.URLField(max_length=500, verbose_name="URL")
+    contenido = models.CharField(max_length=64, blank=True, verbose_name="Hash del contenido")
+    formato = models.CharField(max_length=10, blank=True, verbose_name="Formato")
+    estado = models.CharField(max_length=10, choices=ESTADOS, default=PENDIENTE, verbose_name="Estado")
+    error = models.CharField(max_length=200, blank=True, verbose_name="Error")
+    fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name="Última actualización")
+
+    class Meta:
+        verbose_name = "Imagen Remota"
+        verbose_name_plural = "Imágenes Remotas"
+
+    def __str__(self):
+        return f"{self.url} ({self.estado})"
+
+
+class MetricaVista(models.Model):
+    """Tramo del histograma de tiempos de una vista, acumulado por PerfiladoMiddleware"""
+    vista = models.CharField(max_length=200, verbose_name="Vista")
+    cubeta_ms = models.PositiveIntegerField(verbose_name="Hasta (ms)")
+    peticiones = models.PositiveIntegerField(default=0, verbose_name="Peticiones")
+    tiempo_ms = models.FloatField(default=0, verbose_name="Tiempo total (ms)")
+    consultas = models.PositiveIntegerField(default=0, verbose_name="Consultas SQL")
+    tiempo_sql_ms = models.FloatField(default=0, verbose_name="Tiempo SQL (ms)")
+    consultas_repetidas = models.PositiveIntegerField(default=0, verbose_name="Consultas repetidas")
+    tiempo_plantillas_ms = models.FloatField(default=0, verbose_name="Tiempo de plantillas (ms)")
+
+    class Meta:
+        verbose_name = "Métrica de Vista"
+        verbose_name_plural = "Métricas de Vistas"
+        constraints = [
+            models.UniqueConstraint(fields=['vista', 'cubeta_ms'], name='metrica_vista_cubeta_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.vista} ≤{self.cubeta_ms} ms: {self.peticiones}"
+
+
+class CambioProducto(models.Model):
+    """Entrada del registro append-only de altas, cambios y bajas de productos (productos/cambios.py)"""
+    ALTA = 'alta'
+    CAMBIO = 'cambio'
+    BAJA = 'baja'
+    # Marca de compactación: los consumidores anteriores a datos['hasta'] deben resincronizar
+    COMPACTACION = 'compactacion'
+    OPERACIONES = [
+        (ALTA, 'Alta'),
+        (CAMBIO, 'Cambio'),
+        (BAJA, 'Baja'),
+        (COMPACTACION, 'Compactación'),
+    ]
+
+    # Sin clave foránea: la entrada sobrevive a la baja del producto
+    producto_id = models.BigIntegerField(null=True, verbose_name="Producto")
+    operacion = models.CharField(max_length=12, choices=OPERACIONES, verbose_name="Operación")
+    datos = models.JSONField(null=True, encoder=DjangoJSONEncoder, verbose_name="Datos")
+    fecha = models.DateTimeField(auto_now_add=True, verbose_name="Fecha")
+
+    class Meta:
+        verbose_name = "Cambio de Producto"
+        verbose_name_plural = "Cambios de Productos"
+        ordering = ['id']
+        indexes = [
+            # Compactación: última entrada de cada producto
+            models.Index(fields=['producto_id', '-id'], name='cambio_producto_idx'),
+            models.Index(fields=['fecha'], name='cambio_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.operacion} {self.producto_id}"
+
+
+class HistorialProducto(models.Model):
+    """Fila append-only del historial de precio y stock (productos/historial.py)"""
+    # Sin clave foránea: el historial sobrevive a la purga del producto
+    producto_id = models.BigIntegerField(verbose_name="Producto")
+    fecha = models.DateTimeField(verbose_name="Fecha")
+    precio_centavos = models.BigIntegerField(verbose_name="Precio (centavos)")
+    delta_stock = models.SmallIntegerField(verbose_name="Variación de stock")
+
+    class Meta:
+        verbose_name = "Historial de Producto"
+        verbose_name_plural = "Historial de Productos"
+        indexes = [
+            models.Index(fields=['producto_id', 'fecha'], name='historial_producto_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.producto_id} {self.fecha:%Y-%m-%d %H:%M}: {self.precio_centavos} ({self.delta_stock:+d})"
+
+
+class ResumenHistorial(models.Model):
+    """Acumulado de los movimientos de un período, mantenido por deltas"""
+    movimientos = models.PositiveIntegerField(default=0, verbose_name="Movimientos")
+    cambios_precio = models.PositiveIntegerField(default=0, verbose_name="Cambios de precio")
+    entradas = models.BigIntegerField(default=0, verbose_name="Unidades ingresadas")
+    salidas = models.BigIntegerField(default=0, verbose_name="Unidades egresadas")
+    suma_precios_centavos = models.BigIntegerField(default=0, verbose_name="Suma de precios (centavos)")
+    precio_minimo_centavos = models.BigIntegerField(default=0, verbose_name="Precio mínimo (centavos)")
+    precio_maximo_centavos = models.BigIntegerField(default=0, verbose_name="Precio máximo (centavos)")
+
+    class Meta:
+        abstract = True
+
+    @property
+    def precio_promedio(self):
+        if not self.movimientos:
+            return None
+        return Decimal(self.suma_precios_centavos) / self.movimientos / 100
+
+    @property
+    def variacion_stock(self):
+        return self.entradas - self.salidas
+
+
+class HistorialHora(ResumenHistorial):
+    inicio = models.DateTimeField(unique=True, verbose_name="Hora")
+
+    class Meta:
+        verbose_name = "Historial por Hora"
+        verbose_name_plural = "Historial por Hora"
+
+    def __str__(self):
+        return f"{self.inicio:%Y-%m-%d %H:00}: {self.movimientos} movimientos"
+
+
+class HistorialDia(ResumenHistorial):
+    dia = models.DateField(unique=True, verbose_name="Día")
+
+    class Meta:
+        verbose_name = "Historial por Día"
+        verbose_name_plural = "Historial por Día"
+
+    def __str__(self):
+        return f"{self.dia}: {self.movimientos} movimientos"
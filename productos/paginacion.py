@@ -0,0 +1,170 @@
+import base64
+import json
+import math
+import operator
+from datetime import datetime
+from functools import reduce
+
+from django.conf import settings
+from django.db.models import Q
+
+# Orden del catálogo: coincide con Producto.Meta.ordering, con el id como desempate
+ORDEN_CATALOGO = ('-fecha_creacion', '-pk')
+
+
+class CursorInvalido(ValueError):
+    """El token de paginación recibido no se pudo decodificar"""
+
+
+def _serializar(valor):
+    if isinstance(valor, datetime):
+        return {'dt': valor.isoformat()}
+    return valor
+
+
+def _deserializar(valor):
+    if isinstance(valor, dict):
+        return datetime.fromisoformat(valor['dt'])
+    return valor
+
+
+def _fecha(valor):
+    if not isinstance(valor, dict):
+        raise TypeError(valor)
+    return datetime.fromisoformat(valor['dt'])
+
+
+def _entero(valor):
+    # bool es subclase de int; el rango es el de una columna BIGINT
+    if type(valor) is not int or not -2 ** 63 <= valor < 2 ** 63:
+        raise TypeError(valor)
+    return valor
+
+
+def _real(valor):
+    if isinstance(valor, bool) or not isinstance(valor, (int, float)) or not math.isfinite(valor):
+        raise TypeError(valor)
+    return float(valor)
+
+
+# Tipo de cada campo de orden: un token alterado no llega al filtro con valores de otro tipo
+TIPOS_ORDEN = {'fecha_creacion': _fecha, 'pk': _entero, 'id': _entero, 'relevancia': _real}
+
+
+def codificar_cursor(objeto, direccion, orden=ORDEN_CATALOGO):
+    """Genera un token opaco con los valores de la clave de orden de `objeto`"""
+    valores = [_serializar(getattr(objeto, campo.lstrip('-'))) for campo in orden]
+    crudo = json.dumps([valores, direccion], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip('=')
+
+
+def decodificar_cursor(token, orden=ORDEN_CATALOGO):
+    """Retorna (valores, direccion) o lanza CursorInvalido"""
+    try:
+        relleno = '=' * (-len(token) % 4)
+        valores, direccion = json.loads(base64.urlsafe_b64decode(token + relleno))
+        if direccion not in ('sig', 'ant') or len(valores) != len(orden):
+            raise ValueError(direccion)
+        return [
+            TIPOS_ORDEN.get(campo.lstrip('-'), _deserializar)(valor) for campo, valor in zip(orden, valores)
+        ], direccion
+    except (ValueError, TypeError, KeyError, json.JSONDecodeError) as error:
+        raise CursorInvalido(token) from error
+
+
+def tamano_pagina(valor):
+    """Normaliza ?por_pagina= respetando el máximo configurado"""
+    por_defecto = getattr(settings, 'CATALOGO_PAGINA_TAMANO', 12)
+    maximo = getattr(settings, 'CATALOGO_PAGINA_MAXIMO', 60)
+    try:
+        tamano = int(valor)
+    except (TypeError, ValueError):
+        return por_defecto
+    return max(1, min(tamano, maximo))
+
+
+def _filtro_keyset(orden, valores, hacia_adelante):
+    """
+    Condición lexicográfica "viene después de `valores`" para la clave `orden`.
+
+    Para (a DESC, b DESC) hacia adelante produce:
+    a <= va AND (a < va OR (a = va AND b < vb)). La cota redundante sobre la
+    primera columna permite que el motor recorra el índice como un rango.
+    """
+    condiciones = []
+    iguales = {}
+    for campo, valor in zip(orden, valores):
+        nombre = campo.lstrip('-')
+        descendente = campo.startswith('-')
+        lookup = 'lt' if descendente == hacia_adelante else 'gt'
+        condiciones.append(Q(**iguales, **{f'{nombre}__{lookup}': valor}))
+        iguales[nombre] = valor
+    primero = orden[0].lstrip('-')
+    lookup = 'lte' if orden[0].startswith('-') == hacia_adelante else 'gte'
+    return Q(**{f'{primero}__{lookup}': valores[0]}) & reduce(operator.or_, condiciones)
+
+
+def _invertir(orden):
+    return tuple(campo[1:] if campo.startswith('-') else f'-{campo}' for campo in orden)
+
+
+class PaginaCursor:
+    """Una página del catálogo con los tokens para avanzar y retroceder"""
+
+    def __init__(self, objetos, siguiente=None, anterior=None):
+        self.objetos = objetos
+        self.siguiente = siguiente
+        self.anterior = anterior
+
+    def __iter__(self):
+        return iter(self.objetos)
+
+    def __len__(self):
+        return len(self.objetos)
+
+    def tiene_otras_paginas(self):
+        return bool(self.siguiente or self.anterior)
+
+
+def _preparar(queryset, cursor, por_pagina, orden):
+    tamano = tamano_pagina(por_pagina)
+    direccion = 'sig'
+    if cursor:
+        valores, direccion = decodificar_cursor(cursor, orden)
+        queryset = queryset.filter(_filtro_keyset(orden, valores, direccion == 'sig'))
+    orden_sql = orden if direccion == 'sig' else _invertir(orden)
+    return queryset.order_by(*orden_sql)[:tamano + 1], tamano, direccion
+
+
+def _construir(filas, tamano, direccion, cursor, orden):
+    hay_mas = len(filas) > tamano
+    filas = filas[:tamano]
+
+    if direccion == 'ant':
+        filas.reverse()
+        hay_siguiente, hay_anterior = bool(filas), hay_mas
+    else:
+        hay_siguiente, hay_anterior = hay_mas, bool(cursor) and bool(filas)
+
+    return PaginaCursor(
+        filas,
+        siguiente=codificar_cursor(filas[-1], 'sig', orden) if hay_siguiente else None,
+        anterior=codificar_cursor(filas[0], 'ant', orden) if hay_anterior else None,
+    )
+
+
+def paginar_por_cursor(queryset, cursor=None, por_pagina=None, orden=ORDEN_CATALOGO):
+    """
+    Paginación keyset sobre la clave `orden` (por defecto fecha_creacion, id).
+
+    Cada página se resuelve con un WHERE sobre la clave del último elemento
+    visto, así que la página N cuesta lo mismo que la primera (sin OFFSET).
+    """
+    consulta, tamano, direccion = _preparar(queryset, cursor, por_pagina, orden)
+    return _construir(list(consulta), tamano, direccion, cursor, orden)
+
+
+async def apaginar_por_cursor(queryset, cursor=None, por_pagina=None, orden=ORDEN_CATALOGO):
+    """Versión asíncrona de paginar_por_cursor"""
+    consulta, tamano, direccion = _preparar(queryset, cursor, por_pagina, orden)
+    return _construir([fila async for fila in consulta], tamano, direccion, cursor, orden)
@@ -0,0 +1,270 @@
+"""
+Perfilado por petición: tiempo total, consultas SQL (cantidad, tiempo y
+repetidas) y tiempo de renderizado de plantillas.
+
+Con PERFILADO_ACTIVO, PerfiladoMiddleware mide una fracción
+PERFILADO_MUESTREO de las peticiones, agrega la cabecera Server-Timing a sus
+respuestas y acumula en memoria un histograma por vista que se vuelca a
+MetricaVista cada PERFILADO_VOLCADO_SEGUNDOS. `manage.py perf_report` lee
+esas filas. Las peticiones no muestreadas no pagan nada más que un random().
+
+Las consultas se cuentan con un execute_wrapper instalado en cada conexión
+y las plantillas con el backend PlantillasPerfiladas; ambos solo trabajan
+cuando hay una medición en curso (una ContextVar, que sync_to_async propaga
+al hilo del ORM en las vistas asíncronas).
+"""
+import logging
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import F
+from django.template.backends.django import DjangoTemplates, Template
+
+from .models import MetricaVista
+
+logger = logging.getLogger(__name__)
+
+# Límites superiores de los tramos del histograma; lo más lento cae en el último
+CUBETAS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 60000)
+
+# Campos de MetricaVista que se acumulan, en el orden de Medicion.valores()
+CAMPOS_ACUMULADOS = (
+    'peticiones', 'tiempo_ms', 'consultas', 'tiempo_sql_ms', 'consultas_repetidas', 'tiempo_plantillas_ms',
+)
+
+_medicion = ContextVar('perfilado_medicion', default=None)
+
+_acumulado = defaultdict(lambda: [0] * len(CAMPOS_ACUMULADOS))
+_candado = threading.Lock()
+_ultimo_volcado = time.monotonic()
+
+
+class Medicion:
+    """Lo registrado durante una petición muestreada"""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.total_ms = 0.0
+        self.consultas = 0
+        self.tiempo_sql_ms = 0.0
+        self.sentencias = set()
+        self.tiempo_plantillas_ms = 0.0
+
+    @property
+    def repetidas(self):
+        # Misma sentencia con otros parámetros: el síntoma de un N+1
+        return self.consultas - len(self.sentencias)
+
+    def terminar(self):
+        self.total_ms = (time.perf_counter() - self.inicio) * 1000
+
+    def valores(self):
+        return (1, self.total_ms, self.consultas, self.tiempo_sql_ms, self.repetidas, self.tiempo_plantillas_ms)
+
+    def server_timing(self):
+        return (
+            f'app;dur={self.total_ms:.1f}, '
+            f'db;dur={self.tiempo_sql_ms:.1f};desc="{self.consultas} SQL, {self.repetidas} repetidas", '
+            f'tpl;dur={self.tiempo_plantillas_ms:.1f}'
+        )
+
+
+def registrar_consulta(execute, sql, params, many, context):
+    """execute_wrapper: mide la consulta si la petición actual está siendo perfilada"""
+    medicion = _medicion.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.tiempo_sql_ms += (time.perf_counter() - inicio) * 1000
+        medicion.consultas += 1
+        medicion.sentencias.add(sql)
+
+
+def instalar(sender=None, connection=None, **kwargs):
+    """Receptor de connection_created: agrega registrar_consulta a la conexión nueva"""
+    if registrar_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(registrar_consulta)
+
+
+class _PlantillaMedida(Template):
+
+    def render(self, context=None, request=None):
+        medicion = _medicion.get()
+        if medicion is None:
+            return super().render(context, request)
+        inicio = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            medicion.tiempo_plantillas_ms += (time.perf_counter() - inicio) * 1000
+
+
+class PlantillasPerfiladas(DjangoTemplates):
+    """DjangoTemplates que suma el tiempo de render (incluidas sus consultas) a la medición"""
+
+    def from_string(self, template_code):
+        return _PlantillaMedida(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return _PlantillaMedida(super().get_template(template_name).template, self)
+
+
+def cubeta(total_ms):
+    return CUBETAS_MS[min(bisect_left(CUBETAS_MS, total_ms), len(CUBETAS_MS) - 1)]
+
+
+def acumular(vista, medicion):
+    valores = medicion.valores()
+    with _candado:
+        fila = _acumulado[(vista, cubeta(medicion.total_ms))]
+        for i, valor in enumerate(valores):
+            fila[i] += valor
+
+
+def _volcado_pendiente():
+    intervalo = getattr(settings, 'PERFILADO_VOLCADO_SEGUNDOS', 30)
+    return bool(_acumulado) and time.monotonic() - _ultimo_volcado >= intervalo
+
+
+def volcar():
+    """Suma lo acumulado en este proceso a MetricaVista y lo reinicia"""
+    global _ultimo_volcado
+    with _candado:
+        pendientes = dict(_acumulado)
+        _acumulado.clear()
+        _ultimo_volcado = time.monotonic()
+
+    for (vista, limite), valores in pendientes.items():
+        cambios = {campo: F(campo) + valor for campo, valor in zip(CAMPOS_ACUMULADOS, valores)}
+        try:
+            if MetricaVista.objects.filter(vista=vista, cubeta_ms=limite).update(**cambios):
+                continue
+            try:
+                with transaction.atomic():
+                    MetricaVista.objects.create(
+                        vista=vista, cubeta_ms=limite, **dict(zip(CAMPOS_ACUMULADOS, valores))
+                    )
+            except IntegrityError:
+                # Otro proceso creó el tramo entre el UPDATE y el INSERT
+                MetricaVista.objects.filter(vista=vista, cubeta_ms=limite).update(**cambios)
+        except DatabaseError:
+            logger.exception('No se pudieron guardar las métricas de %s', vista)
+
+
+def _muestrear():
+    return random.random() < getattr(settings, 'PERFILADO_MUESTREO', 1.0)
+
+
+def _nombre_vista(request):
+    coincidencia = getattr(request, 'resolver_match', None)
+    # Las rutas inexistentes (404) no se registran para no crear una fila por URL
+    return coincidencia.view_name if coincidencia else None
+
+
+class PerfiladoMiddleware:
+    """
+    Mide las peticiones muestreadas. Debe ir primero en MIDDLEWARE para que el
+    tiempo incluya al resto de middlewares; en respuestas en streaming no
+    incluye el envío del contenido.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PERFILADO_ACTIVO', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.asincrono = iscoroutinefunction(get_response)
+        if self.asincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.asincrono:
+            return self.__acall__(request)
+        if not _muestrear():
+            return self.get_response(request)
+
+        medicion = Medicion()
+        token = _medicion.set(medicion)
+        try:
+            respuesta = self.get_response(request)
+        finally:
+            _medicion.reset(token)
+        self._registrar(request, respuesta, medicion)
+        if _volcado_pendiente():
+            volcar()
+        return respuesta
+
+    async def __acall__(self, request):
+        if not _muestrear():
+            return await self.get_response(request)
+
+        medicion = Medicion()
+        token = _medicion.set(medicion)
+        try:
+            respuesta = await self.get_response(request)
+        finally:
+            _medicion.reset(token)
+        self._registrar(request, respuesta, medicion)
+        if _volcado_pendiente():
+            await sync_to_async(volcar)()
+        return respuesta
+
+    def _registrar(self, request, respuesta, medicion):
+        medicion.terminar()
+        vista = _nombre_vista(request)
+        if vista:
+            acumular(vista, medicion)
+        if getattr(settings, 'PERFILADO_SERVER_TIMING', True):
+            respuesta['Server-Timing'] = medicion.server_timing()
+
+
+def _percentil(tramos, total, p):
+    """Límite superior del tramo donde se alcanza la fracción `p` de las peticiones"""
+    acumuladas = 0
+    for limite, cantidad in tramos:
+        acumuladas += cantidad
+        if acumuladas >= total * p:
+            return limite
+    return tramos[-1][0]
+
+
+def informe():
+    """Resumen por vista de MetricaVista, de la más costosa (tiempo total) a la menos"""
+    vistas = defaultdict(lambda: {'tramos': [], **{campo: 0 for campo in CAMPOS_ACUMULADOS}})
+    for fila in MetricaVista.objects.order_by('vista', 'cubeta_ms').values('vista', 'cubeta_ms', *CAMPOS_ACUMULADOS):
+        datos = vistas[fila['vista']]
+        datos['tramos'].append((fila['cubeta_ms'], fila['peticiones']))
+        for campo in CAMPOS_ACUMULADOS:
+            datos[campo] += fila[campo]
+
+    resultado = []
+    for vista, datos in vistas.items():
+        n = datos['peticiones']
+        if not n:
+            continue
+        resultado.append({
+            'vista': vista,
+            'peticiones': n,
+            'tiempo_total_ms': datos['tiempo_ms'],
+            'media_ms': datos['tiempo_ms'] / n,
+            'p50_ms': _percentil(datos['tramos'], n, 0.50),
+            'p95_ms': _percentil(datos['tramos'], n, 0.95),
+            'p99_ms': _percentil(datos['tramos'], n, 0.99),
+            'consultas': datos['consultas'] / n,
+            'sql_ms': datos['tiempo_sql_ms'] / n,
+            'repetidas': datos['consultas_repetidas'] / n,
+            'plantillas_ms': datos['tiempo_plantillas_ms'] / n,
+        })
+    return sorted(resultado, key=lambda fila: fila['tiempo_total_ms'], reverse=True)
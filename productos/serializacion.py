@@ -0,0 +1,46 @@
+"""
+Representación JSON de un Producto, compartida por la API y el feed de cambios.
+"""
+from django.db.backends.utils import format_number
+
+from .models import Producto
+
+# Campo de la API: columnas que necesita en .only()
+CAMPOS_API = {
+    'id': ('id',),
+    'codigo': ('codigo',),
+    'nombre': ('nombre',),
+    'descripcion': ('descripcion',),
+    'precio': ('precio',),
+    'stock': ('stock',),
+    'activo': ('activo',),
+    'imagen': ('imagen_url', 'imagen'),
+    'fecha_creacion': ('fecha_creacion',),
+    'fecha_modificacion': ('fecha_modificacion',),
+    'version': ('version',),
+}
+
+
+def columnas(campos, orden=()):
+    """Columnas de .only() para serializar `campos` y paginar por `orden`"""
+    resultado = {'id'}
+    for campo in orden:
+        nombre = campo.lstrip('-')
+        resultado.add('id' if nombre == 'pk' else nombre)
+    for campo in campos:
+        resultado.update(CAMPOS_API[campo])
+    return sorted(resultado)
+
+
+def _precio(producto):
+    # Tras save() el atributo conserva lo asignado (320, '320.5'): mismo formato que al leerlo de la base
+    campo = Producto._meta.get_field('precio')
+    return format_number(campo.to_python(producto.precio), campo.max_digits, campo.decimal_places)
+
+
+def serializar(producto, campos):
+    valores = {'imagen': Producto.get_imagen, 'precio': _precio}
+    return {
+        campo: valores[campo](producto) if campo in valores else getattr(producto, campo)
+        for campo in campos
+    }
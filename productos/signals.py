@@ -0,0 +1,62 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import cache_catalogo, cambios, estadisticas, historial, imagenes
+from .busqueda import obtener_backend
+from .models import CambioProducto, Producto
+
+# Campos que cambian lo que aporta un producto a las estadísticas / al índice de búsqueda
+CAMPOS_ESTADISTICAS = {'precio', 'stock', 'activo', 'usuario_creador', 'fecha_creacion'}
+CAMPOS_BUSQUEDA = {'nombre', 'descripcion'}
+CAMPOS_HISTORIAL = {'precio', 'stock'}
+
+
+def _afecta(update_fields, campos):
+    # update_fields=None es un save() completo
+    return update_fields is None or not campos.isdisjoint(update_fields)
+
+
+@receiver(pre_save, sender=Producto)
+def recordar_estado_anterior(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Guarda lo que el producto aportaba a las estadísticas (y su precio y stock) antes de editarlo"""
+    instance._estado_estadisticas = instance._estado_historial = None
+    if raw or instance._state.adding or instance.pk is None or not _afecta(update_fields, CAMPOS_ESTADISTICAS):
+        return
+    anterior = Producto.objects.filter(pk=instance.pk).only(
+        'precio', 'stock', 'activo', 'usuario_creador_id', 'fecha_creacion'
+    ).first()
+    if anterior is not None:
+        instance._estado_estadisticas = estadisticas.estado(anterior)
+        instance._estado_historial = historial.estado(anterior)
+
+
+@receiver(post_save, sender=Producto)
+def indexar_producto(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    """Mantiene el índice de búsqueda y las estadísticas al crear o editar un producto"""
+    if raw:
+        return
+    # Con update_fields solo se rehace lo que depende de los campos escritos
+    if _afecta(update_fields, CAMPOS_BUSQUEDA):
+        obtener_backend().actualizar(instance)
+    if created or _afecta(update_fields, CAMPOS_ESTADISTICAS):
+        estadisticas.aplicar_delta(instance._estado_estadisticas, estadisticas.estado(instance))
+    if created or (instance._estado_historial is not None and _afecta(update_fields, CAMPOS_HISTORIAL)):
+        historial.registrar([(instance.pk, instance._estado_historial, historial.estado(instance))])
+    cache_catalogo.invalidar_producto(instance.pk)
+    cambios.registrar([instance], CambioProducto.ALTA if created else CambioProducto.CAMBIO)
+    if instance.imagen_url and _afecta(update_fields, {'imagen_url'}):
+        url = instance.imagen_url
+        transaction.on_commit(lambda: imagenes.encolar(url))
+
+
+@receiver(post_delete, sender=Producto)
+def desindexar_producto(sender, instance, **kwargs):
+    if instance.fecha_eliminacion is not None:
+        # Purga de una baja lógica: dar_de_baja() ya hizo todo esto
+        return
+    obtener_backend().eliminar(instance.pk)
+    estadisticas.aplicar_delta(estadisticas.estado(instance), None)
+    historial.registrar([(instance.pk, historial.estado(instance), None)])
+    cache_catalogo.invalidar_producto(instance.pk)
+    cambios.registrar_baja(instance.pk)
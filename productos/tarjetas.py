@@ -0,0 +1,148 @@
+"""
+Tarjetas del catálogo renderizadas sin pasar por el motor de plantillas.
+
+Con miles de tarjetas el costo de la plantilla (resolver variables, el
+filtro truncatewords, {% url %} por producto) dominaba el render del
+catálogo. Renderizador arma el mismo HTML con str.format: la descripción
+ya viene resumida en Producto.descripcion_corta (calculada al guardar), la
+URL de detalle se invierte una sola vez por prefijo y el formato de los
+números se resuelve una vez por respuesta ({% tarjeta_producto %} guarda
+el Renderizador en el render_context de la plantilla).
+
+El catálogo carga solo COLUMNAS (.only()): ni la descripción completa, que
+no tiene límite de largo, ni el usuario creador viajan desde la base.
+
+PLANTILLA_REFERENCIA es la plantilla que reemplaza: la prueba de salida y
+`manage.py benchmark_tarjetas` comparan ambas. Un cambio en el HTML de la
+tarjeta se hace en los dos lugares.
+"""
+from decimal import Decimal
+from functools import lru_cache
+
+from django.urls import get_script_prefix, get_urlconf, reverse
+from django.utils import numberformat
+from django.utils.formats import get_format, localize
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+
+# Columnas de Producto que usa una tarjeta; imagen_url e imagen resuelven la miniatura
+COLUMNAS = ('id', 'nombre', 'descripcion_corta', 'precio', 'stock', 'imagen_url', 'imagen')
+
+PLANTILLA_REFERENCIA = '''
+    <div class="col-md-4 mb-4">
+        <div class="card product-card">
+            {% if producto.miniatura %}
+            <img src="{{ producto.miniatura }}" class="card-img-top" alt="{{ producto.nombre }}"
+                style="height: 200px; object-fit: cover;">
+            {% else %}
+            <div class="card-img-top bg-secondary d-flex align-items-center justify-content-center text-white"
+                style="height: 200px;">
+                <span class="fs-1">📦</span>
+            </div>
+            {% endif %}
+            <div class="card-body">
+                <h5 class="card-title">{{ producto.nombre }}</h5>
+                <p class="card-text text-muted small">{{ producto.descripcion|truncatewords:15 }}</p>
+                <div class="d-flex justify-content-between align-items-center">
+                    <h4 class="text-success mb-0">${{ producto.precio }}</h4>
+                    <small class="text-muted">Stock: {{ producto.stock }}</small>
+                </div>
+            </div>
+            <div class="card-footer bg-transparent">
+                <a href="{% url 'detalle_producto' producto.pk %}" class="btn btn-outline-primary w-100">
+                    Ver Detalles
+                </a>
+            </div>
+        </div>
+    </div>
+    '''
+
+_INICIO = '''
+    <div class="col-md-4 mb-4">
+        <div class="card product-card">
+            '''
+
+_CON_IMAGEN = '''
+            <img src="{miniatura}" class="card-img-top" alt="{nombre}"
+                style="height: 200px; object-fit: cover;">
+            '''
+
+_SIN_IMAGEN = '''
+            <div class="card-img-top bg-secondary d-flex align-items-center justify-content-center text-white"
+                style="height: 200px;">
+                <span class="fs-1">📦</span>
+            </div>
+            '''
+
+_CUERPO = '''
+            <div class="card-body">
+                <h5 class="card-title">{nombre}</h5>
+                <p class="card-text text-muted small">{descripcion}</p>
+                <div class="d-flex justify-content-between align-items-center">
+                    <h4 class="text-success mb-0">${precio}</h4>
+                    <small class="text-muted">Stock: {stock}</small>
+                </div>
+            </div>
+            <div class="card-footer bg-transparent">
+                <a href="{url}" class="btn btn-outline-primary w-100">
+                    Ver Detalles
+                </a>
+            </div>
+        </div>
+    </div>
+    '''
+
+# pk de relleno para invertir la URL de detalle una sola vez
+_MARCA = 918273645
+
+
+@lru_cache(maxsize=16)
+def _partes_url_detalle(prefijo, urlconf):
+    # `prefijo` es parte de la clave: reverse() lo antepone
+    antes, despues = reverse('detalle_producto', args=[_MARCA], urlconf=urlconf).split(str(_MARCA))
+    return escape(antes), escape(despues)
+
+
+@lru_cache(maxsize=16)
+def _formato_numeros(idioma):
+    # Los argumentos de numberformat.format() que number_format() resuelve en cada llamada
+    return (
+        get_format('DECIMAL_SEPARATOR', idioma),
+        get_format('NUMBER_GROUPING', idioma),
+        get_format('THOUSAND_SEPARATOR', idioma),
+    )
+
+
+class Renderizador:
+    """
+    Tarjetas de una misma respuesta: el prefijo de las URLs y el formato de
+    los números se resuelven una vez y no por tarjeta.
+    """
+
+    def __init__(self):
+        self.url_antes, self.url_despues = _partes_url_detalle(get_script_prefix(), get_urlconf())
+        self.decimal, self.agrupacion, self.miles = _formato_numeros(get_language())
+
+    def numero(self, valor):
+        """Como {{ valor }} (localize) para Decimal e int"""
+        if isinstance(valor, (Decimal, int)) and not isinstance(valor, bool):
+            return numberformat.format(valor, self.decimal, None, self.agrupacion, self.miles)
+        return localize(valor)
+
+    def __call__(self, producto):
+        """HTML de la tarjeta de `producto`, idéntico al de PLANTILLA_REFERENCIA"""
+        nombre = escape(producto.nombre)
+        miniatura = getattr(producto, 'miniatura', None)
+        imagen = _CON_IMAGEN.format(miniatura=escape(miniatura), nombre=nombre) if miniatura else _SIN_IMAGEN
+        return mark_safe(_INICIO + imagen + _CUERPO.format(
+            nombre=nombre,
+            descripcion=escape(producto.descripcion_corta),
+            precio=escape(self.numero(producto.precio)),
+            stock=escape(self.numero(producto.stock)),
+            url=f'{self.url_antes}{producto.pk}{self.url_despues}',
+        ))
+
+
+def renderizar(producto):
+    return Renderizador()(producto)
@@ -0,0 +1,14 @@
+from django import template
+
+from productos import tarjetas
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def tarjeta_producto(context, producto):
+    """Tarjeta del catálogo renderizada por productos/tarjetas.py"""
+    renderizador = context.render_context.get(tarjetas.Renderizador)
+    if renderizador is None:
+        renderizador = context.render_context[tarjetas.Renderizador] = tarjetas.Renderizador()
+    return renderizador(producto)
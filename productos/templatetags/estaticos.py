@@ -0,0 +1,20 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+from productos import estaticos
+
+register = template.Library()
+
+
+@register.simple_tag
+def recurso_vendorizado(ruta):
+    """<link> o <script> del recurso local; en desarrollo, de la CDN (con integrity) si aún no se descargó"""
+    if ruta in estaticos.disponibles() or not estaticos.respaldo_cdn():
+        url, atributos = static(ruta), ''
+    else:
+        url, integridad = estaticos.VENDORIZADOS[ruta]
+        atributos = format_html(' integrity="{}" crossorigin="anonymous"', integridad)
+    if ruta.endswith('.css'):
+        return format_html('<link href="{}" rel="stylesheet"{}>', url, atributos)
+    return format_html('<script src="{}"{}></script>', url, atributos)
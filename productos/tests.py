@@ -1,3 +1,1411 @@
-from django.test import TestCase
+import asyncio
+import base64
+import gzip
+import io
+import json
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from contextlib import aclosing
+from datetime import timedelta
+from unittest import mock
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import password_validation
+from django.contrib.auth.models import Permission, User
+from django.core.management import call_command
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import connection, connections, router, transaction
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from django.template.loader import render_to_string
+from django.templatetags.static import static
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone, translation
+
+from . import (
+    cache_catalogo, cambios, concurrencia, eliminacion, estadisticas, estaticos, historial, imagenes, importacion,
+    inventario, perfilado, tarjetas,
+)
+from .benchmarks import CASOS_RUTAS, Escenario, comparar_resultados, ejecutar_casos, rutas_sin_caso, sembrar_productos
+from .busqueda import obtener_backend
+from .forms import ProductoForm
+from .models import (
+    CambioProducto, ConflictoVersion, HistorialDia, HistorialHora, HistorialProducto, ImagenRemota, Producto,
+    ResumenInventario,
+)
+from .paginacion import PaginaCursor, paginar_por_cursor
+
+
+@override_settings(CATALOGO_PAGINA_TAMANO=10, CATALOGO_PAGINA_MAXIMO=20)
+class PaginacionCursorTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        sembrar_productos(35)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_recorre_todas_las_paginas_sin_repetir(self):
+        queryset = Producto.objects.filter(activo=True)
+        vistos = []
+        pagina = paginar_por_cursor(queryset)
+        while True:
+            vistos.extend(p.pk for p in pagina)
+            if not pagina.siguiente:
+                break
+            pagina = paginar_por_cursor(queryset, pagina.siguiente)
+
+        esperados = list(queryset.order_by('-fecha_creacion', '-pk').values_list('pk', flat=True))
+        self.assertEqual(vistos, esperados)
+
+        # Retroceder desde la última página devuelve la penúltima
+        anterior = paginar_por_cursor(queryset, pagina.anterior)
+        self.assertEqual([p.pk for p in anterior], esperados[20:30])
+
+    def test_vista_respeta_tamano_maximo_y_cursor_invalido(self):
+        respuesta = self.client.get(reverse('lista_productos'), {'por_pagina': 500, 'cursor': 'basura'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(respuesta.context['productos']), 20)
+        self.assertIsNone(respuesta.context['pagina'].anterior)
+
+    def test_cursores_alterados_no_llegan_al_filtro(self):
+        def token(contenido):
+            return base64.urlsafe_b64encode(json.dumps(contenido).encode()).decode().rstrip('=')
+
+        alterados = [
+            [['x', 1], 'sig'], ['ab', 'sig'], [[{'dt': '2025-01-01T00:00:00+00:00'}, 'zz'], 'sig'], [[1, 2], 'ant'],
+            [[{'dt': '2025-01-01T00:00:00+00:00'}, 10 ** 30], 'sig'], [[True, 1], 'sig'], [[float('nan'), 1], 'sig'], 'ab',
+        ]
+        for contenido in alterados:
+            cursor = token(contenido)
+            for params in ({'cursor': cursor}, {'cursor': cursor, 'q': 'producto'}):
+                respuesta = self.client.get(reverse('lista_productos'), params)
+                self.assertEqual(respuesta.status_code, 200, (contenido, params))
+                self.assertIsNone(respuesta.context['pagina'].anterior)
+            self.assertEqual(self.client.get(reverse('api_productos'), {'cursor': cursor}).status_code, 400)
+
+
+class BusquedaTextoCompletoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        imagen = 'https://example.com/producto.jpg'
+        cls.cafe = Producto.objects.create(
+            nombre='Café de Colombia', descripcion='Grano tostado', precio=10, imagen_url=imagen)
+        cls.taza = Producto.objects.create(
+            nombre='Taza', descripcion='Ideal para el café', precio=5, imagen_url=imagen)
+        Producto.objects.create(nombre='Tetera', descripcion='Acero', precio=20, imagen_url=imagen)
+
+    def setUp(self):
+        cache.clear()
+
+    def buscar(self, texto):
+        respuesta = self.client.get(reverse('lista_productos'), {'q': texto})
+        return [p.pk for p in respuesta.context['productos']]
+
+    def test_ignora_tildes_y_ordena_por_relevancia(self):
+        # La coincidencia en el nombre pesa más que en la descripción
+        self.assertEqual(self.buscar('cafe'), [self.cafe.pk, self.taza.pk])
+
+    def test_pagina_resultados_por_relevancia(self):
+        url = reverse('lista_productos')
+        primera = self.client.get(url, {'q': 'cafe', 'por_pagina': 1}).context['pagina']
+        segunda = self.client.get(url, {'q': 'cafe', 'por_pagina': 1, 'cursor': primera.siguiente}).context['pagina']
+        self.assertEqual([p.pk for p in primera], [self.cafe.pk])
+        self.assertEqual([p.pk for p in segunda], [self.taza.pk])
+        self.assertIsNone(segunda.siguiente)
+
+    def test_indice_se_actualiza_al_guardar_y_eliminar(self):
+        self.taza.nombre = 'Tazón'
+        self.taza.descripcion = 'Cerámica'
+        self.taza.save()
+        self.assertEqual(self.buscar('cafe'), [self.cafe.pk])
+        self.assertEqual(self.buscar('tazon'), [self.taza.pk])
+
+        self.cafe.delete()
+        self.assertEqual(self.buscar('colombia'), [])
+
+
+class EstadisticasInventarioTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('analista', password='clave-segura-123')
+        cls.usuario.user_permissions.add(Permission.objects.get(codename='puede_ver_estadisticas'))
+
+    def resumen_global(self):
+        resumen = ResumenInventario.objects.get(ambito=estadisticas.GLOBAL)
+        return resumen.total_productos, resumen.productos_activos, resumen.valor_inventario
+
+    def test_deltas_coinciden_con_reconstruccion(self):
+        a = Producto.objects.create(nombre='A', descripcion='a', precio=10, stock=3, usuario_creador=self.usuario)
+        b = Producto.objects.create(nombre='B', descripcion='b', precio=5, stock=2)
+        b.activo = False
+        b.stock = 4
+        b.save()
+        self.assertEqual(self.resumen_global(), (2, 1, Decimal('50.00')))
+
+        a.delete()
+        self.assertEqual(self.resumen_global(), (1, 0, Decimal('20.00')))
+        incremental = list(ResumenInventario.objects.order_by('ambito').values_list(
+            'ambito', 'total_productos', 'productos_activos', 'valor_inventario'))
+        estadisticas.reconstruir()
+        reconstruido = list(ResumenInventario.objects.order_by('ambito').values_list(
+            'ambito', 'total_productos', 'productos_activos', 'valor_inventario'))
+        # La reconstrucción no crea filas para ámbitos que quedaron en cero
+        self.assertEqual([fila for fila in incremental if fila[1]], reconstruido)
+
+    def test_dashboard_lee_resumen_sin_recorrer_productos(self):
+        sembrar_productos(50)
+        estadisticas.reconstruir()
+        self.client.force_login(self.usuario)
+        # sesión + usuario + permisos (2) + lectura de resúmenes + acumulados diarios y por hora
+        with self.assertNumQueries(7):
+            respuesta = self.client.get(reverse('dashboard'))
+        self.assertEqual(respuesta.context['total_productos'], 50)
+
+
+class UserAdminProductosCreadosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'clave-segura-123')
+
+    def crear_usuarios(self, cantidad):
+        usuarios = User.objects.bulk_create(User(username=f'usuario{n}') for n in range(cantidad))
+        for usuario in User.objects.filter(username__in=[u.username for u in usuarios]):
+            Producto.objects.bulk_create(
+                Producto(nombre='P', descripcion='p', precio=1, usuario_creador=usuario) for _ in range(2)
+            )
+
+    def contar_consultas(self, **params):
+        with CaptureQueriesContext(connection) as contexto:
+            respuesta = self.client.get(reverse('admin:auth_user_changelist'), params)
+        self.assertEqual(respuesta.status_code, 200)
+        return len(contexto), respuesta
+
+    def test_consultas_constantes_sin_importar_tamano_de_pagina(self):
+        self.client.force_login(self.admin)
+        self.crear_usuarios(5)
+        pocas, _ = self.contar_consultas()
+        User.objects.bulk_create(User(username=f'extra{n}') for n in range(60))
+        muchas, respuesta = self.contar_consultas()
+        self.assertEqual(pocas, muchas)
+        self.assertContains(respuesta, '<td class="field-productos_creados">2</td>', html=True)
+
+    def test_ordena_y_filtra_por_cantidad(self):
+        self.client.force_login(self.admin)
+        self.crear_usuarios(3)
+        _, respuesta = self.contar_consultas(productos='1-10')
+        self.assertEqual(respuesta.context['cl'].result_count, 3)
+        indice = respuesta.context['cl'].list_display.index('productos_creados')
+        _, respuesta = self.contar_consultas(o=f'-{indice}')
+        self.assertEqual(respuesta.context['cl'].result_list[0].num_productos, 2)
+
+
+class CacheCatalogoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.producto = Producto.objects.create(
+            nombre='Lámpara', descripcion='De escritorio', precio=30, imagen_url='https://example.com/l.jpg')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_pagina_anonima_se_sirve_desde_cache_hasta_que_cambia_un_producto(self):
+        url = reverse('lista_productos')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            respuesta = self.client.get(url)
+        self.assertContains(respuesta, 'Lámpara')
+        self.assertEqual(cache_catalogo.estadisticas()['aciertos'], 1)
+
+        self.producto.nombre = 'Lámpara LED'
+        self.producto.save()
+        self.assertContains(self.client.get(url), 'Lámpara LED')
+        self.assertEqual(cache_catalogo.estadisticas()['fallos'], 2)
+
+    def test_usuarios_autenticados_no_usan_la_cache_de_paginas(self):
+        usuario = User.objects.create_user('cliente', password='clave-segura-123')
+        self.client.force_login(usuario)
+        self.client.get(reverse('lista_productos'))
+        respuesta = self.client.get(reverse('lista_productos'))
+        self.assertContains(respuesta, usuario.username)
+        self.assertEqual(cache_catalogo.estadisticas()['aciertos'], 0)
+
+    def test_invalidar_producto_elimina_solo_sus_fragmentos(self):
+        otro = Producto.objects.create(
+            nombre='Silla', descripcion='x', precio=5, imagen_url='https://example.com/s.jpg')
+        self.client.get(reverse('lista_productos'))
+        clave_lampara = make_template_fragment_key('tarjeta_producto', [self.producto.pk])
+        clave_silla = make_template_fragment_key('tarjeta_producto', [otro.pk])
+        self.assertIsNotNone(cache.get(clave_lampara))
+
+        otro.save()
+        self.assertIsNotNone(cache.get(clave_lampara))
+        self.assertIsNone(cache.get(clave_silla))
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'Los planes se verifican con EXPLAIN QUERY PLAN de SQLite')
+class PlanesConsultaTests(TestCase):
+    """Las consultas calientes sobre Producto deben resolverse con índices"""
+
+    @classmethod
+    def setUpTestData(cls):
+        sembrar_productos(200)
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'clave-segura-123')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def planes(self, url, params=None):
+        """EXPLAIN QUERY PLAN de cada SELECT sobre productos_producto hecho por la vista"""
+        with CaptureQueriesContext(connection) as contexto:
+            self.assertEqual(self.client.get(url, params).status_code, 200)
+        lineas = []
+        with connection.cursor() as cursor:
+            for consulta in contexto.captured_queries:
+                sql = consulta['sql']
+                if sql.startswith('SELECT') and Producto._meta.db_table in sql:
+                    cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                    lineas.extend(fila[-1] for fila in cursor.fetchall())
+        return lineas
+
+    def assertSinScanNiOrdenTemporal(self, lineas):
+        for linea in lineas:
+            self.assertNotIn('TEMP B-TREE FOR ORDER BY', linea)
+            if linea.startswith(f'SCAN {Producto._meta.db_table}'):
+                self.assertIn('INDEX', linea, linea)
+
+    def test_catalogo_primera_pagina_y_profunda(self):
+        url = reverse('lista_productos')
+        self.assertSinScanNiOrdenTemporal(self.planes(url))
+        cursor = self.client.get(url).context['pagina'].siguiente
+        lineas = self.planes(url, {'cursor': cursor})
+        self.assertSinScanNiOrdenTemporal(lineas)
+        self.assertTrue(any('SEARCH' in linea and 'producto_catalogo_idx' in linea for linea in lineas))
+
+    def test_changelist_admin(self):
+        url = reverse('admin:productos_producto_changelist')
+        self.assertSinScanNiOrdenTemporal(self.planes(url))
+        self.assertSinScanNiOrdenTemporal(self.planes(url, {'activo__exact': '1'}))
+        self.assertSinScanNiOrdenTemporal(self.planes(url, {'fecha_creacion__year': '2025'}))
+
+    def test_dashboard_no_recorre_productos(self):
+        self.assertEqual(self.planes(reverse('dashboard')), [])
+
+
+class _ServidorImagenes(BaseHTTPRequestHandler):
+    """Sustituto local de un host de imágenes externo"""
+    archivos = {}
+    redirecciones = {}
+
+    def do_GET(self):
+        if self.path in self.redirecciones:
+            self.send_response(302)
+            self.send_header('Location', self.redirecciones[self.path])
+            self.end_headers()
+            return
+        contenido = self.archivos.get(self.path)
+        if contenido is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(contenido)))
+        self.end_headers()
+        self.wfile.write(contenido)
+
+    def log_message(self, *args):
+        pass
+
+
+class MiniaturasTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        from PIL import Image
+
+        png = io.BytesIO()
+        Image.new('RGB', (1600, 900), 'orange').save(png, 'PNG')
+        _ServidorImagenes.archivos = {'/foto.png': png.getvalue(), '/texto.png': b'no es una imagen'}
+        _ServidorImagenes.redirecciones = {'/metadata.png': 'http://169.254.169.254/latest/meta-data/'}
+        cls.servidor = ThreadingHTTPServer(('127.0.0.1', 0), _ServidorImagenes)
+        threading.Thread(target=cls.servidor.serve_forever, daemon=True).start()
+        cls.base = f'http://127.0.0.1:{cls.servidor.server_port}'
+        cls.media = tempfile.mkdtemp()
+        # El servidor de prueba está en loopback
+        cls.ajustes = override_settings(
+            MEDIA_ROOT=cls.media, IMAGENES_EN_SEGUNDO_PLANO=False, IMAGENES_PERMITIR_RED_PRIVADA=True
+        )
+        cls.ajustes.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.ajustes.disable()
+        cls.servidor.shutdown()
+        cls.servidor.server_close()
+        shutil.rmtree(cls.media, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_genera_derivados_y_los_sirve_con_cache_inmutable(self):
+        from PIL import Image
+
+        url = f'{self.base}/foto.png'
+        registro = imagenes.procesar(url)
+        self.assertEqual(registro.estado, ImagenRemota.LISTA)
+        ruta = imagenes.ruta_relativa(registro.contenido, 'tarjeta', 'WEBP')
+        with Image.open(f'{self.media}/{ruta}') as tarjeta:
+            self.assertEqual(tarjeta.size, (600, 300))
+
+        producto = Producto.objects.create(nombre='Naranja', descripcion='x', precio=1, imagen_url=url)
+        imagenes.adjuntar_miniaturas([producto], 'tarjeta')
+        self.assertTrue(producto.miniatura.startswith('/media/derivados/'))
+
+        respuesta = self.client.get(producto.miniatura)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(self.client.get('/media/derivados/../../settings.py').status_code, 404)
+
+    def test_rechaza_imagenes_grandes_o_invalidas(self):
+        with self.assertLogs('productos.imagenes', 'WARNING'):
+            with self.settings(IMAGENES_MAX_BYTES=100):
+                self.assertEqual(imagenes.procesar(f'{self.base}/foto.png').estado, ImagenRemota.ERROR)
+            self.assertEqual(imagenes.procesar(f'{self.base}/texto.png').estado, ImagenRemota.ERROR)
+
+        producto = Producto(nombre='X', descripcion='x', precio=1, imagen_url=f'{self.base}/texto.png')
+        imagenes.adjuntar_miniaturas([producto], 'tarjeta')
+        self.assertEqual(producto.miniatura, producto.imagen_url)
+
+    def test_rechaza_bombas_de_descompresion(self):
+        from PIL import Image
+
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 1000), self.assertLogs('productos.imagenes', 'WARNING'):
+            registro = imagenes.procesar(f'{self.base}/foto.png')
+        self.assertEqual(registro.estado, ImagenRemota.ERROR)
+
+    @override_settings(IMAGENES_PERMITIR_RED_PRIVADA=False)
+    def test_no_descarga_direcciones_internas(self):
+        internas = ('http://169.254.169.254/latest/meta-data/', 'http://10.0.0.8/a.png',
+                    'http://[::ffff:127.0.0.1]/a.png', 'file:///etc/passwd')
+        for url in internas:
+            with self.assertRaises(imagenes.ImagenNoValida):
+                imagenes.validar_url(url)
+        with self.assertLogs('productos.imagenes', 'WARNING'):
+            registro = imagenes.procesar(f'{self.base}/foto.png')
+        self.assertEqual(registro.estado, ImagenRemota.ERROR)
+        self.assertIn('no pública', registro.error)
+        # Aunque el nombre haya resuelto a una dirección pública, la conexión se verifica de nuevo
+        with mock.patch('productos.imagenes.validar_url'):
+            with self.assertRaisesMessage(imagenes.ImagenNoValida, 'no pública'):
+                imagenes.descargar(f'{self.base}/foto.png')
+        # Y cada redirección se valida como la URL original
+        with mock.patch('productos.imagenes._es_publica', lambda direccion: direccion.startswith('127.')):
+            with self.assertRaisesMessage(imagenes.ImagenNoValida, '169.254.169.254'):
+                imagenes.descargar(f'{self.base}/metadata.png')
+
+
+class ImagenProductoTests(TestCase):
+
+    def test_prioridad_de_fuentes_sin_atributos_inexistentes(self):
+        producto = Producto(nombre='A', descripcion='a', precio=1)
+        self.assertIsNone(producto.get_imagen())
+        with self.settings(PRODUCTO_IMAGEN_PLACEHOLDER='/static/sin-imagen.png'):
+            self.assertEqual(Producto(nombre='B', descripcion='b', precio=1).get_imagen(), '/static/sin-imagen.png')
+
+        producto = Producto(nombre='C', descripcion='c', precio=1)
+        producto.imagen.name = 'productos/salchicha.png'
+        self.assertEqual(producto.get_imagen(), '/media/productos/salchicha.png')
+        producto.imagen_url = 'https://example.com/c.jpg'
+        # Resuelta una sola vez por instancia hasta el próximo save()
+        self.assertEqual(producto.get_imagen(), '/media/productos/salchicha.png')
+        producto.save()
+        self.assertEqual(producto.get_imagen(), 'https://example.com/c.jpg')
+
+    def test_formulario_acepta_archivo_subido(self):
+        from PIL import Image
+
+        png = io.BytesIO()
+        Image.new('RGB', (10, 10)).save(png, 'PNG')
+        form = ProductoForm(
+            {'nombre': 'D', 'descripcion': 'd', 'precio': '2', 'stock': '1', 'activo': 'on'},
+            {'imagen': SimpleUploadedFile('d.png', png.getvalue(), content_type='image/png')},
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+
+    def test_renderiza_mil_tarjetas_dentro_del_presupuesto(self):
+        sembrar_productos(1000)
+        Producto.objects.filter(pk__in=Producto.objects.values('pk')[:500]).update(imagen_url=None)
+        productos = list(Producto.objects.all())
+
+        inicio = time.perf_counter()
+        with self.assertNumQueries(1):
+            imagenes.adjuntar_miniaturas(productos, 'tarjeta')
+            html = render_to_string('productos/lista_productos.html', {
+                'productos': productos,
+                'pagina': PaginaCursor(productos),
+                'cache_timeout': 0,
+            })
+        transcurrido = time.perf_counter() - inicio
+
+        self.assertEqual(html.count('class="card product-card"'), 1000)
+        self.assertLess(transcurrido, 2.0)
+
+
+class VistasAsincronasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('vendedor', password='clave-segura-123', first_name='Ana')
+        cls.usuario.user_permissions.add(Permission.objects.get(codename='puede_ver_estadisticas'))
+        cls.producto = Producto.objects.create(
+            nombre='Mate', descripcion='Calabaza', precio=12, stock=4, usuario_creador=cls.usuario)
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_vistas_sin_accesos_sincronos_al_orm(self):
+        await self.async_client.aforce_login(self.usuario)
+        respuesta = await self.async_client.get(reverse('lista_productos'))
+        self.assertContains(respuesta, 'Mate')
+
+        respuesta = await self.async_client.get(reverse('detalle_producto', args=[self.producto.pk]))
+        self.assertContains(respuesta, 'Ana')
+        self.assertContains(respuesta, '📊 Dashboard')
+
+        respuesta = await self.async_client.get(reverse('dashboard'))
+        self.assertEqual(respuesta.context['total_productos'], 1)
+
+    async def test_dashboard_lanza_las_lecturas_juntas(self):
+        eventos = []
+
+        def registrar(nombre, original):
+            async def envoltura(*args, **kwargs):
+                eventos.append(('inicio', nombre))
+                await asyncio.sleep(0)
+                resultado = await original(*args, **kwargs)
+                eventos.append(('fin', nombre))
+                return resultado
+            return envoltura
+
+        await self.async_client.aforce_login(self.usuario)
+        with mock.patch.object(estadisticas, 'aleer', registrar('resumenes', estadisticas.aleer)), \
+                mock.patch.object(historial, 'atendencia', registrar('tendencia', historial.atendencia)), \
+                mock.patch.object(historial, 'aultimas_horas', registrar('horas', historial.aultimas_horas)):
+            respuesta = await self.async_client.get(reverse('dashboard'))
+        self.assertEqual(respuesta.context['total_productos'], 1)
+        # Las tres empiezan antes de que termine la primera
+        self.assertEqual([tipo for tipo, _ in eventos[:3]], ['inicio'] * 3)
+        self.assertEqual(len(eventos), 6)
+
+    async def test_catalogo_anonimo_y_redireccion_de_login(self):
+        respuesta = await self.async_client.get(reverse('lista_productos'), {'q': 'mate'})
+        self.assertContains(respuesta, 'Mate')
+        respuesta = await self.async_client.get(reverse('detalle_producto', args=[self.producto.pk]))
+        self.assertEqual(respuesta.status_code, 302)
+
+
+class ImportacionProductosTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_importa_actualiza_por_codigo_y_omite_filas_invalidas(self):
+        Producto.objects.create(codigo='SKU-1', nombre='Viejo', descripcion='v', precio=1, stock=1)
+        csv_entrada = io.StringIO(
+            'codigo,nombre,descripcion,precio,stock,activo,imagen_url\n'
+            'SKU-1,Yerba Mate,Paquete de 1 kg,4500,10,true,\n'
+            'SKU-2,Bombilla,Acero inoxidable,-3,5,true,\n'
+            ',Termo,Acero de 1 litro,25000,2,false,https://example.com/termo.jpg\n'
+        )
+        errores = []
+        resultado = importacion.importar(
+            importacion.leer_filas(csv_entrada, 'csv'), lote=2, al_fallar=lambda n, m: errores.append(n))
+
+        self.assertEqual((resultado['guardadas'], resultado['errores']), (2, 1))
+        self.assertEqual(errores, [2])
+        self.assertEqual(Producto.objects.get(codigo='SKU-1').nombre, 'Yerba Mate')
+        self.assertFalse(Producto.objects.get(nombre='Termo').activo)
+        # bulk_create no pasa por las señales: índice y resúmenes se actualizan igual
+        encontrados = obtener_backend().buscar(Producto.objects.all(), 'yerba')
+        self.assertEqual([p.codigo for p in encontrados], ['SKU-1'])
+        self.assertEqual(estadisticas.leer(estadisticas.GLOBAL)[estadisticas.GLOBAL].total_productos, 2)
+
+    def test_exportacion_ndjson_se_puede_reimportar(self):
+        sembrar_productos(5)
+        for producto in Producto.objects.all():
+            producto.codigo = f'P-{producto.pk}'
+            producto.save()
+        salida = io.StringIO()
+        call_command('exportar_productos', formato='json', stdout=salida, stderr=io.StringIO())
+
+        Producto.objects.update(stock=999)
+        resultado = importacion.importar(importacion.leer_filas(io.StringIO(salida.getvalue()), 'json'))
+        self.assertEqual(resultado['guardadas'], 5)
+        self.assertEqual(Producto.objects.count(), 5)
+        self.assertFalse(Producto.objects.filter(stock=999).exists())
+
+    def test_importacion_aplica_deltas_sin_reconstruir_resumenes(self):
+        vendedor = User.objects.create_user('vendedor', password='x')
+        importador = User.objects.create_user('importador', password='x')
+        Producto.objects.create(codigo='SKU-1', nombre='Viejo', descripcion='v', precio=1, stock=1,
+                                usuario_creador=vendedor)
+        filas = [
+            {'codigo': 'SKU-1', 'nombre': 'Yerba', 'descripcion': 'Kilo', 'precio': '10', 'stock': 3, 'activo': False},
+            {'codigo': 'SKU-2', 'nombre': 'Termo', 'descripcion': 'Acero', 'precio': '25', 'stock': 2},
+            {'codigo': '', 'nombre': 'Mate', 'descripcion': 'Calabaza', 'precio': '4', 'stock': 5},
+        ]
+        with mock.patch('productos.estadisticas.reconstruir') as reconstruir:
+            importacion.importar(filas, usuario=importador, lote=2)
+        reconstruir.assert_not_called()
+
+        def resumenes():
+            return list(ResumenInventario.objects.exclude(total_productos=0).order_by('ambito').values_list(
+                'ambito', 'total_productos', 'productos_activos', 'valor_inventario'))
+        incremental = resumenes()
+        estadisticas.reconstruir()
+        self.assertEqual(incremental, resumenes())
+        self.assertEqual(estadisticas.leer(estadisticas.GLOBAL)[estadisticas.GLOBAL].valor_inventario, 100)
+
+    def test_exportaciones_en_streaming_respetan_filtros(self):
+        admin = User.objects.create_superuser('admin', password='x')
+        Producto.objects.create(nombre='Yerba', descripcion='Mate', precio=1, activo=True)
+        Producto.objects.create(nombre='Termo', descripcion='Acero', precio=2, activo=False)
+        self.client.force_login(admin)
+        respuesta = self.client.get(reverse('admin:productos_producto_changelist'), {'activo__exact': '0'})
+        self.assertContains(respuesta, 'exportar/csv/?activo__exact=0')
+
+        respuesta = self.client.get(reverse('admin:productos_producto_exportar', args=['csv']), {'activo__exact': '0'})
+        self.assertTrue(respuesta.streaming)
+        filas = b''.join(respuesta.streaming_content).decode().splitlines()
+        self.assertEqual(len(filas), 2)
+        self.assertIn('Termo', filas[1])
+
+        respuesta = self.client.get(reverse('exportar_catalogo'), {'q': 'yerba', 'formato': 'json'})
+        self.assertEqual(respuesta['Content-Type'], 'application/x-ndjson')
+        lineas = b''.join(respuesta.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(linea)['nombre'] for linea in lineas], ['Yerba'])
+
+
+@override_settings(PERFILADO_ACTIVO=True, PERFILADO_MUESTREO=1.0, PERFILADO_VOLCADO_SEGUNDOS=0)
+class PerfiladoTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_server_timing_y_reporte_por_vista(self):
+        sembrar_productos(15)
+        admin = User.objects.create_superuser('admin', password='x')
+
+        respuesta = self.client.get(reverse('lista_productos'))
+        self.assertRegex(respuesta['Server-Timing'], r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ SQL')
+        self.client.force_login(admin)
+        self.client.get(reverse('admin:auth_user_changelist'))
+        self.client.get('/no-existe/')
+
+        filas = {fila['vista']: fila for fila in perfilado.informe()}
+        self.assertEqual(set(filas), {'lista_productos', 'admin:auth_user_changelist'})
+        self.assertGreater(filas['lista_productos']['consultas'], 0)
+        self.assertGreater(filas['lista_productos']['plantillas_ms'], 0)
+        self.assertEqual(filas['lista_productos']['repetidas'], 0)
+        # El admin repite el COUNT (filtrado y total), pero no hay una consulta por usuario
+        self.assertLessEqual(filas['admin:auth_user_changelist']['repetidas'], 1)
+
+        salida = io.StringIO()
+        call_command('perf_report', stdout=salida)
+        self.assertIn('lista_productos', salida.getvalue())
+
+    def test_desactivado_no_agrega_cabeceras(self):
+        with self.settings(PERFILADO_ACTIVO=False):
+            respuesta = self.client.get(reverse('lista_productos'))
+        self.assertNotIn('Server-Timing', respuesta)
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'PRAGMAs propios de SQLite')
+class ConexionSQLiteTests(TestCase):
+
+    def test_pragmas_aplicados_a_la_conexion(self):
+        with connection.cursor() as cursor:
+            # Viene de OPTIONS['timeout'], la única fuente del tiempo de espera
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], settings.DATABASES['default']['OPTIONS']['timeout'] * 1000)
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+
+
+class EnrutadorReplicasTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(CATALOGO_REPLICAS=['replica_a'])
+    def test_solo_vistas_de_lectura_usan_la_replica(self):
+        from .enrutador import _primaria, lectura_en_replica
+
+        @lectura_en_replica
+        def vista(request):
+            return router.db_for_read(Producto), router.db_for_read(User), router.db_for_write(Producto)
+
+        self.assertEqual(vista(None), ('replica_a', 'default', 'default'))
+        self.assertEqual(router.db_for_read(Producto), 'default')
+        token = _primaria.set(True)
+        try:
+            self.assertEqual(vista(None)[0], 'default')
+        finally:
+            _primaria.reset(token)
+
+    @override_settings(CATALOGO_REPLICAS=['replica_a'], VENTANA_LECTURA_PRIMARIA=7)
+    def test_escritura_fija_la_lectura_en_la_principal(self):
+        usuario = User.objects.create_user('escritor', password='x')
+        self.client.force_login(usuario)
+        respuesta = self.client.post(reverse('agregar_producto'), {
+            'nombre': 'Mate', 'descripcion': 'Calabaza', 'precio': '10', 'stock': '1', 'activo': 'on'})
+        self.assertEqual(respuesta.cookies['leer_primaria']['max-age'], 7)
+        self.assertNotIn('leer_primaria', self.client.get(reverse('lista_productos')).cookies)
+
+
+@unittest.skipUnless(getattr(settings, 'CATALOGO_REPLICAS', []),
+                     'Ejecutar aparte con DJANGO_DB_REPLICAS=/tmp/replica.sqlite3 '
+                     'manage.py test productos.tests.ReplicasIntegracionTests')
+class ReplicasIntegracionTests(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+
+    def test_catalogo_se_lee_en_la_replica(self):
+        replica = settings.CATALOGO_REPLICAS[0]
+        Producto.objects.create(nombre='Mate', descripcion='Calabaza', precio=10)
+        with CaptureQueriesContext(connections[replica]) as consultas:
+            respuesta = self.client.get(reverse('lista_productos'))
+        self.assertContains(respuesta, 'Mate')
+        self.assertTrue(any('productos_producto' in q['sql'] for q in consultas.captured_queries))
+
+
+class ReservasStockTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.mate = Producto.objects.create(nombre='Mate', descripcion='m', precio=10, stock=5)
+        cls.termo = Producto.objects.create(nombre='Termo', descripcion='t', precio=100, stock=1)
+
+    def valor_global(self):
+        return estadisticas.leer(estadisticas.GLOBAL)[estadisticas.GLOBAL].valor_inventario
+
+    def test_reserva_condicional_sin_leer_el_stock(self):
+        with CaptureQueriesContext(connection) as consultas:
+            with self.assertRaises(inventario.StockInsuficiente):
+                inventario.reservar(self.mate.pk, 6)
+        sentencias = [q['sql'].split()[0] for q in consultas.captured_queries]
+        self.assertEqual([s for s in sentencias if s in ('SELECT', 'UPDATE')], ['UPDATE'])
+        inventario.reservar(self.mate.pk, 5)
+        self.mate.refresh_from_db()
+        self.assertEqual(self.mate.stock, 0)
+        self.assertEqual(self.valor_global(), Decimal('100'))
+
+        inventario.liberar(self.mate.pk, 2)
+        self.mate.refresh_from_db()
+        self.assertEqual(self.mate.stock, 2)
+        self.assertEqual(self.valor_global(), Decimal('120'))
+
+    def test_reserva_por_lote_es_todo_o_nada(self):
+        with self.assertRaises(inventario.StockInsuficiente) as error:
+            inventario.reservar_varios({self.mate.pk: 2, self.termo.pk: 2})
+        self.assertEqual(error.exception.producto_id, self.termo.pk)
+        self.assertEqual(list(Producto.objects.order_by('pk').values_list('stock', flat=True)), [5, 1])
+
+        inventario.reservar_varios([(self.mate.pk, 2), (self.termo.pk, 1), (self.mate.pk, 1)])
+        self.assertEqual(list(Producto.objects.order_by('pk').values_list('stock', flat=True)), [2, 0])
+        self.assertEqual(self.valor_global(), Decimal('20'))
+
+
+class ConcurrenciaOptimistaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'clave-segura-123')
+        cls.productos = [
+            Producto.objects.create(nombre=f'Yerba {i}', descripcion='d', precio=10, stock=5, usuario_creador=cls.admin)
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def datos(self, producto, **cambios):
+        datos = {
+            'codigo': '', 'nombre': producto.nombre, 'descripcion': producto.descripcion,
+            'precio': producto.precio, 'stock': producto.stock, 'activo': 'on', 'imagen_url': '',
+            'version': producto.version,
+        }
+        datos.update(cambios)
+        return datos
+
+    def updates(self, consultas):
+        return [q['sql'] for q in consultas.captured_queries if q['sql'].startswith('UPDATE "productos_producto"')]
+
+    def test_edicion_obsoleta_informa_conflicto_y_no_pisa_cambios(self):
+        producto = self.productos[0]
+        url = reverse('editar_producto', args=[producto.pk])
+        datos = self.datos(producto, precio='12.00')
+        inventario.reservar(producto.pk, 1)
+
+        respuesta = self.client.post(url, datos)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('stock', respuesta.context['form'].errors)
+        producto.refresh_from_db()
+        self.assertEqual((producto.precio, producto.stock, producto.version), (Decimal('10'), 4, 2))
+
+        # Reenviar el formulario devuelto confirma la sobrescritura
+        datos['version'] = respuesta.context['form']['version'].value()
+        self.assertRedirects(self.client.post(url, datos), reverse('detalle_producto', args=[producto.pk]))
+        producto.refresh_from_db()
+        self.assertEqual((producto.precio, producto.stock, producto.version), (Decimal('12'), 5, 3))
+
+    def test_guarda_solo_los_campos_modificados(self):
+        producto = self.productos[0]
+        for url in (reverse('editar_producto', args=[producto.pk]),
+                    reverse('admin:productos_producto_change', args=[producto.pk])):
+            self.assertContains(self.client.get(url), 'type="hidden" name="version" value="1"')
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.post(reverse('editar_producto', args=[producto.pk]), self.datos(producto, stock=7))
+        [update] = self.updates(consultas)
+        self.assertIn('"stock"', update)
+        self.assertNotIn('"descripcion"', update)
+
+        obsoleto = Producto.objects.get(pk=producto.pk)
+        Producto.objects.get(pk=producto.pk).save(update_fields=['nombre'])
+        obsoleto.stock = 1
+        with self.assertRaises(ConflictoVersion), transaction.atomic():
+            obsoleto.save(update_fields=['stock'])
+        self.assertEqual(Producto.objects.get(pk=producto.pk).stock, 7)
+
+    def test_listado_editable_guarda_en_un_solo_update(self):
+        url = reverse('admin:productos_producto_changelist')
+        self.assertContains(self.client.get(url), 'name="form-0-version"')
+        datos = {'form-TOTAL_FORMS': 3, 'form-INITIAL_FORMS': 3, '_save': 'Guardar'}
+        for i, producto in enumerate(self.productos):
+            datos.update({
+                f'form-{i}-id': producto.pk, f'form-{i}-precio': producto.precio,
+                f'form-{i}-stock': 20 + i, f'form-{i}-activo': 'on', f'form-{i}-version': producto.version,
+            })
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.post(url, datos)
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertEqual(len(self.updates(consultas)), 1)
+        self.assertEqual(
+            list(Producto.objects.order_by('pk').values_list('stock', 'version')), [(20, 2), (21, 2), (22, 2)]
+        )
+        self.assertEqual(
+            estadisticas.leer(estadisticas.GLOBAL)[estadisticas.GLOBAL].valor_inventario, Decimal('630')
+        )
+
+    def test_listado_editable_no_registra_ni_felicita_las_filas_en_conflicto(self):
+        from django.contrib.admin.models import LogEntry
+        from django.contrib import messages
+        from django.contrib.messages import get_messages
+
+        url = reverse('admin:productos_producto_changelist')
+        datos = {'form-TOTAL_FORMS': 3, 'form-INITIAL_FORMS': 3, '_save': 'Guardar'}
+        for i, producto in enumerate(self.productos):
+            datos.update({
+                f'form-{i}-id': producto.pk, f'form-{i}-precio': producto.precio,
+                f'form-{i}-stock': 30, f'form-{i}-activo': 'on', f'form-{i}-version': producto.version,
+            })
+        guardar_lote = concurrencia.guardar_lote
+
+        def con_carrera(ediciones):
+            # Otro usuario reserva entre la validación del formulario y el UPDATE del lote
+            inventario.reservar(self.productos[1].pk, 1)
+            return guardar_lote(ediciones)
+
+        with mock.patch('productos.concurrencia.guardar_lote', con_carrera):
+            respuesta = self.client.post(url, datos)
+
+        avisos = [(m.level, str(m)) for m in get_messages(respuesta.wsgi_request)]
+        self.assertEqual([nivel for nivel, _ in avisos], [messages.SUCCESS, messages.ERROR])
+        self.assertIn('2', avisos[0][1])
+        self.assertIn('Yerba 1', avisos[1][1])
+        self.assertEqual(
+            sorted(LogEntry.objects.values_list('object_id', flat=True)),
+            sorted(str(p.pk) for p in (self.productos[0], self.productos[2])),
+        )
+
+    def test_lote_omite_filas_modificadas_por_otro(self):
+        leidos = list(Producto.objects.order_by('pk'))
+        inventario.reservar(leidos[1].pk, 1)
+        for producto in leidos:
+            producto.precio = 15
+        conflictos = concurrencia.guardar_lote([(producto, ['precio']) for producto in leidos])
+        self.assertEqual(conflictos, [leidos[1]])
+        self.assertEqual(
+            list(Producto.objects.order_by('pk').values_list('precio', flat=True)),
+            [Decimal('15'), Decimal('10'), Decimal('15')],
+        )
+
+
+class ApiProductosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendedor = User.objects.create_user('vendedor', password='clave-segura-123')
+        cls.vendedor.user_permissions.add(*Permission.objects.filter(
+            codename__in=['add_producto', 'change_producto']
+        ))
+        cls.productos = [
+            Producto.objects.create(
+                codigo=f'API-{i}', nombre=f'Bombilla {i}', descripcion='Acero', precio=100 + i, stock=i,
+                usuario_creador=cls.vendedor,
+            )
+            for i in range(5)
+        ]
+
+    def consultas_productos(self, consultas):
+        return [q['sql'] for q in consultas.captured_queries if 'productos_producto' in q['sql']]
+
+    def test_lista_paginada_con_campos_y_etag(self):
+        url = reverse('api_productos')
+        respuesta = self.client.get(url, {'fields': 'nombre,precio', 'por_pagina': 3})
+        self.assertEqual(respuesta.status_code, 200)
+        datos = respuesta.json()
+        self.assertEqual(datos['resultados'][0], {'nombre': 'Bombilla 4', 'precio': '104.00'})
+        self.assertEqual(len(datos['resultados']), 3)
+        segunda = self.client.get(url, {'fields': 'nombre,precio', 'por_pagina': 3, 'cursor': datos['siguiente']})
+        self.assertEqual([p['nombre'] for p in segunda.json()['resultados']], ['Bombilla 1', 'Bombilla 0'])
+
+        # Sin cambios: 304 con una sola consulta (el agregado del ETag)
+        with CaptureQueriesContext(connection) as consultas:
+            no_modificada = self.client.get(
+                url, {'fields': 'nombre,precio', 'por_pagina': 3}, HTTP_IF_NONE_MATCH=respuesta['ETag']
+            )
+        self.assertEqual(no_modificada.status_code, 304)
+        self.assertEqual(len(self.consultas_productos(consultas)), 1)
+
+        # Un cambio fuera de la página (y hecho con .update()) también cambia el ETag
+        inventario.liberar(self.productos[0].pk, 1)
+        cambiada = self.client.get(
+            url, {'fields': 'nombre,precio', 'por_pagina': 3}, HTTP_IF_NONE_MATCH=respuesta['ETag']
+        )
+        self.assertEqual(cambiada.status_code, 200)
+        self.assertEqual(self.client.get(url, {'fields': 'clave'}).status_code, 400)
+
+    def test_detalle_con_only_y_last_modified(self):
+        producto = self.productos[2]
+        url = reverse('api_producto', args=[producto.pk])
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(url, {'fields': 'stock'})
+        self.assertEqual(respuesta.json(), {'stock': 2})
+        self.assertNotIn('"descripcion"', self.consultas_productos(consultas)[-1])
+        self.assertEqual(
+            self.client.get(url, {'fields': 'stock'}, HTTP_IF_MODIFIED_SINCE=respuesta['Last-Modified']).status_code,
+            304,
+        )
+        self.assertNotEqual(self.client.get(url)['ETag'], respuesta['ETag'])
+
+    def test_patch_con_if_match_y_validaciones(self):
+        producto = self.productos[1]
+        url = reverse('api_producto', args=[producto.pk])
+        self.assertEqual(self.client.patch(url, {'stock': 9}, content_type='application/json').status_code, 401)
+        self.client.force_login(self.vendedor)
+        etag = self.client.get(url)['ETag']
+
+        respuesta = self.client.patch(url, {'precio': '-5'}, content_type='application/json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('precio', respuesta.json()['errores'])
+
+        respuesta = self.client.patch(url, {'stock': 9}, content_type='application/json', HTTP_IF_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual((respuesta.json()['stock'], respuesta.json()['nombre']), (9, 'Bombilla 1'))
+        self.assertNotEqual(respuesta['ETag'], etag)
+
+        # El ETag viejo ya no corresponde: 412 y no se escribe nada
+        respuesta = self.client.patch(url, {'stock': 1}, content_type='application/json', HTTP_IF_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 412)
+        self.assertEqual(Producto.objects.get(pk=producto.pk).stock, 9)
+
+        respuesta = self.client.patch(url, {'stock': 1, 'version': 1}, content_type='application/json')
+        self.assertEqual(respuesta.status_code, 409)
+
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertFalse(Producto.objects.filter(pk=producto.pk).exists())
+
+    def test_lote_hace_upsert_y_reporta_filas_invalidas(self):
+        self.client.force_login(self.vendedor)
+        filas = [
+            {'codigo': 'API-0', 'nombre': 'Bombilla renovada', 'descripcion': 'Alpaca', 'precio': '150', 'stock': 4},
+            {'codigo': 'API-NUEVO', 'nombre': 'Mate', 'descripcion': 'Calabaza', 'precio': '80', 'stock': 2},
+            {'codigo': 'API-MALO', 'nombre': 'Sin precio', 'descripcion': 'x', 'precio': '0', 'stock': -1},
+        ]
+        total = estadisticas.leer(estadisticas.GLOBAL)[estadisticas.GLOBAL].total_productos
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.post(reverse('api_productos_lote'), filas, content_type='application/json')
+        self.assertEqual(respuesta.status_code, 200)
+        datos = respuesta.json()
+        self.assertEqual((datos['procesadas'], datos['guardadas']), (3, 2))
+        # Los resúmenes se ajustan por deltas: la petición no los reescribe ni recorre la tabla
+        self.assertFalse(any(q['sql'].startswith('DELETE FROM "productos_resumeninventario"')
+                             for q in consultas.captured_queries))
+        self.assertEqual(estadisticas.leer(estadisticas.GLOBAL)[estadisticas.GLOBAL].total_productos, total + 1)
+        self.assertEqual(datos['errores'][0]['fila'], 3)
+        actualizado = Producto.objects.get(codigo='API-0')
+        self.assertEqual((actualizado.nombre, actualizado.version), ('Bombilla renovada', 2))
+        self.assertTrue(Producto.objects.filter(codigo='API-NUEVO', usuario_creador=self.vendedor).exists())
+
+
+class CambiosProductoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='clave-segura-123', is_staff=True)
+        cls.producto = Producto.objects.create(nombre='Termo', descripcion='Acero', precio=300, stock=5)
+
+    def operaciones(self, desde=0):
+        return [(e['producto'], e['operacion']) for e in cambios.leer(desde)]
+
+    def test_registra_altas_ediciones_reservas_y_bajas(self):
+        inicio = cambios.ultima_posicion()
+        termo = self.producto.pk
+        otro = Producto.objects.create(nombre='Yerba', descripcion='1 kg', precio=50, stock=2)
+        self.producto.precio = 320
+        self.producto.save(update_fields=['precio'])
+        inventario.reservar(otro.pk, 1)
+        Producto.objects.filter(pk=otro.pk).update(activo=False)
+        cambios.registrar_ids([otro.pk])
+        self.producto.delete()
+        self.assertEqual(self.operaciones(inicio), [
+            (otro.pk, 'alta'), (termo, 'cambio'), (otro.pk, 'cambio'), (otro.pk, 'cambio'), (termo, 'baja'),
+        ])
+
+        respuesta = self.client.get(reverse('api_cambios'), {'since': inicio})
+        datos = respuesta.json()
+        self.assertEqual(datos['cambios'][1]['datos']['precio'], '320.00')
+        self.assertEqual(datos['cambios'][2]['datos']['stock'], 1)
+        # Sin staff el producto desactivado aparece como baja
+        self.assertEqual([c['operacion'] for c in datos['cambios']], ['alta', 'cambio', 'cambio', 'baja', 'baja'])
+        self.assertEqual((datos['ultimo'], datos['mas']), (cambios.ultima_posicion(), False))
+
+        self.client.force_login(self.admin)
+        datos = self.client.get(reverse('api_cambios'), {'since': inicio}).json()
+        self.assertEqual(datos['cambios'][3]['datos']['activo'], False)
+        self.assertEqual(self.client.get(reverse('api_cambios')).json()['ultimo'], datos['ultimo'])
+
+    def test_compactar_conserva_la_ultima_entrada_y_marca_el_horizonte(self):
+        for precio in (310, 320, 330):
+            self.producto.precio = precio
+            self.producto.save()
+        baja = Producto.objects.create(nombre='Bombilla', descripcion='Alpaca', precio=90, stock=1)
+        baja.delete()
+        CambioProducto.objects.update(fecha=timezone.now() - timedelta(days=30))
+
+        self.assertEqual(cambios.compactar(), 5)
+        restantes = list(CambioProducto.objects.exclude(operacion=CambioProducto.COMPACTACION))
+        self.assertEqual([(c.producto_id, c.datos['precio']) for c in restantes], [(self.producto.pk, '330.00')])
+        horizonte = cambios.horizonte()
+        self.assertGreater(horizonte, restantes[0].pk)
+
+        respuesta = self.client.get(reverse('api_cambios'), {'since': 0})
+        self.assertEqual((respuesta.status_code, respuesta.json()['horizonte']), (410, horizonte))
+        self.assertEqual(self.client.get(reverse('api_cambios'), {'since': horizonte}).json()['cambios'], [])
+        self.assertEqual(cambios.compactar(), 0)
+
+    async def test_stream_sse_hasta_ponerse_al_dia(self):
+        respuesta = await self.async_client.get(reverse('api_cambios_stream'), {'since': 0, 'seguir': 0})
+        self.assertEqual(respuesta['Content-Type'], 'text/event-stream')
+        cuerpo = b''.join([parte async for parte in respuesta.streaming_content]).decode()
+        eventos = [bloque for bloque in cuerpo.split('\n\n') if bloque.startswith('id:')]
+        self.assertEqual(len(eventos), 1)
+        self.assertIn('event: producto', eventos[0])
+        self.assertEqual(json.loads(eventos[0].split('data: ')[1])['datos']['nombre'], 'Termo')
+
+        respuesta = await self.async_client.get(reverse('api_cambios_stream'), headers={'Last-Event-ID': 'x'})
+        self.assertEqual(respuesta.status_code, 400)
+
+    @override_settings(CAMBIOS_SONDEO_SEGUNDOS=0.01)
+    async def test_difusor_reparte_con_una_sola_lectura_por_intervalo(self):
+        desde = await cambios.aultima_posicion()
+
+        async def suscriptor():
+            async with aclosing(cambios.eventos(desde, segundos=5)) as flujo:
+                async for entrada in flujo:
+                    if entrada is not None:
+                        return entrada
+
+        tareas = [asyncio.create_task(suscriptor()) for _ in range(50)]
+        await cambios.difusor().listo.wait()
+        await sync_to_async(inventario.reservar)(self.producto.pk, 2)
+        recibidas = await asyncio.wait_for(asyncio.gather(*tareas), timeout=5)
+        self.assertEqual({(e['producto'], e['datos']['stock']) for e in recibidas}, {(self.producto.pk, 3)})
+        self.assertLess(cambios.difusor().lecturas, 50)
+        self.assertIsNone(cambios.difusor().tarea)
+
+
+class EstaticosTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.raiz = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.raiz, ignore_errors=True)
+        with override_settings(STATIC_ROOT=cls.raiz):
+            call_command('collectstatic', interactive=False, verbosity=0)
+
+    def setUp(self):
+        ajustes = override_settings(STATIC_ROOT=self.raiz)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.middleware = estaticos.EstaticosMiddleware(lambda request: 'vista')
+
+    def pedir(self, ruta, **cabeceras):
+        return self.middleware(RequestFactory().get(ruta, headers=cabeceras))
+
+    async def test_lectura_asincrona_fuera_del_event_loop(self):
+        async def vista(request):
+            return 'vista'
+
+        middleware = estaticos.EstaticosMiddleware(vista)
+        url = static('productos/css/tienda.css')
+        with mock.patch('productos.estaticos.sync_to_async', wraps=estaticos.sync_to_async) as a_hilo:
+            respuesta = await middleware(RequestFactory().get(url))
+        a_hilo.assert_called_once_with(estaticos._leer, thread_sensitive=False)
+        with open(f'{self.raiz}/{url.removeprefix("/static/")}', 'rb') as original:
+            self.assertEqual(respuesta.content, original.read())
+        self.assertEqual(await middleware(RequestFactory().get('/otra/')), 'vista')
+
+    def test_nombres_con_hash_y_variantes_precomprimidas(self):
+        url = static('productos/css/tienda.css')
+        self.assertRegex(url, r'^/static/productos/css/tienda\.[0-9a-f]{12}\.css$')
+        respuesta = self.pedir(url, accept_encoding='gzip, deflate, br;q=0')
+        self.assertEqual(respuesta['Content-Encoding'], 'gzip')
+        self.assertEqual(respuesta['Cache-Control'], estaticos.INMUTABLE)
+        self.assertEqual(respuesta['Vary'], 'Accept-Encoding')
+        with open(f'{self.raiz}/{url.removeprefix("/static/")}', 'rb') as original:
+            self.assertEqual(gzip.decompress(respuesta.content), original.read())
+
+        self.assertEqual(self.pedir(url, if_none_match=respuesta['ETag'], accept_encoding='gzip').status_code, 304)
+        sin_codificar = self.pedir(url)
+        self.assertNotIn('Content-Encoding', sin_codificar)
+        self.assertEqual(sin_codificar['Content-Type'], 'text/css')
+
+    def test_sin_hash_revalida_y_lo_demas_sigue_a_las_vistas(self):
+        respuesta = self.pedir('/static/productos/css/tienda.css')
+        self.assertEqual(respuesta['Cache-Control'], estaticos.REVALIDAR)
+        self.assertEqual(self.pedir('/static/no-existe.css'), 'vista')
+        self.assertEqual(self.pedir(reverse('lista_productos')), 'vista')
+        self.assertEqual(estaticos.aceptadas('br;q=0.5, gzip;q=0, *'), {'br', '*'})
+
+    def test_bootstrap_local_o_cdn_con_integridad(self):
+        cache.clear()
+        with mock.patch('productos.estaticos.disponibles', return_value=frozenset()), \
+                self.settings(ESTATICOS_RESPALDO_CDN=True):
+            html = self.client.get(reverse('lista_productos')).content.decode()
+        self.assertIn('integrity="sha384-', html)
+        self.assertIn('<link href="/static/productos/css/tienda.', html)
+
+        sin_manifiesto = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, sin_manifiesto, ignore_errors=True)
+        # Vendorizado, o en producción aunque falte: siempre el archivo local
+        for vendorizados, respaldo in ((frozenset(estaticos.VENDORIZADOS), True), (frozenset(), False)):
+            cache.clear()
+            with mock.patch('productos.estaticos.disponibles', return_value=vendorizados), \
+                    self.settings(STATIC_ROOT=sin_manifiesto, ESTATICOS_RESPALDO_CDN=respaldo):
+                if respaldo:
+                    html = self.client.get(reverse('lista_productos')).content.decode()
+                else:
+                    # Sin manifiesto en producción: se avisa una vez por nombre servido sin hash
+                    with self.assertLogs('productos.estaticos', 'WARNING') as avisos:
+                        html = self.client.get(reverse('lista_productos')).content.decode()
+                        self.client.get(reverse('lista_productos'))
+                    self.assertTrue(any('bootstrap.bundle.min.js' in linea for linea in avisos.output))
+                    self.assertEqual(len(avisos.output), len(set(avisos.output)))
+            self.assertNotIn('cdn.jsdelivr.net', html)
+            self.assertIn('<script src="/static/productos/vendor/bootstrap-5.3.0/bootstrap.bundle.min.js">', html)
+
+        # Faltantes: aviso con el respaldo de la CDN, error sin él
+        for respaldo, id_esperado in ((True, 'productos.W001'), (False, 'productos.E001')):
+            with mock.patch('productos.estaticos.disponibles', return_value=frozenset()), \
+                    self.settings(ESTATICOS_RESPALDO_CDN=respaldo):
+                errores = estaticos.verificar_vendorizados()
+            self.assertEqual({error.id for error in errores}, {id_esperado})
+            self.assertEqual(len(errores), len(estaticos.VENDORIZADOS))
+
+
+class TarjetasCatalogoTests(TestCase):
+
+    largo = 'Uno dos tres\ncuatro  cinco seis siete ocho nueve diez once doce trece catorce quince dieciséis'
+
+    def test_salida_identica_a_la_plantilla(self):
+        productos = [
+            Producto(pk=7, nombre='Mate <"imperial"> & bombilla', descripcion=self.largo,
+                     precio=Decimal('1234567.50'), stock=12000),
+            Producto(pk=8, nombre='Yerba', descripcion='Corta <b>sin</b> cortar', precio=Decimal('3.00'), stock=0),
+        ]
+        productos[0].miniatura = '/media/derivados/tarjeta/a.webp?v=1&x=2'
+        productos[1].miniatura = None
+        for producto in productos:
+            Producto._meta.get_field('descripcion_corta').pre_save(producto, add=True)
+
+        plantilla = Template(tarjetas.PLANTILLA_REFERENCIA)
+        for idioma, miles in (('en', False), ('es', True)):
+            with translation.override(idioma), self.settings(USE_THOUSAND_SEPARATOR=miles):
+                for producto in productos:
+                    with self.subTest(idioma=idioma, producto=producto.pk):
+                        self.assertEqual(
+                            tarjetas.renderizar(producto), plantilla.render(Context({'producto': producto})))
+        with translation.override('es'), self.settings(USE_THOUSAND_SEPARATOR=True):
+            self.assertIn('$1\xa0234\xa0567,50', tarjetas.renderizar(productos[0]))
+
+    def test_descripcion_corta_se_calcula_en_todos_los_caminos_de_escritura(self):
+        producto = Producto.objects.create(codigo='T-1', nombre='Termo', descripcion=self.largo, precio=1)
+        self.assertEqual(producto.descripcion_corta.split()[-2:], ['quince', '…'])
+
+        producto.descripcion = 'Acero inoxidable'
+        producto.save(update_fields=['descripcion'])
+        self.assertEqual(Producto.objects.get(pk=producto.pk).descripcion_corta, 'Acero inoxidable')
+
+        producto.descripcion = 'Editado en lote desde el admin'
+        concurrencia.guardar_lote([(producto, ['descripcion'])])
+        self.assertEqual(Producto.objects.get(pk=producto.pk).descripcion_corta, 'Editado en lote desde el admin')
+
+        importacion.importar([
+            {'codigo': 'T-1', 'nombre': 'Termo', 'descripcion': 'Importado', 'precio': '1', 'stock': '0'},
+            {'codigo': 'T-2', 'nombre': 'Mate', 'descripcion': self.largo, 'precio': '1', 'stock': '0'},
+        ])
+        resumenes = dict(Producto.objects.values_list('codigo', 'descripcion_corta'))
+        self.assertEqual(resumenes['T-1'], 'Importado')
+        self.assertEqual(resumenes['T-2'], 'Uno dos tres cuatro cinco seis siete ocho nueve diez once doce trece '
+                                           'catorce quince …')
+
+    def test_catalogo_usa_el_renderizador(self):
+        sembrar_productos(3)
+        with mock.patch.object(tarjetas.Renderizador, '__init__', autospec=True,
+                               side_effect=tarjetas.Renderizador.__init__) as crear:
+            respuesta = self.client.get(reverse('lista_productos'))
+        self.assertEqual(crear.call_count, 1)
+        self.assertContains(respuesta, 'Descripción del producto de prueba número 2', count=1)
+        self.assertContains(respuesta, reverse('detalle_producto', args=[Producto.objects.first().pk]))
+
+    def test_listado_lee_solo_las_columnas_de_la_tarjeta(self):
+        sembrar_productos(5)
+        obtener_backend().actualizar_ids(list(Producto.objects.values_list('pk', flat=True)))
+        for datos in ({}, {'q': 'producto'}):
+            cache.clear()
+            with CaptureQueriesContext(connection) as consultas:
+                respuesta = self.client.get(reverse('lista_productos'), datos)
+            self.assertContains(respuesta, 'card-title', count=5)
+            sql = [q['sql'] for q in consultas.captured_queries if 'FROM "productos_producto"' in q['sql']]
+            self.assertEqual(len(sql), 1, sql)
+            self.assertNotIn('"productos_producto"."descripcion",', sql[0])
+            self.assertNotIn('auth_user', sql[0])
+
+
+class BajaLogicaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'clave-segura-123')
+        cls.productos = [
+            Producto.objects.create(codigo=f'B-{i}', nombre=f'Bombilla {i}', descripcion='Alpaca', precio=10,
+                                    stock=2, usuario_creador=cls.admin)
+            for i in range(5)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def resumen(self):
+        return estadisticas.leer(estadisticas.GLOBAL)[estadisticas.GLOBAL]
+
+    def test_eliminar_es_un_update_y_oculta_el_producto(self):
+        producto = self.productos[0]
+        inicio = cambios.ultima_posicion()
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.post(reverse('eliminar_producto', args=[producto.pk]))
+        self.assertRedirects(respuesta, reverse('lista_productos'), fetch_redirect_response=False)
+        self.assertFalse(any(q['sql'].startswith('DELETE FROM "productos_producto"') for q in consultas.captured_queries))
+
+        self.assertFalse(Producto.objects.filter(pk=producto.pk).exists())
+        baja = Producto.todos.get(pk=producto.pk)
+        self.assertIsNotNone(baja.fecha_eliminacion)
+        self.assertIsNone(baja.codigo)
+        self.assertEqual((self.resumen().total_productos, self.resumen().valor_inventario), (4, 80))
+        self.assertEqual(list(obtener_backend().buscar(Producto.todos.all(), 'bombilla 0')), [])
+        self.assertEqual([e['operacion'] for e in cambios.leer(inicio)], ['baja'])
+        self.assertEqual(self.client.get(reverse('detalle_producto', args=[producto.pk])).status_code, 404)
+        # El código queda libre
+        Producto.objects.create(codigo='B-0', nombre='Bombilla nueva', descripcion='x', precio=1)
+
+    def test_acciones_del_admin_y_purga_por_lotes(self):
+        pks = [producto.pk for producto in self.productos[:4]]
+        respuesta = self.client.post(reverse('admin:productos_producto_changelist'), {
+            'action': 'delete_selected', '_selected_action': pks, 'post': 'yes',
+        })
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertEqual(Producto.objects.count(), 1)
+        self.assertEqual(Producto.todos.eliminados().count(), 4)
+        respuesta = self.client.get(reverse('admin:auth_user_changelist'))
+        self.assertEqual(respuesta.context['cl'].result_list[0].num_productos, 1)
+
+        posicion = cambios.ultima_posicion()
+        self.assertEqual(eliminacion.purgar(antiguedad=timedelta(hours=1)), 0)
+        avances = []
+        with mock.patch('productos.eliminacion.time.sleep') as dormir:
+            self.assertEqual(eliminacion.purgar(lote=3, pausa=0.5, al_avanzar=avances.append), 4)
+        self.assertEqual(avances, [3, 4])
+        dormir.assert_called_once_with(0.5)
+        self.assertEqual(list(Producto.todos.values_list('pk', flat=True)), [self.productos[4].pk])
+        # La purga no vuelve a descontar estadísticas ni a registrar bajas
+        self.assertEqual(self.resumen().total_productos, 1)
+        self.assertEqual(cambios.ultima_posicion(), posicion)
+
+        salida = io.StringIO()
+        call_command('purgar_productos', stdout=salida)
+        self.assertIn('0 productos purgados', salida.getvalue())
+
+
+class HistorialPrecioStockTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'clave-segura-123')
+        cls.producto = Producto.objects.create(
+            codigo='H-1', nombre='Termo', descripcion='Acero', precio='10.50', stock=5, usuario_creador=cls.admin
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def filas(self):
+        filas = HistorialProducto.objects.order_by('pk')
+        return list(filas.values_list('producto_id', 'precio_centavos', 'delta_stock'))
+
+    def test_formulario_listado_editable_y_reservas_registran_precio_y_stock(self):
+        pk = self.producto.pk
+        self.client.post(reverse('editar_producto', args=[pk]), {
+            'codigo': 'H-1', 'nombre': 'Termo', 'descripcion': 'Acero', 'precio': '12.00', 'stock': 8,
+            'activo': 'on', 'imagen_url': '', 'version': 1,
+        })
+        # Editar algo que no es precio ni stock no agrega filas
+        Producto.objects.get(pk=pk).save(update_fields=['nombre'])
+        otro = Producto.objects.create(nombre='Mate', descripcion='Calabaza', precio=3, stock=1)
+        productos = list(Producto.objects.order_by('pk'))
+        for producto in productos:
+            producto.stock += 10
+        with CaptureQueriesContext(connection) as consultas:
+            concurrencia.guardar_lote([(producto, ['stock']) for producto in productos])
+        sentencias = [q['sql'] for q in consultas.captured_queries]
+        self.assertEqual(sum(sql.startswith('INSERT INTO "productos_historialproducto"') for sql in sentencias), 1)
+        inventario.reservar(otro.pk, 4)
+
+        self.assertEqual(self.filas(), [
+            (pk, 1050, 5), (pk, 1200, 3), (otro.pk, 300, 1), (pk, 1200, 10), (otro.pk, 300, 10), (otro.pk, 300, -4),
+        ])
+        dia = HistorialDia.objects.get()
+        self.assertEqual(
+            (dia.movimientos, dia.cambios_precio, dia.entradas, dia.salidas, dia.variacion_stock),
+            (6, 1, 29, 4, 25),
+        )
+        self.assertEqual((dia.precio_minimo_centavos, dia.precio_maximo_centavos), (300, 1200))
+        self.assertEqual(HistorialHora.objects.get().movimientos, 6)
+
+    def test_importacion_y_bajas_parten_variaciones_grandes(self):
+        importacion.importar([
+            {'codigo': 'H-1', 'nombre': 'Termo', 'descripcion': 'Acero', 'precio': '10.50', 'stock': 70005},
+            {'codigo': 'H-2', 'nombre': 'Yerba', 'descripcion': 'Kilo', 'precio': '4.99', 'stock': 2},
+        ])
+        pk = self.producto.pk
+        nuevo = Producto.objects.get(codigo='H-2').pk
+        self.assertEqual(self.filas()[1:], [(nuevo, 499, 2), (pk, 1050, 32767), (pk, 1050, 32767), (pk, 1050, 4466)])
+        eliminacion.dar_de_baja(Producto.objects.filter(pk=nuevo))
+        self.assertEqual(self.filas()[-1], (nuevo, 499, -2))
+
+        dia = HistorialDia.objects.get()
+        # El alta inicial, el upsert (una sola vez aunque ocupe tres filas), el alta importada y la baja
+        self.assertEqual((dia.movimientos, dia.cambios_precio, dia.entradas, dia.salidas), (4, 0, 70007, 2))
+
+    def test_dashboard_grafica_la_tendencia_desde_los_acumulados(self):
+        hoy = timezone.localdate()
+        hace_40 = timezone.now() - timedelta(days=40)
+        historial.registrar([(self.producto.pk, (Decimal('10.50'), 5), (Decimal('20'), 9))], fecha=hace_40)
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(reverse('dashboard'))
+        self.assertFalse(any('productos_historialproducto' in q['sql'] for q in consultas.captured_queries))
+
+        meses = dict(respuesta.context['historial_meses'])
+        self.assertEqual(len(respuesta.context['grafico_stock'].split()), settings.HISTORIAL_DIAS_DASHBOARD)
+        self.assertEqual(meses[hoy.replace(day=1)].entradas, 5)
+        anterior = meses[timezone.localdate(hace_40).replace(day=1)]
+        self.assertEqual((anterior.cambios_precio, anterior.entradas), (1, 4))
+        self.assertEqual(anterior.precio_promedio, Decimal(20))
+        self.assertEqual(respuesta.context['historial_horas'].movimientos, 1)
+        self.assertContains(respuesta, '<polyline')
+
+
+class BenchmarkRutasTests(TestCase):
+
+    def test_todas_las_rutas_tienen_caso(self):
+        self.assertEqual(rutas_sin_caso(), set())
+
+    def test_ejecuta_casos_y_detecta_regresiones(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        with self.settings(MEDIA_ROOT=media):
+            escenario = Escenario(usuarios=2)
+            escenario.ampliar(20)
+            filas = ejecutar_casos(escenario, repeticiones=2, modos=['cliente'],
+                                   casos=['detalle', 'editar', 'imagen_derivada'])
+        self.assertEqual([fila['errores'] for fila in filas], [0, 0, 0])
+        self.assertEqual(Producto.objects.count(), 20)
+
+        base = {'resultados': [dict(fila, escala=20) for fila in filas]}
+        nuevo = {'resultados': [dict(fila, escala=20, p95=fila['p95'] * 3 + 5, consultas=fila['consultas'] + 1)
+                                for fila in filas[:1]]}
+        regresiones = comparar_resultados(base, nuevo)
+        self.assertEqual([metrica for _, metrica, _, _ in regresiones], ['p95', 'consultas'])
+        self.assertEqual(comparar_resultados(base, base), [])
+
+    def test_todos_los_casos_corren_en_modo_cliente(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        with self.settings(MEDIA_ROOT=media):
+            escenario = Escenario(usuarios=2)
+            escenario.ampliar(20)
+            filas = ejecutar_casos(escenario, repeticiones=1, modos=['cliente'])
+        self.assertEqual({fila['caso']: fila['errores'] for fila in filas}, {caso[0]: 0 for caso in CASOS_RUTAS})
+
+
+class RegistroTests(TestCase):
+
+    datos = {
+        'username': 'nuevo', 'email': 'nuevo@ejemplo.cl', 'first_name': 'Ana', 'last_name': 'Pérez',
+        'password1': 'Clave-Segura-2024', 'password2': 'Clave-Segura-2024',
+    }
+
+    def test_registra_e_inicia_sesion_con_un_solo_hash(self):
+        from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+        with mock.patch.object(PBKDF2PasswordHasher, 'encode', autospec=True,
+                               side_effect=PBKDF2PasswordHasher.encode) as encode:
+            respuesta = self.client.post(reverse('registro'), self.datos)
+        self.assertRedirects(respuesta, reverse('lista_productos'), fetch_redirect_response=False)
+        self.assertEqual(encode.call_count, 1)
+        self.assertEqual(int(self.client.session['_auth_user_id']), User.objects.get(username='nuevo').pk)
+
+    def test_errores_de_contrasena_una_vez_y_traducidos(self):
+        datos = dict(self.datos, password1='password', password2='password')
+        with mock.patch('django.contrib.auth.password_validation.validate_password',
+                        wraps=password_validation.validate_password) as validar:
+            respuesta = self.client.post(reverse('registro'), datos)
+        self.assertEqual(validar.call_count, 1)
+        self.assertEqual(respuesta.context['form'].errors['password2'], ['Esta contraseña es muy común.'])
@@ -1,38 +1,100 @@
-from django.shortcuts import render, redirect, get_object_or_404
+import asyncio
+import os
+from datetime import timedelta
+
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
 from django.contrib.auth.decorators import login_required, permission_required
-from django.contrib.auth import login, authenticate, logout as auth_logout
+from django.contrib.auth import login, logout as auth_logout
 from django.contrib import messages
-from django.db.models import Q, Sum
-from .models import Producto
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import transaction
+from django.http import FileResponse, Http404
+from django.utils import timezone
+from django.utils._os import safe_join
+from .models import ConflictoVersion, Producto
 from .forms import ProductoForm, RegistroUsuarioForm
-
-
-def lista_productos(request):
-    """Vista pública - Lista todos los productos activos con búsqueda"""
+from .paginacion import apaginar_por_cursor, CursorInvalido, ORDEN_CATALOGO
+from .busqueda import obtener_backend, ORDEN_RELEVANCIA
+from . import estadisticas, cache_catalogo, eliminacion, historial, imagenes, importacion, tarjetas
+from .enrutador import lectura_en_replica
+
+
+async def _cargar_usuario(request):
+    """
+    Carga el usuario y sus permisos con el ORM asíncrono antes de renderizar.
+
+    El context processor de auth y `perms` en base.html acceden a request.user
+    de forma síncrona; con esto ya no necesitan consultar la base de datos.
+    """
+    usuario = await request.auser()
+    request.user = usuario
+    if usuario.is_authenticated:
+        await usuario.aget_all_permissions()
+    return usuario
+
+
+@cache_catalogo.cache_pagina_anonima
+@lectura_en_replica
+async def lista_productos(request):
+    """Vista pública - Lista los productos activos con búsqueda y paginación por cursor"""
     query = request.GET.get('q', '')
+    cursor = request.GET.get('cursor')
+    por_pagina = request.GET.get('por_pagina')
 
-    # ELIMINADO: código de categoria_id y categoria_seleccionada
-    # CAMBIADO: select_related sin 'categoria'
-    productos = Producto.objects.filter(activo=True).select_related('usuario_creador')
+    # Solo lo que muestran las tarjetas y la clave del cursor (el creador no aparece en el listado)
+    productos = Producto.objects.filter(activo=True).only(*tarjetas.COLUMNAS, 'fecha_creacion')
+    orden = ORDEN_CATALOGO
 
     if query:
-        productos = productos.filter(
-            Q(nombre__icontains=query) |
-            Q(descripcion__icontains=query)
-        )
+        # Índice de texto completo (FTS5 / tsvector) ordenado por relevancia
+        productos = obtener_backend().buscar(productos, query)
+        orden = ORDEN_RELEVANCIA
+
+    try:
+        pagina = await apaginar_por_cursor(productos, cursor, por_pagina, orden)
+    except CursorInvalido:
+        pagina = await apaginar_por_cursor(productos, None, por_pagina, orden)
+    await imagenes.aadjuntar_miniaturas(pagina, 'tarjeta')
+    await _cargar_usuario(request)
 
     context = {
-        'productos': productos,
+        'productos': pagina,
+        'pagina': pagina,
         'query': query,
+        'cache_timeout': cache_catalogo.timeout(),
     }
     return render(request, 'productos/lista_productos.html', context)
 
 
 @login_required
-def detalle_producto(request, pk):
+@lectura_en_replica
+async def detalle_producto(request, pk):
     """Vista protegida - Muestra detalles de un producto"""
-    producto = get_object_or_404(Producto, pk=pk)
-    return render(request, 'productos/detalle_producto.html', {'producto': producto})
+    producto = await aget_object_or_404(Producto.objects.select_related('usuario_creador'), pk=pk)
+    await imagenes.aadjuntar_miniaturas([producto], 'detalle')
+    await _cargar_usuario(request)
+    return render(request, 'productos/detalle_producto.html', {
+        'producto': producto,
+        'cache_timeout': cache_catalogo.timeout(),
+    })
+
+
+@login_required
+@lectura_en_replica
+def exportar_catalogo(request):
+    """Vista protegida - Descarga en streaming el catálogo o los resultados de ?q="""
+    formato = request.GET.get('formato', 'csv')
+    if formato not in importacion.TIPOS_EXPORTACION:
+        formato = 'csv'
+    query = request.GET.get('q', '')
+
+    productos = Producto.objects.filter(activo=True)
+    if query:
+        productos = obtener_backend().buscar(productos, query)
+    # El streaming se consume después de la vista: se fija ya la base elegida
+    productos = productos.using(productos.db)
+    return importacion.respuesta_exportacion(productos, formato, nombre='catalogo')
 
 
 @login_required
@@ -67,9 +129,18 @@ def editar_producto(request, pk):
     if request.method == 'POST':
         form = ProductoForm(request.POST, request.FILES, instance=producto)
         if form.is_valid():
-            form.save()
-            messages.success(request, f'Producto "{producto.nombre}" actualizado exitosamente.')
-            return redirect('detalle_producto', pk=producto.pk)
+            if not form.campos_modificados():
+                messages.info(request, 'No hubo cambios que guardar.')
+                return redirect('detalle_producto', pk=producto.pk)
+            try:
+                # Como con IntegrityError: el savepoint deja usable una transacción externa
+                with transaction.atomic():
+                    form.save()
+            except ConflictoVersion:
+                form.add_error(None, 'Otro usuario guardó este producto hace un instante. Recarga la página para ver sus cambios.')
+            else:
+                messages.success(request, f'Producto "{producto.nombre}" actualizado exitosamente.')
+                return redirect('detalle_producto', pk=producto.pk)
     else:
         form = ProductoForm(instance=producto)
 
@@ -91,7 +162,7 @@ def eliminar_producto(request, pk):
 
     if request.method == 'POST':
         nombre = producto.nombre
-        producto.delete()
+        eliminacion.dar_de_baja(Producto.objects.filter(pk=producto.pk))
         messages.success(request, f'Producto "{nombre}" eliminado exitosamente.')
         return redirect('lista_productos')
 
@@ -100,18 +171,37 @@ def eliminar_producto(request, pk):
 
 @login_required
 @permission_required('productos.puede_ver_estadisticas', raise_exception=True)
-def dashboard(request):
-    """Vista con permisos especiales - Dashboard con estadísticas"""
-    total_productos = Producto.objects.count()
-    productos_activos = Producto.objects.filter(activo=True).count()
-    valor_inventario = Producto.objects.aggregate(total=Sum('precio'))['total'] or 0
-
-    # ELIMINADO: productos_por_categoria (usaba Categoria que ya no existe)
+@lectura_en_replica
+async def dashboard(request):
+    """Vista con permisos especiales - Dashboard con estadísticas precalculadas"""
+    usuario = await _cargar_usuario(request)
+    hoy = timezone.localdate()
+    dias = [hoy - timedelta(days=n) for n in range(6, -1, -1)]
+    ambito_usuario = estadisticas.ambito_usuario(usuario.pk)
+    # Lecturas independientes: se lanzan juntas
+    resumenes, tendencia, horas = await asyncio.gather(
+        estadisticas.aleer(estadisticas.GLOBAL, ambito_usuario, *(estadisticas.ambito_dia(dia) for dia in dias)),
+        historial.atendencia(),
+        historial.aultimas_horas(),
+    )
+    resumen = resumenes[estadisticas.GLOBAL]
+    # Stock acumulado desde el inicio del período (las filas diarias traen solo la variación)
+    stock_acumulado, acumulado = [], 0
+    for fila in tendencia:
+        acumulado += fila.variacion_stock
+        stock_acumulado.append(acumulado)
 
     context = {
-        'total_productos': total_productos,
-        'productos_activos': productos_activos,
-        'valor_inventario': valor_inventario,
+        'total_productos': resumen.total_productos,
+        'productos_activos': resumen.productos_activos,
+        'valor_inventario': resumen.valor_inventario,
+        'resumen_usuario': resumenes[ambito_usuario],
+        'resumen_dias': [(dia, resumenes[estadisticas.ambito_dia(dia)]) for dia in dias],
+        'historial_inicio': tendencia[0].dia,
+        'historial_horas': horas,
+        'historial_meses': historial.por_mes(tendencia),
+        'grafico_stock': historial.puntos(stock_acumulado),
+        'grafico_precio': historial.puntos([fila.precio_promedio for fila in tendencia]),
     }
     return render(request, 'productos/dashboard.html', context)
 
@@ -122,10 +212,9 @@ def registro(request):
         form = RegistroUsuarioForm(request.POST)
         if form.is_valid():
             user = form.save()
-            username = form.cleaned_data.get('username')
-            password = form.cleaned_data.get('password1')
-            user = authenticate(username=username, password=password)
-            login(request, user)
+            username = user.username
+            # La contraseña recién se validó y se hasheó: authenticate() la hashearía de nuevo
+            login(request, user, backend=settings.AUTHENTICATION_BACKENDS[0])
             messages.success(request, f'¡Bienvenido {username}! Tu cuenta ha sido creada.')
             return redirect('lista_productos')
     else:
@@ -134,6 +223,19 @@ def registro(request):
     return render(request, 'registration/registro.html', {'form': form})
 
 
+def imagen_derivada(request, ruta):
+    """Sirve una miniatura local; su nombre depende del contenido, así que nunca cambia"""
+    try:
+        archivo = safe_join(settings.MEDIA_ROOT, imagenes.DIRECTORIO, ruta)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(archivo):
+        raise Http404
+    respuesta = FileResponse(open(archivo, 'rb'))
+    respuesta['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return respuesta
+
+
 def logout_view(request):
     """Vista personalizada de logout con mensaje y redirección"""
     username = request.user.username if request.user.is_authenticated else None